@@ -0,0 +1,405 @@
+# backend/audio_backends.py
+#
+# Audio stores that several uvicorn workers (or hosts) can share, so the
+# /audio fetch can land on a different process than the /chat that made it.
+# shared_audio_cache picks one with AUDIO_STORE:
+#
+#   memory     per-process LRU (AudioCache, the default; one worker only)
+#   directory  files in AUDIO_STORE_DIR, for workers on one host
+#   redis      any Redis-protocol server at AUDIO_STORE_URL, for several hosts
+#
+# For local testing of the redis store: python fake_redis.py --port 6390
+import os
+import re
+import time
+import queue
+import socket
+import hashlib
+import threading
+from urllib.parse import urlparse
+
+# Audio IDs become file names and keys, so keep them boring
+SAFE_ID = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+class CachedAudio:
+    """One cached answer: either ``data`` (in memory) or ``path`` (a file to send).
+
+    ``etag`` is a strong validator of the bytes; ``expires_at`` is on the
+    ``time.monotonic()`` clock.
+    """
+    __slots__ = ("data", "path", "size", "etag", "expires_at")
+
+    def __init__(self, data, path, size, etag, expires_at):
+        self.data = data
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+def audio_etag(data):
+    return '"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"'
+
+
+def _check_id(audio_id):
+    if not SAFE_ID.match(audio_id):
+        raise ValueError(f"Unsafe audio id: {audio_id!r}")
+
+
+class DirectoryAudioStore:
+    """Answers as plain .mp3 files in one directory shared by every worker.
+
+    A file's mtime is its expiry time, so any worker can tell whether an
+    entry is live with one stat() and no shared index. Writes go to a temp
+    file and are renamed into place, so readers never see half an answer.
+    Reads return the path; the route sends the file (sendfile where the
+    server supports it) and the page cache is shared by all workers. Every
+    worker sweeps expired files and enforces ``max_bytes`` now and then.
+    """
+
+    shared = True
+
+    def __init__(self, path, ttl_seconds, max_bytes, sweep_seconds=30.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sweep_seconds = sweep_seconds
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, audio_id, suffix):
+        return os.path.join(self.path, f"{audio_id}{suffix}")
+
+    def _write(self, final, data, expires_at):
+        tmp = f"{final}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.utime(tmp, (expires_at, expires_at))
+        os.replace(tmp, final)
+
+    def _live(self, path):
+        """stat_result if ``path`` exists and hasn't expired (expired files are removed)."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if st.st_mtime <= time.time():
+            self._unlink(path)
+            self.expirations += 1
+            return None
+        return st
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def set(self, audio_id, segments, ttl_seconds=None):
+        _check_id(audio_id)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        data = segments if isinstance(segments, bytes) else b"".join(segments)
+        self._write(self._file(audio_id, ".mp3"), data, time.time() + ttl)
+        self.writes += 1
+        if time.monotonic() - self._last_sweep > self.sweep_seconds:
+            self.purge_expired()
+
+    def get(self, audio_id, default=None):
+        if not SAFE_ID.match(audio_id):
+            return default
+        path = self._file(audio_id, ".mp3")
+        st = self._live(path)
+        if st is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return CachedAudio(
+            None, path, st.st_size, f'"{st.st_size:x}-{st.st_mtime_ns:x}"',
+            time.monotonic() + (st.st_mtime - time.time())
+        )
+
+    def mark_pending(self, audio_id, ttl_seconds):
+        self._write(self._file(audio_id, ".pending"), b"", time.time() + ttl_seconds)
+
+    def clear_pending(self, audio_id):
+        self._unlink(self._file(audio_id, ".pending"))
+
+    def is_pending(self, audio_id):
+        return SAFE_ID.match(audio_id) is not None and self._live(self._file(audio_id, ".pending")) is not None
+
+    def set_answer(self, audio_id, text):
+        self._write(self._file(audio_id, ".txt"), text.encode("utf-8"), time.time() + self.ttl_seconds)
+
+    def get_answer(self, audio_id):
+        if not SAFE_ID.match(audio_id):
+            return None
+        path = self._file(audio_id, ".txt")
+        if self._live(path) is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read().decode("utf-8")
+        except OSError:
+            return None
+
+    def _scan(self):
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, st))
+        return entries
+
+    def purge_expired(self):
+        """Remove expired files, then the soonest-to-expire answers while over ``max_bytes``."""
+        with self._lock:
+            self._last_sweep = time.monotonic()
+            now = time.time()
+            removed = 0
+            live = []
+            for path, st in self._scan():
+                if path.endswith(".tmp"):
+                    if st.st_mtime < now - 3600:  # left behind by a crashed writer
+                        self._unlink(path)
+                    continue
+                if st.st_mtime <= now:
+                    self._unlink(path)
+                    removed += 1
+                elif path.endswith(".mp3"):
+                    live.append((st.st_mtime, st.st_size, path))
+            self.expirations += removed
+
+            total = sum(size for _, size, _ in live)
+            for _, size, path in sorted(live):
+                if total <= self.max_bytes:
+                    break
+                self._unlink(path)
+                total -= size
+                self.evictions += 1
+            return removed
+
+    def stats(self):
+        files = [(path, st) for path, st in self._scan() if path.endswith(".mp3")]
+        lookups = self.hits + self.misses
+        return {
+            "backend": "directory",
+            "path": self.path,
+            "entries": len(files),
+            "bytes": sum(st.st_size for _, st in files),
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RespError(Exception):
+    pass
+
+
+class AudioStoreError(Exception):
+    """A shared store could not be written (e.g. the Redis server is down)."""
+
+
+class RespClient:
+    """Just enough of a Redis (RESP2) client: pipelined commands over a small connection pool.
+
+    ``redis://[:password@]host[:port][/db]``. Connections that fail are
+    dropped rather than returned to the pool.
+    """
+
+    def __init__(self, url, pool_size=8, timeout=2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._roundtrip(conn, setup)
+        return conn
+
+    @staticmethod
+    def _encode(command):
+        parts = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            if not isinstance(arg, (bytes, bytearray, memoryview)):
+                arg = str(arg).encode("utf-8")
+            parts += [b"$%d\r\n" % len(arg), arg, b"\r\n"]
+        return parts
+
+    @classmethod
+    def _read(cls, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [cls._read(reader) for _ in range(length)]
+        raise RespError(f"Unexpected reply: {line!r}")
+
+    def _roundtrip(self, conn, commands):
+        sock, reader = conn
+        sock.sendall(b"".join(part for command in commands for part in self._encode(command)))
+        replies = [self._read(reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def execute(self, *commands):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            replies = self._roundtrip(conn, commands)
+        except (OSError, ConnectionError, RespError):
+            conn[0].close()
+            raise
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn[0].close()
+        return replies
+
+
+class RedisAudioStore:
+    """Answers in a Redis-protocol key-value server shared by every worker and host.
+
+    Each value is the ETag line followed by the MP3 bytes, stored with a
+    PX expiry so the server does the TTL bookkeeping (and, with maxmemory
+    set, the eviction). A read is one pipelined GET + PTTL; the audio is
+    returned as a memoryview into the reply, not copied again.
+    """
+
+    shared = True
+
+    def __init__(self, url, ttl_seconds, prefix="swarsmriti:audio:", pool_size=8, timeout=2.0):
+        self.client = RespClient(url, pool_size, timeout)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _key(self, audio_id, kind=""):
+        return f"{self.prefix}{audio_id}{kind}"
+
+    def _command(self, *commands):
+        # Writes must not fail silently: the caller answers 503 instead of a URL that won't play
+        try:
+            return self.client.execute(*commands)
+        except (OSError, ConnectionError, RespError) as e:
+            self.errors += 1
+            raise AudioStoreError(f"Audio store {self.client.host}:{self.client.port} failed: {e}") from e
+
+    def set(self, audio_id, segments, ttl_seconds=None):
+        _check_id(audio_id)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        data = segments if isinstance(segments, bytes) else b"".join(segments)
+        value = audio_etag(data).encode() + b"\n" + data
+        self._command(("SET", self._key(audio_id), value, "PX", int(ttl * 1000)))
+        self.writes += 1
+
+    def get(self, audio_id, default=None):
+        if not SAFE_ID.match(audio_id):
+            return default
+        key = self._key(audio_id)
+        try:
+            value, pttl = self.client.execute(("GET", key), ("PTTL", key))
+        except (OSError, ConnectionError, RespError) as e:
+            print(f"❌ Audio store read failed for {audio_id}: {e}")
+            self.errors += 1
+            return default
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        split = value.index(b"\n")
+        data = memoryview(value)[split + 1:]
+        expires_at = time.monotonic() + (pttl / 1000 if pttl > 0 else self.ttl_seconds)
+        return CachedAudio(data, None, len(data), value[:split].decode(), expires_at)
+
+    def mark_pending(self, audio_id, ttl_seconds):
+        self._command(("SET", self._key(audio_id, ":pending"), "1", "PX", int(ttl_seconds * 1000)))
+
+    def clear_pending(self, audio_id):
+        self._command(("DEL", self._key(audio_id, ":pending")))
+
+    def is_pending(self, audio_id):
+        try:
+            return self.client.execute(("EXISTS", self._key(audio_id, ":pending")))[0] == 1
+        except (OSError, ConnectionError, RespError):
+            self.errors += 1
+            return False
+
+    def set_answer(self, audio_id, text):
+        self._command(("SET", self._key(audio_id, ":answer"), text, "PX", int(self.ttl_seconds * 1000)))
+
+    def get_answer(self, audio_id):
+        try:
+            value = self.client.execute(("GET", self._key(audio_id, ":answer")))[0]
+        except (OSError, ConnectionError, RespError):
+            self.errors += 1
+            return None
+        return None if value is None else value.decode("utf-8")
+
+    def purge_expired(self):
+        return 0  # the server expires keys itself
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "server": f"{self.client.host}:{self.client.port}/{self.client.db}",
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "errors": self.errors,
+        }
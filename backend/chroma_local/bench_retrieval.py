@@ -0,0 +1,184 @@
+# backend/chroma_local/bench_retrieval.py
+#
+# Offline retrieval benchmark: vector-only vs. BM25-only vs. hybrid (RRF),
+# plus prompt context size with and without the token budget:
+#
+#   python chroma_local/bench_retrieval.py --docs 5000 --queries 300
+#
+# Memories are synthetic family stories. Each query names a person, place
+# and year that appear together in exactly one memory (the relevant one),
+# while many distractors share some of them, which is where embeddings
+# tend to blur. Uses Chroma's default embedding model; pass
+# --embedder hash to use a hashed bag-of-words stand-in when the model
+# can't be downloaded.
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import statistics
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import chromadb
+from chromadb.api.types import EmbeddingFunction
+
+from chroma_local.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from routes.context_builder import build_context, estimate_tokens, CONTEXT_TOKEN_BUDGET
+
+FIRST = ["Asha", "Ravi", "Meera", "Kabir", "Sunita", "Arjun", "Leela", "Vikram", "Nisha", "Dev"]
+LAST = ["Sharma", "Iyer", "Khan", "Das", "Mehta", "Rao", "Kapoor", "Bose", "Singh", "Pillai"]
+PLACES = ["Jaipur", "Shimla", "Madurai", "Cuttack", "Nashik", "Kochi", "Agra", "Ranchi", "Udupi", "Ajmer"]
+EVENTS = ["wedding", "harvest festival", "train journey", "school exam", "flood", "fair", "pilgrimage"]
+FILLER = (
+    "we laughed until late and the tea went cold while stories of the old house "
+    "were told again by the lantern light and everyone remembered the smell of rain "
+    "on the courtyard stones and the songs our grandmother sang in the kitchen"
+).split()
+
+
+class HashEmbedding(EmbeddingFunction):
+    """Hashed bag-of-words projection; a weak offline stand-in for a real model."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for token in tokenize(text):
+                digest = hashlib.md5(token.encode()).digest()
+                vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+    @staticmethod
+    def name():
+        return "bench-hash"
+
+
+def make_corpus(count, seed):
+    rng = random.Random(seed)
+    documents, metadatas, facts = [], [], []
+    for i in range(count):
+        person = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+        place, year, event = rng.choice(PLACES), rng.randint(1950, 2010), rng.choice(EVENTS)
+        filler = " ".join(rng.choice(FILLER) for _ in range(rng.randint(250, 550)))
+        text = f"In {year} {person} went to {place} for the {event}. {filler}."
+        documents.append(text)
+        metadatas.append({"summary": f"{person} at the {event} in {place}, {year}."})
+        facts.append((person, place, year, event))
+    return documents, metadatas, facts
+
+
+def make_queries(facts, count, seed):
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(count):
+        index = rng.randrange(len(facts))
+        person, place, year, event = facts[index]
+        template = rng.choice([
+            "What happened when {person} went to {place} in {year}?",
+            "Tell me about {person} and the {event} in {year}",
+            "Do you remember {person} in {place} back in {year}?",
+        ])
+        queries.append((template.format(person=person, place=place, year=year, event=event), index))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector, BM25 and hybrid retrieval offline")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--embedder", choices=["default", "hash"], default="default")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.embedder == "hash":
+        embedder = HashEmbedding()
+    else:
+        from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+        embedder = DefaultEmbeddingFunction()
+
+    documents, metadatas, facts = make_corpus(args.docs, args.seed)
+    ids = [f"memory_{i}" for i in range(args.docs)]
+    # Unique ground truth: drop queries whose (person, place, year) isn't unique
+    seen = {}
+    for i, fact in enumerate(facts):
+        seen.setdefault(fact[:3], []).append(i)
+    queries = [(q, i) for q, i in make_queries(facts, args.queries, args.seed) if len(seen[facts[i][:3]]) == 1]
+
+    collection = chromadb.Client().get_or_create_collection("bench_retrieval", embedding_function=embedder)
+    started = time.perf_counter()
+    for start in range(0, args.docs, 1000):
+        collection.add(ids=ids[start:start + 1000], documents=documents[start:start + 1000],
+                       metadatas=metadatas[start:start + 1000])
+    index_seconds = time.perf_counter() - started
+    lexical = BM25Index()
+    started = time.perf_counter()
+    lexical.add(ids, documents)
+    bm25_index_seconds = time.perf_counter() - started
+
+    position = {memory_id: i for i, memory_id in enumerate(ids)}
+    results = {}
+    for mode in ("vector", "bm25", "hybrid"):
+        hits, reciprocal_ranks, latencies, naive_tokens, budget_tokens = 0, [], [], [], []
+        for query, relevant in queries:
+            started = time.perf_counter()
+            vector_ids, lexical_ids = [], []
+            if mode in ("vector", "hybrid"):
+                vector_ids = collection.query(query_texts=[query], n_results=args.candidates)["ids"][0]
+            if mode in ("bm25", "hybrid"):
+                lexical_ids = [memory_id for memory_id, _ in lexical.search(query, args.candidates)]
+            ranked = {
+                "vector": vector_ids,
+                "bm25": lexical_ids,
+                "hybrid": reciprocal_rank_fusion([vector_ids, lexical_ids]),
+            }[mode]
+            latencies.append(time.perf_counter() - started)
+
+            top = [position[memory_id] for memory_id in ranked[:args.k]]
+            hits += relevant in top
+            reciprocal_ranks.append(1.0 / (top.index(relevant) + 1) if relevant in top else 0.0)
+            naive_tokens.append(estimate_tokens("\n".join(documents[i] for i in top)))
+            # Offer the packer more candidates than the naive top-k, within the budget
+            packed = [position[memory_id] for memory_id in ranked[:2 * args.k]]
+            budget_tokens.append(estimate_tokens(build_context(
+                [documents[i] for i in packed], [metadatas[i] for i in packed]
+            )))
+
+        results[mode] = {
+            f"recall@{args.k}": round(hits / len(queries), 4),
+            "mrr": round(statistics.mean(reciprocal_ranks), 4),
+            "latency_p50_ms": round(1000 * statistics.median(latencies), 2),
+            "latency_p95_ms": round(1000 * sorted(latencies)[int(0.95 * (len(latencies) - 1))], 2),
+            "context_tokens_naive": round(statistics.mean(naive_tokens)),
+            "context_tokens_budgeted": round(statistics.mean(budget_tokens)),
+        }
+
+    report = {
+        "docs": args.docs,
+        "queries": len(queries),
+        "embedder": args.embedder,
+        "token_budget": CONTEXT_TOKEN_BUDGET,
+        "vector_index_seconds": round(index_seconds, 2),
+        "bm25_index_seconds": round(bm25_index_seconds, 2),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
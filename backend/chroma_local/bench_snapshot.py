@@ -0,0 +1,116 @@
+# backend/chroma_local/bench_snapshot.py
+#
+# Benchmarks snapshot restore against re-embedding everything:
+#
+#   python chroma_local/bench_snapshot.py --count 100000
+#
+# A synthetic collection is built from random vectors, exported, and restored
+# into a fresh collection. The re-embed cost is measured on a sample with the
+# collection's default embedding model and extrapolated to --count.
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import chromadb
+
+from chroma_local.snapshot import export_snapshot, import_snapshot
+
+WORDS = (
+    "grandmother village monsoon train wedding school river festival letter "
+    "harvest market temple cousin summer kitchen radio bicycle garden story"
+).split()
+
+
+def synthetic_memory(i):
+    text = " ".join(random.choice(WORDS) for _ in range(60))
+    metadata = {"user": f"user_{i % 50}", "tags": "bench", "summary": text[:80], "voice_path_url": ""}
+    return f"memory_{i}", text, metadata
+
+
+def build_source(collection, count, dim, batch_size):
+    rng = np.random.default_rng(0)
+    for start in range(0, count, batch_size):
+        rows = [synthetic_memory(i) for i in range(start, min(start + batch_size, count))]
+        collection.add(
+            ids=[row[0] for row in rows],
+            documents=[row[1] for row in rows],
+            metadatas=[row[2] for row in rows],
+            embeddings=rng.standard_normal((len(rows), dim), dtype=np.float32),
+        )
+
+
+def measure_embedding_rate(collection, sample):
+    """Documents/second for the collection's embedding model, or None if it can't load."""
+    texts = [synthetic_memory(i)[1] for i in range(sample)]
+    try:
+        function = collection._embedding_function
+        function(texts[:8])  # load the model outside the timed section
+        started = time.perf_counter()
+        function(texts)
+        return sample / (time.perf_counter() - started)
+    except Exception as e:
+        print(f"⚠️ Embedding model unavailable, skipping re-embed measurement: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark snapshot restore vs. re-embedding")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)  # all-MiniLM-L6-v2, Chroma's default
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--embed-sample", type=int, default=256)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="snapshot_bench_")
+    snapshot_path = os.path.join(workdir, "snapshot")
+
+    source = chromadb.PersistentClient(path=os.path.join(workdir, "source")).get_or_create_collection("memories")
+    started = time.perf_counter()
+    build_source(source, args.count, args.dim, args.batch_size)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    export_snapshot(source, snapshot_path, args.batch_size)
+    export_seconds = time.perf_counter() - started
+
+    target = chromadb.PersistentClient(path=os.path.join(workdir, "target")).get_or_create_collection("memories")
+    started = time.perf_counter()
+    import_snapshot(target, snapshot_path, args.batch_size)
+    restore_seconds = time.perf_counter() - started
+
+    embed_rate = measure_embedding_rate(target, args.embed_sample)
+    reembed_seconds = args.count / embed_rate if embed_rate else None
+    snapshot_bytes = sum(
+        os.path.getsize(os.path.join(snapshot_path, name)) for name in os.listdir(snapshot_path)
+    )
+
+    results = {
+        "count": args.count,
+        "dim": args.dim,
+        "build_seconds": round(build_seconds, 2),
+        "export_seconds": round(export_seconds, 2),
+        "restore_seconds": round(restore_seconds, 2),
+        "restore_docs_per_second": round(args.count / restore_seconds),
+        "snapshot_mb": round(snapshot_bytes / 1e6, 1),
+        "embed_docs_per_second": round(embed_rate, 1) if embed_rate else None,
+        "estimated_reembed_seconds": round(reembed_seconds, 1) if reembed_seconds else None,
+        "speedup": round(reembed_seconds / restore_seconds, 1) if reembed_seconds else None,
+        "workdir": workdir,
+    }
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
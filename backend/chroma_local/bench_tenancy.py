@@ -0,0 +1,137 @@
+# backend/chroma_local/bench_tenancy.py
+#
+# Query latency for one user's memories as the number of tenants grows,
+# for each MEMORY_TENANCY strategy:
+#
+#   python chroma_local/bench_tenancy.py --tenants 1 1000 --docs-per-tenant 20
+#
+# "filter" is one shared collection searched with where={"user": ...};
+# "collection" gives every tenant its own collection. "unscoped" is the old
+# behaviour (search everything), shown for reference along with how many of
+# its results belonged to somebody else. Vectors are random, so no embedding
+# model is needed; the per-user BM25 lookup is timed alongside.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import chromadb
+
+from chroma_local.lexical_index import UserLexicalIndexes
+
+WORDS = "grandmother village monsoon train wedding school river festival letter harvest market temple".split()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def build(client, strategy, tenants, docs_per_tenant, dim, rng):
+    """Load every tenant's memories; returns (tenant -> collection, lexical indexes)."""
+    lexical = UserLexicalIndexes()
+    shared = None
+    if strategy != "collection":
+        shared = client.get_or_create_collection(f"bench_{strategy}_{tenants}", embedding_function=None)
+    collections = {}
+    pending = ([], [], [], [])
+    for tenant in range(tenants):
+        user = f"user_{tenant}"
+        ids = [f"{user}_m{i}" for i in range(docs_per_tenant)]
+        texts = [" ".join(rng.choice(WORDS) for _ in range(40)) for _ in ids]
+        vectors = np.random.default_rng(tenant).standard_normal((docs_per_tenant, dim), dtype=np.float32)
+        lexical.add(user, ids, texts)
+        if strategy == "collection":
+            collection = client.get_or_create_collection(f"bench_{tenants}_{user}", embedding_function=None)
+            collection.add(ids=ids, documents=texts, embeddings=vectors, metadatas=[{"user": user}] * len(ids))
+            collections[user] = collection
+        else:
+            pending[0].extend(ids)
+            pending[1].extend(texts)
+            pending[2].extend(vectors)
+            pending[3].extend([{"user": user}] * len(ids))
+            collections[user] = shared
+    if shared is not None:
+        batch = client.get_max_batch_size()
+        for start in range(0, len(pending[0]), batch):
+            shared.add(
+                ids=pending[0][start:start + batch],
+                documents=pending[1][start:start + batch],
+                embeddings=np.asarray(pending[2][start:start + batch]),
+                metadatas=pending[3][start:start + batch],
+            )
+    return collections, lexical
+
+
+def run(client, strategy, tenants, args):
+    rng = random.Random(tenants)
+    started = time.perf_counter()
+    collections, lexical = build(client, strategy, tenants, args.docs_per_tenant, args.dim, rng)
+    load_seconds = time.perf_counter() - started
+
+    # One query per tenant first, so segment loading isn't timed as query latency
+    for user, collection in collections.items():
+        where = {"user": user} if strategy == "filter" else None
+        collection.query(query_embeddings=[np.zeros(args.dim, dtype=np.float32)], n_results=1, where=where)
+
+    latencies, lexical_latencies, foreign = [], [], 0
+    query_rng = np.random.default_rng(99)
+    for _ in range(args.queries):
+        user = f"user_{rng.randrange(tenants)}"
+        vector = query_rng.standard_normal(args.dim, dtype=np.float32)
+        where = {"user": user} if strategy == "filter" else None
+        started = time.perf_counter()
+        result = collections[user].query(query_embeddings=[vector], n_results=args.k, where=where)
+        latencies.append(time.perf_counter() - started)
+        foreign += sum(1 for metadata in result["metadatas"][0] if metadata["user"] != user)
+
+        started = time.perf_counter()
+        lexical.search(user, " ".join(rng.choice(WORDS) for _ in range(5)), args.k)
+        lexical_latencies.append(time.perf_counter() - started)
+
+    return {
+        "strategy": strategy,
+        "tenants": tenants,
+        "total_docs": tenants * args.docs_per_tenant,
+        "load_seconds": round(load_seconds, 2),
+        "vector_p50_ms": round(1000 * statistics.median(latencies), 2),
+        "vector_p95_ms": round(1000 * percentile(latencies, 0.95), 2),
+        "bm25_p50_ms": round(1000 * statistics.median(lexical_latencies), 3),
+        "foreign_results": foreign,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-user retrieval with many tenants")
+    parser.add_argument("--tenants", type=int, nargs="+", default=[1, 1000])
+    parser.add_argument("--docs-per-tenant", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--strategies", nargs="+", default=["unscoped", "filter", "collection"])
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    client = chromadb.PersistentClient(path=tempfile.mkdtemp(prefix="tenancy_bench_"))
+    results = []
+    for tenants in args.tenants:
+        for strategy in args.strategies:
+            result = run(client, strategy, tenants, args)
+            print(json.dumps(result))
+            results.append(result)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# backend/chroma_local/dedupe.py
+#
+# Exact and near-duplicate detection for memories.
+#
+# Every stored memory carries a content hash and MINHASH_BANDS locality-
+# sensitive band keys (MinHash over character 5-gram shingles) in its metadata,
+# so ingest can ask Chroma for likely duplicates with one metadata query per
+# batch and confirm them by shingle Jaccard similarity.
+#
+# Offline pass over an existing collection (dry run unless --apply):
+#
+#   python -m chroma_local.dedupe
+#   python -m chroma_local.dedupe --apply --backfill
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+
+import numpy as np
+
+# ⚙️ Duplicate handling (override via .env)
+DEDUPE_POLICY = os.getenv("DEDUPE_POLICY", "skip")  # skip | merge_tags | keep_newest | off
+DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.85"))  # shingle Jaccard for "near"
+
+SHINGLE_CHARS = 5  # character shingles stay stable under one-word edits in short memories
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 8  # 8 bands x 8 rows: pairs above ~0.77 similarity share a band with high probability
+HASH_KEY = "content_hash"
+BAND_KEYS = [f"minhash_{band}" for band in range(MINHASH_BANDS)]
+
+_WORD = re.compile(r"\w+")
+_MERSENNE = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, (1 << 61) - 1, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, (1 << 61) - 1, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def _words(text):
+    return _WORD.findall((text or "").lower())
+
+
+def _normalize(text):
+    # Text without word characters ("🙂🙂", "???") would all normalize to "";
+    # fall back to the stripped raw text so those stay distinct
+    return " ".join(_words(text)) or (text or "").strip()
+
+
+def content_hash(text):
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+
+
+def shingles(text, size=SHINGLE_CHARS):
+    normalized = _normalize(text)
+    if len(normalized) <= size:
+        return {normalized}
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def band_keys(shingle_set):
+    """MinHash signature of ``shingle_set``, hashed band by band into short strings."""
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") >> 3
+         for s in shingle_set),
+        dtype=np.uint64, count=len(shingle_set),
+    )
+    # (a*x + b) mod 2^64, then mod a Mersenne prime; uint64 arithmetic wraps without warnings
+    signature = ((_A[:, None] * hashes[None, :] + _B[:, None]) % _MERSENNE).min(axis=1)
+    rows = signature.reshape(MINHASH_BANDS, -1)
+    return [hashlib.blake2b(row.tobytes(), digest_size=8).hexdigest() for row in rows]
+
+
+class Fingerprint:
+    def __init__(self, text):
+        self.hash = content_hash(text)
+        self.shingles = shingles(text)
+        self.bands = band_keys(self.shingles)
+
+    def metadata(self):
+        return {HASH_KEY: self.hash, **dict(zip(BAND_KEYS, self.bands))}
+
+    def matches(self, other, threshold=DEDUPE_THRESHOLD):
+        """"exact", "near" or None."""
+        if self.hash == other.hash:
+            return "exact"
+        if any(a == b for a, b in zip(self.bands, other.bands)) and \
+                jaccard(self.shingles, other.shingles) >= threshold:
+            return "near"
+        return None
+
+
+def candidate_filter(fingerprints):
+    """One Chroma ``where`` clause matching any stored memory that may duplicate one of ``fingerprints``."""
+    clauses = [{HASH_KEY: {"$in": sorted({f.hash for f in fingerprints})}}]
+    for band, key in enumerate(BAND_KEYS):
+        clauses.append({key: {"$in": sorted({f.bands[band] for f in fingerprints})}})
+    return {"$or": clauses}
+
+
+def find_clusters(ids, texts, threshold=DEDUPE_THRESHOLD):
+    """Group duplicate rows; returns lists of row indexes (two or more per group)."""
+    fingerprints = [Fingerprint(text) for text in texts]
+    buckets = {}
+    parent = list(range(len(ids)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, fingerprint in enumerate(fingerprints):
+        seen = set()
+        for key in [("hash", fingerprint.hash)] + [(band, value) for band, value in enumerate(fingerprint.bands)]:
+            for j in buckets.get(key, ()):
+                if j in seen or root(i) == root(j):
+                    continue
+                seen.add(j)
+                if fingerprint.matches(fingerprints[j], threshold):
+                    parent[root(i)] = root(j)
+            buckets.setdefault(key, []).append(i)
+
+    clusters = {}
+    for i in range(len(ids)):
+        clusters.setdefault(root(i), []).append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def dedupe_collection(collection, apply=False, backfill=False, threshold=DEDUPE_THRESHOLD, batch_size=5000):
+    """Find duplicate memories per user in ``collection``; delete all but the newest with ``apply``.
+
+    ``backfill`` adds the dedupe keys (and tag flags) to memories stored
+    before they existed, so ingest-time checks can see them. Returns a report
+    with the space reclaimed (documents + embeddings + metadata).
+    """
+    total = collection.count()
+    rows = []
+    for offset in range(0, total, batch_size):
+        page = collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+        rows.extend(zip(page["ids"], page["documents"], page["metadatas"]))
+
+    by_user = {}
+    for row in rows:
+        by_user.setdefault((row[2] or {}).get("user", ""), []).append(row)
+
+    dimension = 0
+    sample = collection.get(limit=1, include=["embeddings"])
+    if sample["ids"]:
+        dimension = len(sample["embeddings"][0])
+
+    doomed, reclaimed, clusters_found = [], 0, 0
+    for user_rows in by_user.values():
+        clusters = find_clusters([r[0] for r in user_rows], [r[1] for r in user_rows], threshold)
+        clusters_found += len(clusters)
+        for members in clusters:
+            # Keep the newest copy (ISO timestamps sort lexically; untimestamped rows count as oldest)
+            keep = max(members, key=lambda i: ((user_rows[i][2] or {}).get("timestamp", ""), i))
+            for i in members:
+                if i == keep:
+                    continue
+                memory_id, document, metadata = user_rows[i]
+                doomed.append(memory_id)
+                reclaimed += len((document or "").encode("utf-8")) + 4 * dimension
+                reclaimed += len(json.dumps(metadata or {}).encode("utf-8"))
+
+    if apply and doomed:
+        for start in range(0, len(doomed), batch_size):
+            collection.delete(ids=doomed[start:start + batch_size])
+
+    backfilled = 0
+    if backfill:
+        from chroma_local.memory_manager import tag_filter
+        updates = []
+        for memory_id, document, metadata in rows:
+            if memory_id in doomed or (metadata or {}).get(HASH_KEY):
+                continue
+            metadata = dict(metadata or {})
+            metadata.update(Fingerprint(document).metadata())
+            for tag in filter(None, (t.strip() for t in metadata.get("tags", "").split(","))):
+                metadata.update(tag_filter(tag))
+            updates.append((memory_id, metadata))
+        if apply:
+            for start in range(0, len(updates), batch_size):
+                chunk = updates[start:start + batch_size]
+                collection.update(ids=[u[0] for u in chunk], metadatas=[u[1] for u in chunk])
+        backfilled = len(updates)
+
+    return {
+        "memories": total,
+        "duplicate_groups": clusters_found,
+        "duplicates": len(doomed),
+        "bytes_reclaimed": reclaimed,
+        "backfilled": backfilled,
+        "applied": apply,
+    }
+
+
+def main():
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    from chroma_local import memory_manager
+
+    parser = argparse.ArgumentParser(description="Find and remove duplicate memories")
+    parser.add_argument("--apply", action="store_true", help="delete duplicates (default: report only)")
+    parser.add_argument("--backfill", action="store_true", help="add dedupe keys to older memories")
+    parser.add_argument("--threshold", type=float, default=DEDUPE_THRESHOLD)
+    args = parser.parse_args()
+
+    collections = [memory_manager.get_collection()]
+    if memory_manager.MEMORY_TENANCY == "collection":
+        prefix = f"{memory_manager.CHROMA_COLLECTION}_u_"
+        collections += [
+            memory_manager.chroma_client.get_collection(c.name, embedding_function=memory_manager.embedding_function)
+            for c in memory_manager.chroma_client.list_collections() if c.name.startswith(prefix)
+        ]
+    for collection in collections:
+        report = dedupe_collection(collection, args.apply, args.backfill, args.threshold)
+        print(json.dumps({"collection": collection.name, **report}, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import re
+import math
+import heapq
+import threading
+from collections import Counter
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """Incremental in-process BM25 inverted index over memory documents.
+
+    Kept next to the Chroma collection and updated on every store, so exact
+    names, dates and places can be matched even when the embedding misses
+    them. Thread-safe: writes come from ingest worker threads.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings = {}   # term -> {doc_id: term frequency}
+        self._lengths = {}    # doc_id -> token count
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, ids, texts):
+        with self._lock:
+            for doc_id, text in zip(ids, texts):
+                if doc_id in self._lengths:
+                    self._remove(doc_id)
+                terms = Counter(tokenize(text or ""))
+                for term, count in terms.items():
+                    self._postings.setdefault(term, {})[doc_id] = count
+                length = sum(terms.values())
+                self._lengths[doc_id] = length
+                self._total_length += length
+
+    def remove(self, ids):
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        # Postings aren't indexed by doc, so sweep them; removals are rare (dedupe, deletes)
+        for term in [term for term, docs in self._postings.items() if doc_id in docs]:
+            docs = self._postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self._postings[term]
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._total_length = 0
+
+    def search(self, query, k=10):
+        """Top ``k`` ``(doc_id, score)`` pairs for ``query``, best first."""
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return []
+            average = self._total_length / count
+            scores = {}
+            for term in set(tokenize(query)):
+                docs = self._postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Merge ranked id lists: score(id) = Σ 1 / (k + rank). Returns ids, best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class UserLexicalIndexes:
+    """One BM25Index per user, so a lexical search only scores that user's memories."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def __len__(self):
+        return sum(len(index) for index in list(self._indexes.values()))
+
+    def for_user(self, user_id):
+        index = self._indexes.get(user_id)
+        if index is None:
+            with self._lock:
+                index = self._indexes.setdefault(user_id, BM25Index())
+        return index
+
+    def add(self, user_id, ids, texts):
+        self.for_user(user_id).add(ids, texts)
+
+    def remove(self, user_id, ids):
+        self.for_user(user_id).remove(ids)
+
+    def search(self, user_id, query, k=10):
+        index = self._indexes.get(user_id)
+        return index.search(query, k) if index is not None else []
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def rebuild(self, collection, batch_size=5000):
+        """Index every document already in ``collection`` under its "user" metadata."""
+        total = collection.count()
+        for offset in range(0, total, batch_size):
+            page = collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+            by_user = {}
+            for memory_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                ids, texts = by_user.setdefault((metadata or {}).get("user", ""), ([], []))
+                ids.append(memory_id)
+                texts.append(document)
+            for user_id, (ids, texts) in by_user.items():
+                self.add(user_id, ids, texts)
+        return total
+
+
+LEXICAL_INDEXES = UserLexicalIndexes()
@@ -1,50 +1,366 @@
 import os
+import re
+import time
 import uuid
-import chromadb
+import hashlib
+import threading
+from datetime import datetime, timezone
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from dotenv import load_dotenv
 
+from chroma_local.query_cache import QUERY_CACHE, normalize_query
+from chroma_local.lexical_index import LEXICAL_INDEXES, reciprocal_rank_fusion
+from chroma_local.dedupe import Fingerprint, candidate_filter, DEDUPE_POLICY, DEDUPE_THRESHOLD
+
 load_dotenv()
 
-# 🔧 Initialize Chroma client
-chroma_client = chromadb.Client()
+# ⚙️ Storage (override via .env): empty dir keeps the old in-memory store
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "")
+CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "memories")
+# Snapshot loaded into an empty collection at startup (see chroma_local/snapshot.py)
+CHROMA_RESTORE_SNAPSHOT = os.getenv("CHROMA_RESTORE_SNAPSHOT", "")
 
-# 📚 Create memory collection with default embeddings (free and simple)
-collection = chroma_client.get_or_create_collection(
-    name="memories"
-    # Using default embeddings - no API key needed
-)
+# ⚙️ Hybrid retrieval (override via .env): BM25 + vector results merged by reciprocal rank
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # per retriever, before fusion
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# ⚙️ Multi-tenancy (override via .env). "filter": one collection, searches are
+# restricted to the user inside Chroma with a metadata where-filter.
+# "collection": every user gets their own collection (and HNSW index); query cost
+# then stays flat as tenants are added (see chroma_local/bench_tenancy.py).
+# "filter" is the default because existing memories live in the shared collection.
+MEMORY_TENANCY = os.getenv("MEMORY_TENANCY", "filter")
+DEFAULT_USER_ID = os.getenv("DEFAULT_USER_ID", "arpit")
+
+# Built on first use (or by the app's warm-up) so importing this module stays cheap
+chroma_client = None
+collection = None
+embedding_function = None
+_user_collections = {}
+_init_lock = threading.Lock()
+# Duplicate check + add run under one lock per user, so two identical
+# submissions in flight at once can't both pass the check (per process)
+_user_locks = {}
+_user_locks_guard = threading.Lock()
+
+
+def _user_lock(user_id):
+    with _user_locks_guard:
+        return _user_locks.setdefault(user_id, threading.Lock())
+
+
+def user_collection_name(user_id):
+    # Chroma names allow [a-zA-Z0-9._-]; the digest keeps sanitized ids distinct
+    safe = re.sub(r"[^a-zA-Z0-9._-]", "_", user_id)[:48]
+    digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:10]
+    return f"{CHROMA_COLLECTION}_u_{safe}_{digest}"
+
+
+def get_collection():
+    global chroma_client, collection, embedding_function
+    if collection is None:
+        with _init_lock:
+            if collection is None:
+                import chromadb  # heavy import, deferred with the client
+                from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+                # 🔧 Initialize Chroma client (on disk when CHROMA_PERSIST_DIR is set)
+                if CHROMA_PERSIST_DIR:
+                    client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+                else:
+                    client = chromadb.Client()
+
+                # 📚 Create memory collection with default embeddings (free and simple)
+                # Kept as a handle so query embeddings can be computed (and cached) here
+                embedder = DefaultEmbeddingFunction()
+                memories = client.get_or_create_collection(
+                    name=CHROMA_COLLECTION,
+                    embedding_function=embedder
+                    # Using default embeddings - no API key needed
+                )
+                if CHROMA_RESTORE_SNAPSHOT and memories.count() == 0:
+                    from chroma_local.snapshot import import_snapshot
+                    import_snapshot(memories, CHROMA_RESTORE_SNAPSHOT, client.get_max_batch_size())
+                if HYBRID_RETRIEVAL:
+                    # The BM25 indexes live in process memory; rebuild them from the stored documents
+                    LEXICAL_INDEXES.rebuild(memories, client.get_max_batch_size())
+                    if MEMORY_TENANCY == "collection":
+                        prefix = f"{CHROMA_COLLECTION}_u_"
+                        for existing in client.list_collections():
+                            if existing.name.startswith(prefix):
+                                LEXICAL_INDEXES.rebuild(
+                                    client.get_collection(existing.name, embedding_function=embedder),
+                                    client.get_max_batch_size()
+                                )
+
+                chroma_client, collection, embedding_function = client, memories, embedder
+                where = CHROMA_PERSIST_DIR or "memory"
+                print(f"✅ Memory manager loaded with default embeddings ({memories.count()} memories, {where})")
+    return collection
+
+
+def get_user_collection(user_id):
+    """The collection holding ``user_id``'s memories under MEMORY_TENANCY."""
+    shared = get_collection()
+    if MEMORY_TENANCY != "collection":
+        return shared
+    user_memories = _user_collections.get(user_id)
+    if user_memories is None:
+        with _init_lock:
+            user_memories = _user_collections.get(user_id)
+            if user_memories is None:
+                user_memories = chroma_client.get_or_create_collection(
+                    name=user_collection_name(user_id),
+                    embedding_function=embedding_function
+                )
+                _user_collections[user_id] = user_memories
+    return user_memories
+
+
+def user_filter(user_id):
+    """Chroma ``where`` clause restricting a read to ``user_id`` (None when collections are per user)."""
+    return {"user": user_id} if MEMORY_TENANCY != "collection" else None
+
+
+def tag_filter(tag):
+    # Tags are also stored as one boolean flag per tag so Chroma can filter on them
+    return {f"tag_{tag}": True}
+
+
+def combine_filters(*clauses):
+    clauses = [clause for clause in clauses if clause]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def warm_up():
+    """Create the collection and load the embedding model with a throwaway query."""
+    get_collection().query(query_texts=["warm up"], n_results=1)
+
+def _split_tags(tags):
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return [tag.strip() for tag in tags if tag.strip()]
+
+def _memory_metadata(user_id, summary, tags, voice_path_url=None):
+    tags = _split_tags(tags)
 
-# ✅ Store memory
-def store_memory(user_id, text, summary, tags, voice_path_url=None):
-    if isinstance(tags, list):
-        tags = ",".join(tags)
-        
     metadata = {
         "user": user_id,
-        "tags": tags,
+        "tags": ",".join(tags),
         "summary": summary,
-        "voice_path_url": voice_path_url or ""
+        "voice_path_url": voice_path_url or "",
+        "timestamp": datetime.now(timezone.utc).isoformat()
     }
-    
+    for tag in tags:
+        metadata.update(tag_filter(tag))
+    return metadata
+
+# ✅ Store memory
+def store_memory(user_id, text, summary, tags, voice_path_url=None):
     try:
-        collection.add(
-            documents=[text],
-            metadatas=[metadata],
-            ids=[f"memory_{str(uuid.uuid4())}"]
-        )
-        print(f"✅ Memory stored successfully!")
+        ids, duplicates = store_memories([{
+            "user_id": user_id, "text": text, "summary": summary, "tags": tags, "voice_path_url": voice_path_url
+        }])
+        if duplicates:
+            print(f"♻️ Memory is a duplicate of {duplicates[0]['duplicate_of']} ({duplicates[0]['action']})")
+        else:
+            print(f"✅ Memory stored successfully!")
     except Exception as e:
         print(f"❌ Error storing memory: {e}")
 
-def query_memory(query, k=3):
+def _stored_fingerprints(user_memories, user_id, fingerprints):
+    """id -> (fingerprint, metadata) for stored memories that may duplicate ``fingerprints``."""
+    stored = user_memories.get(
+        where=combine_filters(user_filter(user_id), candidate_filter(fingerprints)),
+        include=["documents", "metadatas"]
+    )
+    return {
+        memory_id: (Fingerprint(document), metadata)
+        for memory_id, document, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+    }
+
+# 🔎 Which of ``texts`` are already stored for this user? (one query for the lot)
+def find_duplicates(user_id, texts):
+    """Per text, ``{"duplicate_of", "kind"}`` for a stored match, else None."""
+    if not texts:
+        return []
+    fingerprints = [Fingerprint(text) for text in texts]
+    known = _stored_fingerprints(get_user_collection(user_id), user_id, fingerprints)
+    found = []
+    for fingerprint in fingerprints:
+        match = None
+        for other_id, (other, _) in known.items():
+            kind = fingerprint.matches(other, DEDUPE_THRESHOLD)
+            if kind:
+                match = {"duplicate_of": other_id, "kind": kind}
+                break
+        found.append(match)
+    return found
+
+def _resolve_duplicates(user_memories, user_id, rows):
+    """Apply DEDUPE_POLICY to ``rows`` of (id, memory, fingerprint) for one user.
+
+    Returns the rows to store and a list of the duplicates found. Existing
+    memories are looked up with a single metadata query for the whole batch.
+    """
+    if DEDUPE_POLICY == "off" or not rows:
+        return rows, []
+
+    # id -> (fingerprint, metadata); rows kept from this batch join as they are accepted
+    known = _stored_fingerprints(user_memories, user_id, [row[2] for row in rows])
+    keep, duplicates, merged, removed = {}, [], {}, []
+    for memory_id, memory, fingerprint in rows:
+        match = None
+        for other_id, (other, _) in known.items():
+            kind = fingerprint.matches(other, DEDUPE_THRESHOLD)
+            if kind:
+                match = (other_id, kind)
+                break
+        if match is None:
+            keep[memory_id] = (memory_id, memory, fingerprint)
+            known[memory_id] = (fingerprint, None)
+            continue
+
+        other_id, kind = match
+        duplicates.append({"id": memory_id, "duplicate_of": other_id, "kind": kind, "action": DEDUPE_POLICY})
+        if DEDUPE_POLICY == "merge_tags":
+            if other_id in keep:
+                target = keep[other_id][1]
+                tags = _split_tags(target.get("tags", []))
+                target["tags"] = tags + [tag for tag in _split_tags(memory.get("tags", [])) if tag not in tags]
+            else:
+                metadata = merged.setdefault(other_id, dict(known[other_id][1]))
+                tags = _split_tags(metadata.get("tags", ""))
+                for tag in _split_tags(memory.get("tags", [])):
+                    if tag not in tags:
+                        tags.append(tag)
+                        metadata.update(tag_filter(tag))
+                metadata["tags"] = ",".join(tags)
+        elif DEDUPE_POLICY == "keep_newest":
+            if other_id in keep:
+                del keep[other_id]
+            else:
+                removed.append(other_id)
+            del known[other_id]
+            keep[memory_id] = (memory_id, memory, fingerprint)
+            known[memory_id] = (fingerprint, None)
+
+    if merged:
+        user_memories.update(ids=list(merged), metadatas=list(merged.values()))
+    if removed:
+        user_memories.delete(ids=removed)
+        LEXICAL_INDEXES.remove(user_id, removed)
+    if merged or removed:
+        QUERY_CACHE.invalidate(user_id)
+    return list(keep.values()), duplicates
+
+# 📦 Store many memories with a few large add() calls (one embedding pass per batch)
+def store_memories(memories, batch_size=None):
+    """Add ``memories`` (dicts with store_memory's arguments) in batches.
+
+    Exact and near duplicates (of stored memories or of each other) are
+    handled per DEDUPE_POLICY before anything is embedded. Returns
+    ``(ids, duplicates)``: the ids actually stored, and one entry per
+    duplicate found (``index`` is its position in ``memories``). Unlike store_memory, errors propagate so bulk callers
+    can report which batch failed.
+    """
+    get_collection()
+    limit = chroma_client.get_max_batch_size()
+    batch_size = min(batch_size or limit, limit)
+    by_user, position = {}, {}
+    for index, memory in enumerate(memories):
+        memory_id = f"memory_{uuid.uuid4()}"
+        position[memory_id] = index
+        by_user.setdefault(memory["user_id"], []).append((memory_id, dict(memory), Fingerprint(memory["text"])))
+
+    ids, duplicates = [], []
+    batches = 0
+    for user_id, rows in by_user.items():
+        user_memories = get_user_collection(user_id)
+        for start in range(0, len(rows), batch_size):
+            with _user_lock(user_id):
+                batch, found = _resolve_duplicates(user_memories, user_id, rows[start:start + batch_size])
+                duplicates.extend({"index": position[d.pop("id")], **d} for d in found)
+                if not batch:
+                    continue
+                batch_ids = [memory_id for memory_id, _, _ in batch]
+                user_memories.add(
+                    documents=[memory["text"] for _, memory, _ in batch],
+                    metadatas=[
+                        {
+                            **_memory_metadata(
+                                user_id, memory["summary"], memory.get("tags", []), memory.get("voice_path_url")
+                            ),
+                            **fingerprint.metadata()
+                        }
+                        for _, memory, fingerprint in batch
+                    ],
+                    ids=batch_ids
+                )
+                LEXICAL_INDEXES.add(user_id, batch_ids, [memory["text"] for _, memory, _ in batch])
+            QUERY_CACHE.invalidate(user_id)
+            ids.extend(batch_ids)
+            batches += 1
+    print(f"✅ Stored {len(ids)} memories in {batches} batch(es), {len(duplicates)} duplicate(s) found")
+    return ids, duplicates
+
+def embed_query(query):
+    """Embedding for a normalized query, computed once per distinct question."""
+    embedding = QUERY_CACHE.get_embedding(query)
+    if embedding is None:
+        get_collection()
+        started = time.perf_counter()
+        embedding = embedding_function([query])[0]
+        QUERY_CACHE.put_embedding(query, embedding, time.perf_counter() - started)
+    return embedding
+
+def _vector_search(query, k, user_id):
+    results = get_user_collection(user_id).query(
+        query_embeddings=[embed_query(query)], n_results=k, where=user_filter(user_id)
+    )
+    return results['documents'][0], results['metadatas'][0]
+
+def _hybrid_search(query, k, user_id):
+    """Vector and BM25 top candidates from the user's memories, fused with reciprocal rank fusion."""
+    collection = get_user_collection(user_id)
+    candidates = max(k, HYBRID_CANDIDATES)
+    vector = collection.query(
+        query_embeddings=[embed_query(query)], n_results=candidates, where=user_filter(user_id)
+    )
+    rows = {
+        memory_id: (document, metadata)
+        for memory_id, document, metadata in zip(vector['ids'][0], vector['documents'][0], vector['metadatas'][0])
+    }
+    lexical_ids = [memory_id for memory_id, _ in LEXICAL_INDEXES.search(user_id, query, candidates)]
+
+    fused = reciprocal_rank_fusion([vector['ids'][0], lexical_ids], k=RRF_K)[:k]
+    missing = [memory_id for memory_id in fused if memory_id not in rows]
+    if missing:
+        extra = collection.get(ids=missing, include=["documents", "metadatas"])
+        rows.update(zip(extra['ids'], zip(extra['documents'], extra['metadatas'])))
+    fused = [memory_id for memory_id in fused if memory_id in rows]
+    return [rows[memory_id][0] for memory_id in fused], [rows[memory_id][1] for memory_id in fused]
+
+# 🔎 Blocking (embedding is CPU-bound): call via asyncio.to_thread from async routes
+def query_memory(query, k=3, user_id=DEFAULT_USER_ID):
     try:
-        results = collection.query(query_texts=[query], n_results=k)
-        return results['documents'][0], results['metadatas'][0]
+        normalized = normalize_query(query) or query
+        cached = QUERY_CACHE.get_results(user_id, normalized, k)
+        if cached is not None:
+            return cached
+
+        version = QUERY_CACHE.version(user_id)
+        if HYBRID_RETRIEVAL:
+            found = _hybrid_search(normalized, k, user_id)
+        else:
+            found = _vector_search(normalized, k, user_id)
+        QUERY_CACHE.put_results(user_id, normalized, k, version, found)
+        return found
     except Exception as e:
         print(f"❌ Error querying memory: {e}")
-        return [], []
-
-print("✅ Memory manager loaded with default embeddings")
\ No newline at end of file
+        return [], []
\ No newline at end of file
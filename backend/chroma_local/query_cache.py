@@ -0,0 +1,118 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# ⚙️ Query caches (override via .env); 0 disables a tier
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+QUERY_RESULT_CACHE_SIZE = int(os.getenv("QUERY_RESULT_CACHE_SIZE", "512"))
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_query(query: str) -> str:
+    """Case, punctuation and spacing don't change what a question asks for."""
+    return " ".join(_PUNCTUATION.sub(" ", query.lower()).split())
+
+
+class _LRU:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class QueryCache:
+    """Normalized query → embedding, and (user, query, k, version) → results.
+
+    Results are keyed by the user's memory-bank version, which store_memory
+    bumps on every write, so a new memory is never hidden behind a stale
+    result; that user's old entries are dropped at the same time and other
+    users' stay. Embeddings don't depend on the data and are shared by all
+    users. Thread-safe: lookups run in worker threads.
+    """
+
+    def __init__(self, embedding_entries=QUERY_EMBEDDING_CACHE_SIZE, result_entries=QUERY_RESULT_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._embeddings = _LRU(embedding_entries)
+        self._results = _LRU(result_entries)
+        self._versions = {}  # user_id -> writes so far
+        self.invalidations = 0
+        self.embed_seconds = 0.0  # spent embedding on misses
+        self.embeds = 0
+
+    def get_embedding(self, normalized):
+        with self._lock:
+            return self._embeddings.get(normalized)
+
+    def put_embedding(self, normalized, embedding, seconds):
+        with self._lock:
+            self._embeddings.put(normalized, embedding)
+            self.embed_seconds += seconds
+            self.embeds += 1
+
+    def version(self, user_id):
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def get_results(self, user_id, normalized, k):
+        with self._lock:
+            return self._results.get((user_id, normalized, k, self._versions.get(user_id, 0)))
+
+    def put_results(self, user_id, normalized, k, version, results):
+        with self._lock:
+            if version == self._versions.get(user_id, 0):  # a write landed mid-query; don't cache the stale answer
+                self._results.put((user_id, normalized, k, version), results)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self.invalidations += 1
+            for key in [key for key in self._results.entries if key[0] == user_id]:
+                del self._results.entries[key]
+
+    def stats(self):
+        with self._lock:
+            embeddings = self._embeddings.stats()
+            results = self._results.stats()
+            avg_embed = self.embed_seconds / self.embeds if self.embeds else 0.0
+            # A result hit skips the embedding too, so both tiers save an embed
+            saved = (embeddings["hits"] + results["hits"]) * avg_embed
+            return {
+                "invalidations": self.invalidations,
+                "embeddings": embeddings,
+                "results": results,
+                "embed_avg_ms": round(1000 * avg_embed, 2),
+                "embed_seconds_saved": round(saved, 3),
+            }
+
+
+QUERY_CACHE = QueryCache()
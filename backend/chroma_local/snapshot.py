@@ -0,0 +1,182 @@
+# backend/chroma_local/snapshot.py
+#
+# Compact snapshots of the memories collection, so a restart (or a new
+# replica) can bulk-load precomputed embeddings instead of re-embedding:
+#
+#   python -m chroma_local.snapshot export snapshots/memories
+#   python -m chroma_local.snapshot import snapshots/memories
+#
+# A snapshot is a directory with:
+#   manifest.json   format version, count, embedding dim/dtype, embedding function
+#   embeddings.npy  float32 [count, dim], loaded memory-mapped
+#   records.jsonl   one {"id", "document", "metadata"} per row, same order
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+
+SNAPSHOT_FORMAT = 1
+DEFAULT_BATCH_SIZE = 5000
+_MANIFEST = "manifest.json"
+_EMBEDDINGS = "embeddings.npy"
+_RECORDS = "records.jsonl"
+
+
+class SnapshotError(ValueError):
+    """The snapshot is missing, incomplete or incompatible with the collection."""
+
+
+def _embedding_function_name(collection):
+    function = getattr(collection, "_embedding_function", None)
+    try:
+        return function.name()
+    except Exception:
+        return type(function).__name__ if function is not None else None
+
+
+def export_snapshot(collection, path, batch_size=DEFAULT_BATCH_SIZE):
+    """Write every row of ``collection`` to a snapshot directory at ``path``.
+
+    Rows are paged out ``batch_size`` at a time so memory stays bounded; the
+    snapshot is written next to ``path`` and renamed into place at the end.
+    Returns the manifest.
+    """
+    started = time.perf_counter()
+    count = collection.count()
+    staging = f"{path.rstrip(os.sep)}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    embeddings = None
+    written = 0
+    with open(os.path.join(staging, _RECORDS), "w", encoding="utf-8") as records:
+        while written < count:
+            page = collection.get(
+                limit=batch_size,
+                offset=written,
+                include=["embeddings", "documents", "metadatas"],
+            )
+            ids = page["ids"]
+            if not ids:
+                break
+            vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            if embeddings is None:
+                embeddings = np.lib.format.open_memmap(
+                    os.path.join(staging, _EMBEDDINGS), mode="w+",
+                    dtype=np.float32, shape=(count, vectors.shape[1]),
+                )
+            embeddings[written:written + len(ids)] = vectors
+            for row_id, document, metadata in zip(ids, page["documents"], page["metadatas"]):
+                records.write(json.dumps({"id": row_id, "document": document, "metadata": metadata}, ensure_ascii=False))
+                records.write("\n")
+            written += len(ids)
+
+    if embeddings is None:
+        np.save(os.path.join(staging, _EMBEDDINGS), np.zeros((0, 0), dtype=np.float32))
+        dim = 0
+    else:
+        dim = embeddings.shape[1]
+        embeddings.flush()
+        del embeddings
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "collection": collection.name,
+        "count": written,
+        "dim": dim,
+        "dtype": "float32",
+        "embedding_function": _embedding_function_name(collection),
+        "created_at": time.time(),
+    }
+    with open(os.path.join(staging, _MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    print(f"📦 Exported {written} memories to {path} in {time.perf_counter() - started:.2f}s")
+    return manifest
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, _MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise SnapshotError(f"No snapshot manifest in {path}")
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"Unsupported snapshot format {manifest.get('format')}")
+    return manifest
+
+
+def _record_batches(path, batch_size):
+    batch = []
+    with open(os.path.join(path, _RECORDS), encoding="utf-8") as records:
+        for line in records:
+            batch.append(json.loads(line))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def import_snapshot(collection, path, batch_size=DEFAULT_BATCH_SIZE):
+    """Bulk-load a snapshot into ``collection`` using its stored embeddings.
+
+    Nothing is re-embedded. Existing ids are overwritten, so importing into
+    a non-empty collection (or importing twice) is harmless. Returns the
+    number of rows loaded.
+    """
+    started = time.perf_counter()
+    manifest = read_manifest(path)
+    expected = _embedding_function_name(collection)
+    if manifest.get("embedding_function") and expected and manifest["embedding_function"] != expected:
+        # Vectors from another model would silently break similarity search
+        raise SnapshotError(
+            f"Snapshot was embedded with {manifest['embedding_function']}, collection uses {expected}"
+        )
+
+    embeddings = np.load(os.path.join(path, _EMBEDDINGS), mmap_mode="r")
+    if embeddings.shape[0] != manifest["count"]:
+        raise SnapshotError(f"Snapshot has {embeddings.shape[0]} embeddings for {manifest['count']} records")
+
+    # add() skips the existence check upsert() does per id; only safe when empty
+    write = collection.add if collection.count() == 0 else collection.upsert
+    loaded = 0
+    for batch in _record_batches(path, batch_size):
+        write(
+            ids=[row["id"] for row in batch],
+            embeddings=np.ascontiguousarray(embeddings[loaded:loaded + len(batch)]),
+            documents=[row["document"] for row in batch],
+            metadatas=[row["metadata"] or None for row in batch],
+        )
+        loaded += len(batch)
+
+    if loaded != manifest["count"]:
+        raise SnapshotError(f"Snapshot has {loaded} records, manifest says {manifest['count']}")
+    print(f"📥 Restored {loaded} memories from {path} in {time.perf_counter() - started:.2f}s")
+    return loaded
+
+
+def main():
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    from chroma_local.memory_manager import get_collection
+
+    parser = argparse.ArgumentParser(description="Export or import a memories snapshot")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.action == "export":
+        export_snapshot(get_collection(), args.path, args.batch_size)
+    else:
+        import_snapshot(get_collection(), args.path, args.batch_size)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
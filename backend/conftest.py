@@ -0,0 +1,12 @@
+# pytest setup: run from backend/ with `python -m pytest -q`
+import os
+
+# Offline defaults for everything the tests import; the fakes stand in for the real APIs
+os.environ.setdefault("COHERE_API_KEY", "test")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test")
+os.environ.setdefault("TTS_CACHE_ENABLED", "0")  # every chunk must reach the fake
+os.environ.setdefault("AUDIO_STORE", "memory")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+# Manual scripts that call the real APIs, not tests
+collect_ignore = ["test.py", "test_tts.py", "test_generate_answer.py"]
@@ -0,0 +1,97 @@
+# backend/fake_redis.py
+#
+# Local stand-in for a Redis server, speaking just the RESP commands the
+# redis audio store uses (PING, AUTH, SELECT, GET, SET [EX|PX], DEL,
+# EXISTS, PTTL), so multi-worker setups can be tried without installing
+# Redis:
+#
+#   python fake_redis.py --port 6390
+#   AUDIO_STORE=redis AUDIO_STORE_URL=redis://127.0.0.1:6390/0 uvicorn main:app --workers 4
+#
+# Everything lives in this process's memory; expired keys are dropped when
+# they are next touched.
+import time
+import asyncio
+import argparse
+
+_data = {}  # key -> (value, expires_at or None)
+
+
+def _live(key):
+    entry = _data.get(key)
+    if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+        del _data[key]
+        return None
+    return entry
+
+
+def _bulk(value):
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _handle(args):
+    command = args[0].upper()
+    if command == b"PING":
+        return b"+PONG\r\n"
+    if command in (b"AUTH", b"SELECT"):
+        return b"+OK\r\n"
+    if command == b"GET":
+        entry = _live(args[1])
+        return _bulk(entry[0] if entry else None)
+    if command == b"SET":
+        expires_at = None
+        options = [arg.upper() for arg in args[3:]]
+        if b"PX" in options:
+            expires_at = time.monotonic() + int(args[3 + options.index(b"PX") + 1]) / 1000
+        elif b"EX" in options:
+            expires_at = time.monotonic() + int(args[3 + options.index(b"EX") + 1])
+        _data[args[1]] = (args[2], expires_at)
+        return b"+OK\r\n"
+    if command == b"DEL":
+        return b":%d\r\n" % sum(1 for key in args[1:] if _live(key) and _data.pop(key))
+    if command == b"EXISTS":
+        return b":%d\r\n" % sum(1 for key in args[1:] if _live(key))
+    if command == b"PTTL":
+        entry = _live(args[1])
+        if entry is None:
+            return b":-2\r\n"
+        if entry[1] is None:
+            return b":-1\r\n"
+        return b":%d\r\n" % int((entry[1] - time.monotonic()) * 1000)
+    return b"-ERR unknown command '%s'\r\n" % command
+
+
+async def _serve(reader, writer):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.startswith(b"*"):
+                writer.write(b"-ERR inline commands are not supported\r\n")
+                continue
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int((await reader.readline())[1:-2])
+                args.append((await reader.readexactly(length + 2))[:-2])
+            writer.write(_handle(args))
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def main(host, port):
+    server = await asyncio.start_server(_serve, host, port)
+    print(f"🧪 Fake Redis listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minimal in-memory Redis stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))
@@ -0,0 +1,184 @@
+# backend/fake_upstreams.py
+#
+# Local stand-ins for the Cohere and ElevenLabs APIs so the chat / TTS
+# pipeline can be exercised without API keys or credits:
+#
+#   uvicorn fake_upstreams:app --port 9100
+#   COHERE_BASE_URL=http://127.0.0.1:9100 ELEVENLABS_BASE_URL=http://127.0.0.1:9100 uvicorn main:app
+#
+# Latency, jitter, a slow tail and injected faults (error statuses, hung
+# calls, connections dropped mid-response) are set per run with
+# FAKE_UPSTREAM_* env vars, or changed live:
+#
+#   curl -X POST localhost:9100/_fake/config -H 'Content-Type: application/json' \
+#        -d '{"latency_ms": 300, "jitter_ms": 100, "error_rate": 0.05, "hang_rate": 0.01}'
+#   curl localhost:9100/_fake/stats
+#
+import os
+import json
+import random
+import asyncio
+import logging
+import hashlib
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# ⚙️ Simulated upstream behaviour (override via env or POST /_fake/config)
+BEHAVIOUR = {
+    "latency_ms": float(os.getenv("FAKE_UPSTREAM_LATENCY_MS", "50")),
+    "jitter_ms": float(os.getenv("FAKE_UPSTREAM_JITTER_MS", "0")),  # uniform +/- around latency_ms
+    "slow_rate": float(os.getenv("FAKE_UPSTREAM_SLOW_RATE", "0")),  # fraction of calls that hit the tail
+    "slow_ms": float(os.getenv("FAKE_UPSTREAM_SLOW_MS", "1000")),  # extra delay for those
+    "error_rate": float(os.getenv("FAKE_UPSTREAM_ERROR_RATE", "0")),
+    "error_status": int(os.getenv("FAKE_UPSTREAM_ERROR_STATUS", "503")),
+    "hang_rate": float(os.getenv("FAKE_UPSTREAM_HANG_RATE", "0")),  # accepted, then no answer for hang_ms
+    "hang_ms": float(os.getenv("FAKE_UPSTREAM_HANG_MS", "30000")),
+    "reset_rate": float(os.getenv("FAKE_UPSTREAM_RESET_RATE", "0")),  # connection dropped mid-response
+    "token_delay_ms": float(os.getenv("FAKE_UPSTREAM_TOKEN_DELAY_MS", "20")),
+}
+_rng = random.Random(int(os.getenv("FAKE_UPSTREAM_SEED", "1234")))
+STATS = {"calls": {}, "errors": {}, "hangs": {}, "resets": {}}
+FAKE_ANSWER = os.getenv(
+    "FAKE_UPSTREAM_ANSWER",
+    "Of course I remember that day. We walked along the river after lunch, "
+    "and your grandmother packed mango pickle with the parathas. "
+    "You were so small that I carried you most of the way back. "
+    "Those were simple times, but they were happy ones."
+)
+FAKE_MP3_BYTES_PER_CHAR = int(os.getenv("FAKE_UPSTREAM_MP3_BYTES_PER_CHAR", "160"))
+
+app = FastAPI()
+
+
+def configure(**overrides):
+    """Change BEHAVIOUR in place (the load-test harness calls this directly)."""
+    unknown = set(overrides) - set(BEHAVIOUR)
+    if unknown:
+        raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    for key, value in overrides.items():
+        BEHAVIOUR[key] = type(BEHAVIOUR[key])(value)
+    return dict(BEHAVIOUR)
+
+
+def reset_stats():
+    for counts in STATS.values():
+        counts.clear()
+
+
+async def _latency():
+    delay = BEHAVIOUR["latency_ms"] + _rng.uniform(-1, 1) * BEHAVIOUR["jitter_ms"]
+    if _rng.random() < BEHAVIOUR["slow_rate"]:
+        delay += BEHAVIOUR["slow_ms"]
+    await asyncio.sleep(max(0.0, delay) / 1000)
+
+
+def _count(kind, endpoint):
+    STATS[kind][endpoint] = STATS[kind].get(endpoint, 0) + 1
+
+
+class _DroppedConnection(Exception):
+    pass
+
+
+class _QuietResets(logging.Filter):
+    # uvicorn logs a traceback for every injected reset; they're expected here
+    def filter(self, record):
+        return not (record.exc_info and isinstance(record.exc_info[1], _DroppedConnection))
+
+
+logging.getLogger("uvicorn.error").addFilter(_QuietResets())
+
+
+async def _truncated_body():
+    yield b'{"partial": '
+    raise _DroppedConnection("injected reset")  # the server closes the socket mid-body
+
+
+async def _injected_fault(endpoint):
+    """Count the call, maybe hang it; return an error or broken response for the configured share."""
+    _count("calls", endpoint)
+    if _rng.random() < BEHAVIOUR["hang_rate"]:
+        _count("hangs", endpoint)
+        await asyncio.sleep(BEHAVIOUR["hang_ms"] / 1000)
+    if _rng.random() < BEHAVIOUR["reset_rate"]:
+        _count("resets", endpoint)
+        return StreamingResponse(_truncated_body(), media_type="application/json")
+    if _rng.random() >= BEHAVIOUR["error_rate"]:
+        return None
+    _count("errors", endpoint)
+    status = BEHAVIOUR["error_status"]
+    headers = {"Retry-After": "1"} if status in (429, 503) else None
+    return JSONResponse({"message": "injected failure"}, status_code=status, headers=headers)
+
+
+def _tokens(text):
+    # Cohere streams word-ish deltas with their leading whitespace attached
+    words = text.split(" ")
+    return [words[0]] + [" " + w for w in words[1:]]
+
+
+@app.post("/v1/chat")
+async def chat(request: Request):
+    body = await request.json()
+    await _latency()
+    error = await _injected_fault("chat")
+    if error is not None:
+        return error
+
+    if not body.get("stream"):
+        return {"text": FAKE_ANSWER, "generation_id": "fake"}
+
+    async def events():
+        yield json.dumps({"is_finished": False, "event_type": "stream-start", "generation_id": "fake"}) + "\n"
+        for token in _tokens(FAKE_ANSWER):
+            await asyncio.sleep(BEHAVIOUR["token_delay_ms"] / 1000)
+            yield json.dumps({"is_finished": False, "event_type": "text-generation", "text": token}) + "\n"
+        yield json.dumps({
+            "is_finished": True,
+            "event_type": "stream-end",
+            "finish_reason": "COMPLETE",
+            "response": {"text": FAKE_ANSWER}
+        }) + "\n"
+
+    return StreamingResponse(events(), media_type="application/stream+json")
+
+
+@app.post("/v1/summarize")
+async def summarize(request: Request):
+    body = await request.json()
+    await _latency()
+    error = await _injected_fault("summarize")
+    if error is not None:
+        return error
+    text = body.get("text", "")
+    return {"id": "fake", "summary": " ".join(text.split()[:30])}
+
+
+@app.post("/v1/text-to-speech/{voice_id}")
+async def text_to_speech(voice_id: str, request: Request):
+    body = await request.json()
+    text = body.get("text", "")
+    await _latency()
+    error = await _injected_fault("text_to_speech")
+    if error is not None:
+        return error
+
+    # Deterministic pseudo-MP3: ID3 tag followed by bytes derived from the text
+    seed = hashlib.sha256(f"{voice_id}:{text}".encode()).digest()
+    size = max(len(text), 1) * FAKE_MP3_BYTES_PER_CHAR
+    payload = (seed * (size // len(seed) + 1))[:size]
+    return Response(content=b"ID3" + payload, media_type="audio/mpeg")
+
+
+@app.post("/_fake/config")
+async def set_config(request: Request):
+    try:
+        return configure(**(await request.json()))
+    except (TypeError, ValueError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+
+@app.get("/_fake/stats")
+async def get_stats():
+    return {"behaviour": BEHAVIOUR, **STATS}
@@ -0,0 +1,188 @@
+# backend/fault_drill.py
+#
+# Checks the upstream resilience layer (routes/resilience.py) against the
+# fault-injecting fake upstreams, in-process and offline:
+#
+#   python fault_drill.py
+#   python fault_drill.py --only breaker hedging --out drill.json
+#
+# Each drill configures fake_upstreams (errors, hangs, dropped connections,
+# a slow tail or a full outage), calls the real Cohere / ElevenLabs clients
+# and checks the outcome: retries recover transient failures, deadlines cut
+# hung calls short, hedging trims the slow tail, and the circuit breaker
+# fails fast during an outage and closes once the upstream recovers. Exits
+# non-zero if any check fails.
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+DRILLS = ["retries", "resets", "attempt_timeout", "deadline", "hedging", "breaker"]
+
+
+def _check(results, name, ok, **measured):
+    results.append({"check": name, "ok": bool(ok), **measured})
+    print(f"{'✅' if ok else '❌'} {name} {json.dumps(measured)}", flush=True)
+
+
+def _reset(fakes, *upstreams, **behaviour):
+    fakes.configure(**{**BASELINE, **behaviour})
+    fakes.reset_stats()
+    for upstream in upstreams:
+        upstream.breaker.success()
+        upstream.breaker._outcomes.clear()
+        upstream._latencies.clear()
+
+
+BASELINE = dict(latency_ms=30, jitter_ms=10, slow_rate=0.0, slow_ms=1000, error_rate=0.0, error_status=503,
+                hang_rate=0.0, hang_ms=30000, reset_rate=0.0, token_delay_ms=5)
+
+
+async def _timed(coro):
+    started = time.perf_counter()
+    try:
+        return await coro, time.perf_counter() - started
+    except Exception as e:
+        return e, time.perf_counter() - started
+
+
+async def drill_retries(fakes, results):
+    from routes.elevenlabs_client import ELEVENLABS, text_to_speech
+    _reset(fakes, ELEVENLABS, error_rate=0.3, error_status=503)
+    outcomes = await asyncio.gather(*(_timed(text_to_speech(f"retry drill {i}", retries=3)) for i in range(40)))
+    ok = sum(1 for result, _ in outcomes if isinstance(result, bytes))
+    _check(results, "retries recover 30% 503s", ok >= 38, succeeded=ok, of=40,
+           upstream_errors=fakes.STATS["errors"].get("text_to_speech", 0))
+
+
+async def drill_resets(fakes, results):
+    from routes.elevenlabs_client import ELEVENLABS, text_to_speech
+    _reset(fakes, ELEVENLABS, reset_rate=0.3)
+    outcomes = await asyncio.gather(*(_timed(text_to_speech(f"reset drill {i}", retries=3)) for i in range(40)))
+    ok = sum(1 for result, _ in outcomes if isinstance(result, bytes))
+    _check(results, "retries recover dropped connections", ok >= 38, succeeded=ok, of=40,
+           resets=fakes.STATS["resets"].get("text_to_speech", 0))
+
+
+async def drill_attempt_timeout(fakes, results):
+    from routes.elevenlabs_client import ELEVENLABS, text_to_speech
+    _reset(fakes, ELEVENLABS, hang_rate=0.2, hang_ms=10000)
+    saved, ELEVENLABS.attempt_timeout = ELEVENLABS.attempt_timeout, 1.0
+    try:
+        outcomes = await asyncio.gather(*(_timed(text_to_speech(f"hang drill {i}", retries=3)) for i in range(30)))
+    finally:
+        ELEVENLABS.attempt_timeout = saved
+    ok = sum(1 for result, _ in outcomes if isinstance(result, bytes))
+    slowest = max(seconds for _, seconds in outcomes)
+    _check(results, "hung calls time out and are retried", ok >= 29 and slowest < 5, succeeded=ok, of=30,
+           slowest_s=round(slowest, 2), hangs=fakes.STATS["hangs"].get("text_to_speech", 0))
+
+
+async def drill_deadline(fakes, results):
+    from routes.cohere_client import COHERE, generate_answer
+    from routes.resilience import deadline, DeadlineExceeded
+    _reset(fakes, COHERE, hang_rate=1.0, hang_ms=10000)
+    with deadline(1.0):
+        result, seconds = await _timed(generate_answer("deadline drill"))
+    _check(results, "request deadline bounds a hung call", isinstance(result, DeadlineExceeded) and seconds < 1.5,
+           raised=type(result).__name__, seconds=round(seconds, 2))
+
+
+async def drill_hedging(fakes, results):
+    from routes.elevenlabs_client import ELEVENLABS, text_to_speech
+
+    async def run(hedge):
+        _reset(fakes, ELEVENLABS, slow_rate=0.1, slow_ms=1500)
+        ELEVENLABS.hedge = hedge
+        # A known-good latency history, so the p95 hedge delay isn't itself in the slow tail
+        ELEVENLABS._latencies.extend([BASELINE["latency_ms"] / 1000] * ELEVENLABS._latencies.maxlen)
+        timings = []
+        for batch in range(20):
+            outcomes = await asyncio.gather(*(_timed(text_to_speech(f"hedge {hedge} {batch} {i}")) for i in range(6)))
+            timings += [seconds for _, seconds in outcomes]
+        timings.sort()
+        return {q: round(timings[int(q / 100 * (len(timings) - 1))], 3) for q in (50, 95, 99)}
+
+    saved = ELEVENLABS.hedge
+    try:
+        plain = await run(False)
+        hedged = await run(True)
+    finally:
+        ELEVENLABS.hedge = saved
+    _check(results, "hedging trims the slow tail", hedged[95] < 0.5 * plain[95], plain_s=plain, hedged_s=hedged,
+           hedges=ELEVENLABS.stats()["hedged"], hedge_wins=ELEVENLABS.stats()["hedge_wins"])
+
+
+async def drill_breaker(fakes, results):
+    from routes.cohere_client import COHERE, generate_answer
+    from routes.resilience import CircuitOpen
+    saved = COHERE.breaker.open_seconds
+    COHERE.breaker.open_seconds = 1.0
+    try:
+        _reset(fakes, COHERE, error_rate=1.0, error_status=500)
+        for i in range(COHERE.breaker.failures):
+            await _timed(generate_answer(f"outage {i}"))
+        calls_before = fakes.STATS["calls"].get("chat", 0)
+        result, seconds = await _timed(generate_answer("while open"))
+        _check(results, "open circuit fails fast without calling upstream",
+               isinstance(result, CircuitOpen) and seconds < 0.05
+               and fakes.STATS["calls"].get("chat", 0) == calls_before,
+               raised=type(result).__name__, ms=round(1000 * seconds, 2), state=COHERE.breaker.state)
+
+        fakes.configure(error_rate=0.0)
+        await asyncio.sleep(1.1)
+        result, _ = await _timed(generate_answer("probe"))
+        _check(results, "circuit closes after a successful probe",
+               isinstance(result, str) and COHERE.breaker.state == "closed",
+               result=type(result).__name__, state=COHERE.breaker.state)
+    finally:
+        COHERE.breaker.open_seconds = saved
+
+
+async def run(drills):
+    import fake_upstreams
+    results = []
+    for name in drills:
+        await globals()[f"drill_{name}"](fake_upstreams, results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check retries, deadlines, hedging and the circuit breaker")
+    parser.add_argument("--only", nargs="+", choices=DRILLS, default=DRILLS)
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args()
+
+    backend = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, backend)
+    from loadtest import _ServerThread, _free_port
+
+    port = _free_port()
+    os.environ.update({
+        "COHERE_BASE_URL": f"http://127.0.0.1:{port}",
+        "ELEVENLABS_BASE_URL": f"http://127.0.0.1:{port}",
+        "COHERE_API_KEY": "drill",
+        "ELEVENLABS_API_KEY": "drill",
+        "TTS_CACHE_ENABLED": "0",  # every call must reach the fake
+        "LOG_LEVEL": "WARNING",
+    })
+    import fake_upstreams
+    server = _ServerThread(fake_upstreams.app, port)
+    server.start()
+    try:
+        results = asyncio.run(run(args.only))
+    finally:
+        server.stop()
+
+    failed = [r["check"] for r in results if not r["ok"]]
+    print(f"\n{len(results) - len(failed)}/{len(results)} checks passed")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
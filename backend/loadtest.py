@@ -0,0 +1,408 @@
+# backend/loadtest.py
+#
+# Offline load test. The app and the fake Cohere/ElevenLabs upstreams
+# (fake_upstreams.py) run in this process on local ports; a closed-loop
+# driver keeps --concurrency requests in flight per scenario:
+#
+#   python loadtest.py --scenarios chat chat_stream audio train --concurrency 8 --duration 20
+#   python loadtest.py --latency-ms 300 --jitter-ms 100 --error-rate 0.02 --slow-rate 0.01
+#   python loadtest.py --hang-rate 0.02 --hang-ms 20000 --reset-rate 0.01
+#   python loadtest.py --env STT_WORKERS=2 --fixtures ./wavs --scenarios voice_chat transcribe
+#   python loadtest.py --compare bench_results/<earlier run>.json
+#
+# Each run is saved as JSON under bench_results/ (or --out): throughput,
+# latency percentiles, time to first audio byte for the streaming
+# scenarios, upstream calls, CPU time and peak RSS, plus the git commit and
+# settings, so runs can be compared across changes. CPU and RSS are for
+# this whole process (app + fakes + driver); process-pool STT workers are
+# not included. /voice-chat and /transcribe need a Vosk model. Without
+# --fixtures, synthetic WAVs are generated. --embedder hash avoids
+# downloading the embedding model.
+import os
+import io
+import sys
+import json
+import time
+import wave
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import resource
+import statistics
+import threading
+import contextlib
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+
+SCENARIOS = ["chat", "chat_stream", "voice_chat", "transcribe", "train", "audio"]
+
+QUESTIONS = [
+    "What did we do at the river when I was small?",
+    "Tell me about grandmother's kitchen",
+    "Do you remember the train journey to Shimla?",
+    "What happened at the harvest festival?",
+]
+WORDS = "grandmother village monsoon train wedding school river festival letter harvest market temple".split()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _ServerThread:
+    """A uvicorn server on its own event loop in a background thread."""
+
+    def __init__(self, app, port):
+        import uvicorn
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self, timeout=120):
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+def synthetic_wavs(seconds=(1.0, 3.0, 8.0), rate=16000):
+    """Speech-like fixtures: tone bursts with noise between short pauses (not real words)."""
+    rng = np.random.default_rng(5)
+    fixtures = []
+    for duration in seconds:
+        t = np.arange(int(duration * rate)) / rate
+        envelope = (np.sin(2 * np.pi * 2.5 * t) > -0.3).astype(np.float32)
+        signal = envelope * (0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(t.size))
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(rate)
+            w.writeframes((signal * 32767).astype("<i2").tobytes())
+        fixtures.append((f"synthetic_{duration:g}s.wav", buf.getvalue()))
+    return fixtures
+
+
+def load_wavs(directory):
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(".wav"))
+    if not names:
+        raise SystemExit(f"No .wav files in {directory}")
+    fixtures = []
+    for name in names:
+        with open(os.path.join(directory, name), "rb") as f:
+            fixtures.append((name, f.read()))
+    return fixtures
+
+
+def story(i):
+    rng = random.Random(i)
+    return f"Memory {i}: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(60, 200))) + "."
+
+
+# ---- scenarios: each returns {"ok", "status"} and optionally "first_byte" ----
+
+async def _read_stream(client, url, headers=None):
+    first_byte = None
+    async with client.stream("GET", url, headers=headers) as response:
+        async for chunk in response.aiter_bytes():
+            if first_byte is None and chunk:
+                first_byte = time.perf_counter()
+    return response.status_code, first_byte
+
+
+async def scenario_chat(client, ctx, i):
+    r = await client.post("/chat", json={"question": f"{QUESTIONS[i % len(QUESTIONS)]} ({i})"})
+    return {"ok": r.status_code == 200 and r.json().get("status") == "success", "status": r.status_code}
+
+
+async def scenario_chat_stream(client, ctx, i):
+    r = await client.post("/chat", json={"question": f"{QUESTIONS[i % len(QUESTIONS)]} ({i})", "stream": True})
+    body = r.json()
+    if r.status_code != 200 or body.get("status") != "success":
+        return {"ok": False, "status": r.status_code}
+    status, first_byte = await _read_stream(client, body["data"]["audio_url"])
+    return {"ok": status == 200 and first_byte is not None, "status": status, "first_byte": first_byte}
+
+
+async def scenario_voice_chat(client, ctx, i):
+    name, data = ctx["wavs"][i % len(ctx["wavs"])]
+    r = await client.post("/voice-chat", files={"audio": (name, data, "audio/wav")})
+    return {"ok": r.status_code == 200 and r.json().get("status") == "success", "status": r.status_code}
+
+
+async def scenario_transcribe(client, ctx, i):
+    name, data = ctx["wavs"][i % len(ctx["wavs"])]
+    r = await client.post("/transcribe", files={"file": (name, data, "audio/wav")})
+    return {"ok": r.status_code == 200 and "transcript" in r.json(), "status": r.status_code}
+
+
+async def scenario_train(client, ctx, i):
+    r = await client.post("/train", json={"text": story(ctx["train_offset"] + i), "tags": ["loadtest"]})
+    return {"ok": r.status_code == 200 and r.json().get("status") == "success", "status": r.status_code}
+
+
+async def scenario_audio(client, ctx, i):
+    # Replays, every other one a seek (Range request) like a browser's <audio>
+    url = ctx["audio_urls"][i % len(ctx["audio_urls"])]
+    headers = {"Range": "bytes=4096-"} if i % 2 else None
+    status, first_byte = await _read_stream(client, url, headers)
+    return {"ok": status in (200, 206), "status": status, "first_byte": first_byte}
+
+
+SCENARIO_FUNCTIONS = {name: globals()[f"scenario_{name}"] for name in SCENARIOS}
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def at(fraction):
+        return round(1000 * ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+
+    return {
+        "p50": at(0.50), "p90": at(0.90), "p95": at(0.95), "p99": at(0.99),
+        "max": round(1000 * ordered[-1], 2), "mean": round(1000 * statistics.mean(ordered), 2),
+    }
+
+
+async def run_scenario(client, name, ctx, args, fakes):
+    fn = SCENARIO_FUNCTIONS[name]
+    outcomes = []
+    issued = 0
+    stop_at = time.perf_counter() + args.duration
+
+    async def worker():
+        nonlocal issued
+        while time.perf_counter() < stop_at and (args.requests is None or issued < args.requests):
+            i = issued
+            issued += 1
+            started = time.perf_counter()
+            try:
+                outcome = await fn(client, ctx, i)
+            except Exception as e:
+                outcome = {"ok": False, "status": type(e).__name__}
+            outcome["latency"] = time.perf_counter() - started
+            if outcome.get("first_byte") is not None:
+                outcome["ttfa"] = outcome["first_byte"] - started
+            outcomes.append(outcome)
+
+    fakes.reset_stats()
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - wall_started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    ok = [o for o in outcomes if o["ok"]]
+    errors = {}
+    for o in outcomes:
+        if not o["ok"]:
+            errors[str(o["status"])] = errors.get(str(o["status"]), 0) + 1
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    rss_kb = usage_after.ru_maxrss / (1024 if sys.platform == "darwin" else 1)  # bytes on macOS, KiB elsewhere
+    return {
+        "requests": len(outcomes),
+        "ok": len(ok),
+        "error_rate": round(1 - len(ok) / len(outcomes), 4) if outcomes else 0.0,
+        "errors": errors,
+        "seconds": round(wall, 2),
+        "throughput_rps": round(len(ok) / wall, 2) if wall else 0.0,
+        "latency_ms": _percentiles([o["latency"] for o in ok]),
+        "ttfa_ms": _percentiles([o["ttfa"] for o in ok if "ttfa" in o]),
+        "upstream_calls": dict(fakes.STATS["calls"]),
+        "upstream_errors": dict(fakes.STATS["errors"]),
+        "upstream_faults": {"hangs": dict(fakes.STATS["hangs"]), "resets": dict(fakes.STATS["resets"])},
+        "cpu_seconds": round(cpu, 2),
+        "cpu_percent": round(100 * cpu / wall, 1) if wall else 0.0,
+        "peak_rss_mb": round(rss_kb / 1024, 1),
+    }
+
+
+async def prepare(client, scenarios, ctx):
+    """Seed a few memories and some finished answers to replay."""
+    ctx["train_offset"] = 1_000_000
+    r = await client.post("/train/batch", json={"items": [{"text": story(i)} for i in range(20)], "summarize": False})
+    if r.status_code != 200:
+        print(f"⚠️ Seeding memories failed: {r.status_code} {r.text[:200]}")
+    if "audio" in scenarios:
+        ctx["audio_urls"] = []
+        for i in range(4):
+            r = await client.post("/chat", json={"question": f"{QUESTIONS[i]} (replay {i})"})
+            if r.status_code == 200 and r.json().get("status") == "success":
+                ctx["audio_urls"].append(r.json()["data"]["audio_url"])
+        if not ctx["audio_urls"]:
+            raise SystemExit("Couldn't produce any audio to replay; is /chat working?")
+
+
+async def drive(args, app_port, fakes, ctx):
+    import httpx
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", timeout=args.timeout, limits=limits) as client:
+        deadline = time.monotonic() + 120
+        while (await client.get("/readyz")).status_code != 200:
+            if time.monotonic() > deadline:
+                print("⚠️ /readyz never went green; running anyway")
+                break
+            await asyncio.sleep(0.2)
+        await prepare(client, args.scenarios, ctx)
+        results = {}
+        for name in args.scenarios:
+            print(f"▶️ {name}: {args.concurrency} concurrent for {args.duration}s", file=sys.__stdout__, flush=True)
+            results[name] = await run_scenario(client, name, ctx, args, fakes)
+        return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(old, new):
+    """Print scenario metrics side by side with the relative change."""
+    metrics = [
+        ("throughput_rps", lambda r: r["throughput_rps"]),
+        ("error_rate", lambda r: r["error_rate"]),
+        ("latency_p50_ms", lambda r: (r["latency_ms"] or {}).get("p50")),
+        ("latency_p95_ms", lambda r: (r["latency_ms"] or {}).get("p95")),
+        ("latency_p99_ms", lambda r: (r["latency_ms"] or {}).get("p99")),
+        ("ttfa_p50_ms", lambda r: (r["ttfa_ms"] or {}).get("p50")),
+        ("ttfa_p95_ms", lambda r: (r["ttfa_ms"] or {}).get("p95")),
+        ("cpu_seconds", lambda r: r["cpu_seconds"]),
+        ("peak_rss_mb", lambda r: r["peak_rss_mb"]),
+    ]
+    print(f"\n📊 {old['meta'].get('commit')} ({old['meta']['started_at']}) → "
+          f"{new['meta'].get('commit')} ({new['meta']['started_at']})")
+    for name in new["scenarios"]:
+        if name not in old["scenarios"]:
+            continue
+        print(f"\n  {name}")
+        for label, get in metrics:
+            before, after = get(old["scenarios"][name]), get(new["scenarios"][name])
+            if before is None or after is None:
+                continue
+            change = f"{100 * (after - before) / before:+.1f}%" if before else "n/a"
+            print(f"    {label:<16} {before:>10} → {after:<10} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the app in-process against fake upstreams")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=["chat", "chat_stream", "train", "audio"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15, help="seconds per scenario")
+    parser.add_argument("--requests", type=int, help="stop each scenario after this many requests")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=1000)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-ms", type=float, default=30000)
+    parser.add_argument("--reset-rate", type=float, default=0.0)
+    parser.add_argument("--token-delay-ms", type=float, default=15)
+    parser.add_argument("--fixtures", help="directory of .wav files for voice_chat / transcribe")
+    parser.add_argument("--embedder", choices=["default", "hash"], default="default")
+    parser.add_argument("--tts-cache", action="store_true", help="leave the TTS cache on (off by default)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="app setting for this run")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output")
+    parser.add_argument("--out", help="results file (default: bench_results/<time>_<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    backend = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, backend)
+    fake_port, app_port = _free_port(), _free_port()
+
+    # App settings must be in place before main is imported (.env never overrides these)
+    app_env = {
+        "COHERE_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "ELEVENLABS_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "COHERE_API_KEY": "loadtest",
+        "ELEVENLABS_API_KEY": "loadtest",
+        "CHROMA_PERSIST_DIR": "",  # never touch a real memory store
+        "TTS_CACHE_ENABLED": "1" if args.tts_cache else "0",
+        "CHAT_COALESCE_GRACE_SECONDS": "0",
+        "LOG_LEVEL": "WARNING",
+    }
+    for item in args.env:
+        key, _, value = item.partition("=")
+        app_env[key] = value
+    os.environ.update(app_env)
+
+    if args.embedder == "hash":
+        import chromadb.utils.embedding_functions as embedding_functions
+        from chroma_local.bench_retrieval import HashEmbedding
+        embedding_functions.DefaultEmbeddingFunction = HashEmbedding
+
+    import fake_upstreams
+    fake_upstreams.configure(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, slow_rate=args.slow_rate, slow_ms=args.slow_ms,
+        error_rate=args.error_rate, error_status=args.error_status, token_delay_ms=args.token_delay_ms,
+        hang_rate=args.hang_rate, hang_ms=args.hang_ms, reset_rate=args.reset_rate,
+    )
+    ctx = {"wavs": load_wavs(args.fixtures) if args.fixtures else synthetic_wavs()}
+
+    started_at = datetime.now(timezone.utc)
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with quiet:
+        import main as app_module
+        fakes = _ServerThread(fake_upstreams.app, fake_port)
+        app = _ServerThread(app_module.app, app_port)
+        fakes.start()
+        app.start()
+        try:
+            results = asyncio.run(drive(args, app_port, fake_upstreams, ctx))
+        finally:
+            app.stop()
+            fakes.stop()
+
+    report = {
+        "meta": {
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            **{key: value for key, value in vars(args).items() if key not in ("out", "compare", "verbose")},
+            "app_env": {key: value for key, value in app_env.items() if not key.endswith("_API_KEY")},
+            "fake_upstreams": dict(fake_upstreams.BEHAVIOUR),
+            "fixtures": [name for name, _ in ctx["wavs"]],
+        },
+        "scenarios": results,
+    }
+    print(json.dumps(report["scenarios"], indent=2))
+
+    out = args.out or os.path.join(
+        "bench_results", f"{started_at.strftime('%Y%m%d-%H%M%S')}_{report['meta']['commit'] or 'nogit'}.json"
+    )
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Saved {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import time
+_import_started = time.perf_counter()  # ⏱️ startup cost of importing the app
 import os
+import asyncio
 from dotenv import load_dotenv
 load_dotenv() 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes.train_route import router as train_router
@@ -9,8 +13,56 @@ from routes.audio_route import router as audio_router  # ✅ Audio: streaming MP
 from routes import transcribe_route
 from routes.voice_chat_route import router as voice_chat_router
 from routes.memories_route import router as memories_router
+from routes.stats_route import router as stats_router
+from routes.admission_route import router as admission_router
+from routes.admission import AdmissionControl
+from routes.resilience import RequestDeadline
+from routes.http_clients import open_clients, close_clients
+from routes.transcription_pool import TRANSCRIPTION_POOL
+from routes.ingest_jobs import INGEST_QUEUE
+from routes.health_route import router as health_router, warm_up, record_import_time
+from routes.telemetry import RequestTimer, setup_logging, shutdown_logging, setup_tracing, shutdown_tracing
 
-app = FastAPI()
+# Warm up in the background so /healthz answers immediately; /readyz flips once done
+WARMUP_IN_BACKGROUND = os.getenv("WARMUP_IN_BACKGROUND", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 📈 Structured logs go through a queue; traces export in the background (OTEL_ENABLED=1)
+    setup_logging()
+    setup_tracing()
+    # 🔌 One pooled keep-alive client per upstream for the app's lifetime
+    await open_clients()
+    # 📚 Background training jobs (/train with background=true)
+    INGEST_QUEUE.start()
+    # 🔥 Heavy resources (Chroma, embeddings, Vosk models) load here, not at import; the
+    # 🎙️ Vosk worker pool starts once the model has been found (or downloaded) in this process
+    warmup_task = None
+    if WARMUP_IN_BACKGROUND:
+        warmup_task = asyncio.create_task(warm_up())
+    else:
+        await warm_up()
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await INGEST_QUEUE.shutdown()
+    TRANSCRIPTION_POOL.shutdown()
+    await close_clients()
+    shutdown_tracing()
+    shutdown_logging()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# ⏱️ Per-route latency histograms for /metrics
+app.add_middleware(RequestTimer)
+
+# 🚦 Per-route concurrency limits; excess requests get 429/503 + Retry-After before their body is read
+app.add_middleware(AdmissionControl)
+
+# ⏳ End-to-end deadline for /chat and /voice-chat, passed down to every upstream call
+app.add_middleware(RequestDeadline)
 
 # ✅ Add CORS middleware
 app.add_middleware(
@@ -33,9 +85,11 @@ app.include_router(audio_router)  # ✅ New: streaming endpoint
 app.include_router(transcribe_route.router)
 app.include_router(voice_chat_router)
 app.include_router(memories_router)
+app.include_router(stats_router)
+app.include_router(admission_router)
+app.include_router(health_router)
 
-for route in app.routes:
-    print(f"ROUTE: {route.path} [{route.methods}]")
+record_import_time(time.perf_counter() - _import_started)
 
 if __name__ == "__main__":
     import uvicorn
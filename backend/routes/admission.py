@@ -0,0 +1,231 @@
+import os
+import math
+import time
+import asyncio
+import secrets
+from collections import deque
+
+from fastapi.responses import JSONResponse
+
+from routes.telemetry import HistogramFamily, CounterFamily, log_event
+
+# ⚙️ Admission control (override via .env)
+# Every limiter reads ADMISSION_<NAME>_LIMIT / _QUEUE / _TIMEOUT_SECONDS, e.g.
+# ADMISSION_COHERE_LIMIT=8. A limit of 0 turns that limiter off.
+ADMISSION_ADMIN_TOKEN = os.getenv("ADMISSION_ADMIN_TOKEN", "")  # unset: no runtime changes
+
+ADMISSION_WAIT = HistogramFamily(
+    "swarsmriti_admission_wait_seconds", "Time spent queued for a concurrency slot.", "limiter"
+)
+ADMISSION_SHED = CounterFamily(
+    "swarsmriti_admission_shed_total", "Work turned away because a queue was full or its deadline passed.", "limiter"
+)
+
+
+class Overloaded(Exception):
+    """A limiter turned work away; answer ``status_code`` with Retry-After."""
+
+    def __init__(self, message, status_code=429, retry_after=1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def overloaded_response(error, body_key="message"):
+    content = {"error": str(error)} if body_key == "error" else {"status": "error", "message": str(error)}
+    return JSONResponse(status_code=error.status_code, content=content,
+                        headers={"Retry-After": str(error.retry_after)})
+
+
+class Limiter:
+    """At most ``limit`` holders at a time; others wait in FIFO order.
+
+    Up to ``max_queue`` callers may wait, each for at most ``queue_timeout``
+    seconds. A full queue raises Overloaded with 429 straight away; a wait
+    that runs past its deadline raises Overloaded with 503. Retry-After is
+    the queue timeout, long enough for the current queue to drain. All three
+    settings can be changed while running (``configure``); raising the limit
+    admits waiters at once, lowering it lets current holders finish.
+    Use as ``async with limiter:``. Not thread-safe: one event loop only.
+    """
+
+    def __init__(self, name, limit, max_queue, queue_timeout):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._inflight = 0
+        self._waiters = deque()
+
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def retry_after(self):
+        return max(1, math.ceil(self.queue_timeout))
+
+    def configure(self, limit=None, max_queue=None, queue_timeout=None):
+        if limit is not None:
+            self.limit = max(0, int(limit))
+        if max_queue is not None:
+            self.max_queue = max(0, int(max_queue))
+        if queue_timeout is not None:
+            self.queue_timeout = max(0.0, float(queue_timeout))
+        log_event("admission_configured", limiter=self.name, limit=self.limit,
+                  max_queue=self.max_queue, queue_timeout=self.queue_timeout)
+        self._wake()
+
+    def _has_room(self):
+        return self.limit <= 0 or self._inflight < self.limit
+
+    def _wake(self):
+        while self._waiters and self._has_room():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._inflight += 1  # the slot is handed straight to the waiter
+                waiter.set_result(None)
+
+    def _shed(self, message, status_code):
+        ADMISSION_SHED.inc(self.name)
+        log_event("admission_shed", limiter=self.name, status=status_code,
+                  inflight=self._inflight, queued=len(self._waiters))
+        return Overloaded(message, status_code, self.retry_after)
+
+    def try_acquire(self):
+        """Take a slot only if one is free right now."""
+        if self._has_room() and not self._waiters:
+            self._inflight += 1
+            self.admitted += 1
+            return True
+        return False
+
+    async def acquire(self, timeout=None):
+        """Wait for a slot; ``timeout`` (e.g. what's left of a request deadline) can only shorten the wait."""
+        if self._has_room() and not self._waiters:
+            self._inflight += 1
+            self.admitted += 1
+            ADMISSION_WAIT.observe(self.name, 0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise self._shed(f"Too many {self.name} requests in flight; try again shortly", 429)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued_total += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout if timeout is None else min(self.queue_timeout, timeout))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timed_out += 1
+            raise self._shed(f"Timed out waiting for a {self.name} slot", 503) from None
+        finally:
+            ADMISSION_WAIT.observe(self.name, time.perf_counter() - started)
+        self.admitted += 1
+
+    def release(self):
+        self._inflight -= 1
+        self._wake()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "inflight": self._inflight,
+            "queued": len(self._waiters),
+            "saturation": round(self._inflight / self.limit, 4) if self.limit > 0 else 0.0,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+LIMITERS = {}
+
+
+def register_limiter(name, limit, max_queue, queue_timeout):
+    """Create the limiter ``name``, letting ADMISSION_<NAME>_* settings override the defaults."""
+    prefix = f"ADMISSION_{name.upper()}"
+    limiter = Limiter(
+        name,
+        int(os.getenv(f"{prefix}_LIMIT", str(limit))),
+        int(os.getenv(f"{prefix}_QUEUE", str(max_queue))),
+        float(os.getenv(f"{prefix}_TIMEOUT_SECONDS", str(queue_timeout))),
+    )
+    LIMITERS[name] = limiter
+    return limiter
+
+
+# Whole requests, per route (upstream limiters live with their clients)
+ROUTE_LIMITERS = {
+    ("POST", "/chat"): register_limiter("chat", 64, 64, 5.0),
+    ("POST", "/voice-chat"): register_limiter("voice_chat", 16, 16, 5.0),
+    ("POST", "/transcribe"): register_limiter("transcribe", 32, 32, 5.0),
+    ("POST", "/train"): register_limiter("train", 8, 16, 10.0),
+}
+ROUTE_LIMITERS[("POST", "/train/batch")] = ROUTE_LIMITERS[("POST", "/train")]
+
+
+class AdmissionControl:
+    """ASGI middleware: route limits are checked before the body is read, so shedding is cheap."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http":
+            limiter = ROUTE_LIMITERS.get((scope["method"], scope["path"].rstrip("/") or "/"))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            await overloaded_response(e)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+def check_admin_token(token):
+    return bool(ADMISSION_ADMIN_TOKEN) and secrets.compare_digest(token or "", ADMISSION_ADMIN_TOKEN)
+
+
+def exposition():
+    """Admission gauges and counters in the Prometheus text format."""
+    lines = ADMISSION_WAIT.exposition() + ADMISSION_SHED.exposition()
+    gauges = [
+        ("swarsmriti_admission_inflight", "Slots currently held.", "inflight"),
+        ("swarsmriti_admission_queued", "Callers waiting for a slot.", "queued"),
+        ("swarsmriti_admission_limit", "Configured concurrency limit (0 = unlimited).", "limit"),
+    ]
+    snapshot = {name: limiter.stats() for name, limiter in sorted(LIMITERS.items())}
+    for metric, help_text, key in gauges:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+        lines += [f'{metric}{{limiter="{name}"}} {stats[key]}' for name, stats in snapshot.items()]
+    return lines
@@ -0,0 +1,35 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from routes.admission import LIMITERS, check_admin_token
+
+router = APIRouter()
+
+
+class LimitUpdate(BaseModel):
+    limit: Optional[int] = None  # 0 = unlimited
+    max_queue: Optional[int] = None
+    queue_timeout: Optional[float] = None  # seconds
+
+
+@router.get("/admission/stats")
+async def get_admission_stats():
+    return {"status": "success", "data": {name: limiter.stats() for name, limiter in sorted(LIMITERS.items())}}
+
+
+@router.put("/admission/limits/{name}")
+async def update_limit(name: str, data: LimitUpdate, x_admin_token: Optional[str] = Header(default=None)):
+    # Applies to this worker process only; .env settings come back on restart
+    if not check_admin_token(x_admin_token):
+        return JSONResponse(
+            status_code=403,
+            content={"status": "error", "message": "Set ADMISSION_ADMIN_TOKEN and send it as X-Admin-Token"}
+        )
+    limiter = LIMITERS.get(name)
+    if limiter is None:
+        return JSONResponse(status_code=404, content={"status": "error", "message": f"Unknown limiter {name}"})
+    limiter.configure(**data.model_dump())
+    return {"status": "success", "data": limiter.stats()}
@@ -0,0 +1,203 @@
+import os
+import shutil
+import struct
+import asyncio
+import tempfile
+
+import numpy as np
+
+from routes.telemetry import span
+
+# ⚙️ Upload handling (override via .env)
+AUDIO_SPOOL_MAX_BYTES = int(os.getenv("AUDIO_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+AUDIO_MAX_UPLOAD_BYTES = int(os.getenv("AUDIO_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+
+TARGET_SAMPLE_RATE = 16000
+_READ_CHUNK = 1024 * 1024
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioDecodeError(ValueError):
+    """The upload is not audio we can decode."""
+
+
+class UploadTooLarge(ValueError):
+    """The upload is bigger than AUDIO_MAX_UPLOAD_BYTES."""
+
+
+async def read_upload(upload):
+    """Read an UploadFile into memory, spilling to disk only past AUDIO_SPOOL_MAX_BYTES.
+
+    Returns ``(data, spill_file)``: ``data`` is a bytearray, or a read-only
+    memory map of ``spill_file`` for large uploads. Close ``spill_file``
+    (when not None) once ``data`` is no longer needed.
+    """
+    buffer = bytearray()
+    spill = None
+    size = 0
+    try:
+        while True:
+            chunk = await upload.read(_READ_CHUNK)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > AUDIO_MAX_UPLOAD_BYTES:
+                raise UploadTooLarge(f"Audio upload exceeds {AUDIO_MAX_UPLOAD_BYTES} bytes")
+            if spill is None and size > AUDIO_SPOOL_MAX_BYTES:
+                spill = tempfile.TemporaryFile()
+                spill.write(buffer)
+                buffer = None
+            if spill is not None:
+                spill.write(chunk)
+            else:
+                buffer += chunk
+    except BaseException:
+        if spill is not None:
+            spill.close()
+        raise
+
+    if spill is None:
+        return buffer, None
+    spill.flush()
+    return np.memmap(spill, dtype=np.uint8, mode="r"), spill
+
+
+def is_wav(data) -> bool:
+    head = bytes(data[:12])
+    return len(head) == 12 and head[:4] == b"RIFF" and head[8:12] == b"WAVE"
+
+
+def decode_wav(data):
+    """Decode a RIFF/WAVE buffer to (float32 samples shaped [frames, channels], rate).
+
+    Handles integer PCM at 8/16/24/32 bits, 32/64-bit float and
+    WAVE_FORMAT_EXTENSIBLE headers.
+    """
+    if not isinstance(data, np.ndarray):
+        data = np.frombuffer(data, dtype=np.uint8)
+    if not is_wav(data):
+        raise AudioDecodeError("Not a RIFF/WAVE file")
+
+    fmt = None
+    pcm = None
+    offset = 12
+    total = len(data)
+    while offset + 8 <= total:
+        chunk_id = bytes(data[offset:offset + 4])
+        chunk_size = struct.unpack("<I", bytes(data[offset + 4:offset + 8]))[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            fmt = bytes(data[body:body + chunk_size])
+        elif chunk_id == b"data":
+            # Streaming writers sometimes leave the size as 0 / 0xFFFFFFFF
+            end = total if chunk_size in (0, 0xFFFFFFFF) else min(body + chunk_size, total)
+            pcm = data[body:end]
+        offset = body + chunk_size + (chunk_size & 1)
+        if fmt is not None and pcm is not None:
+            break
+
+    if fmt is None or pcm is None or len(fmt) < 16:
+        raise AudioDecodeError("WAV file is missing its fmt or data chunk")
+
+    audio_format, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if audio_format == _WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        audio_format = struct.unpack("<H", fmt[24:26])[0]
+    if channels < 1 or sample_rate < 1:
+        raise AudioDecodeError("WAV header has no channels or sample rate")
+
+    width = bits // 8
+    frame_bytes = block_align or width * channels
+    if width < 1 or frame_bytes < 1:
+        raise AudioDecodeError(f"Unsupported WAV sample size ({bits}-bit)")
+    usable = len(pcm) - len(pcm) % frame_bytes
+    raw = pcm[:usable]
+
+    if audio_format == _WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        samples = raw.view(f"<f{width}").astype(np.float32)
+    elif audio_format == _WAVE_FORMAT_PCM and bits == 8:
+        samples = (raw.astype(np.float32) - 128.0) / 128.0
+    elif audio_format == _WAVE_FORMAT_PCM and bits in (16, 32):
+        samples = raw.view(f"<i{width}").astype(np.float32) / float(2 ** (bits - 1))
+    elif audio_format == _WAVE_FORMAT_PCM and bits == 24:
+        triples = raw.reshape(-1, 3).astype(np.int32)
+        ints = triples[:, 0] | (triples[:, 1] << 8) | (triples[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / float(2 ** 23)
+    else:
+        raise AudioDecodeError(f"Unsupported WAV encoding (format {audio_format}, {bits}-bit)")
+
+    return samples.reshape(-1, channels), sample_rate
+
+
+def _lowpass(samples, cutoff):
+    """Windowed-sinc FIR low-pass; ``cutoff`` is a fraction of the Nyquist rate."""
+    taps = 63
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = cutoff * np.sinc(cutoff * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel.astype(np.float32), mode="same")
+
+
+def to_mono_16k(samples, sample_rate):
+    """Downmix to mono and resample to 16 kHz; returns float32 in [-1, 1]."""
+    mono = samples.mean(axis=1, dtype=np.float32) if samples.ndim == 2 else samples.astype(np.float32)
+    if sample_rate == TARGET_SAMPLE_RATE or mono.size == 0:
+        return mono
+
+    if sample_rate > TARGET_SAMPLE_RATE:
+        # Anti-alias before dropping below the source Nyquist rate
+        mono = _lowpass(mono, 0.9 * TARGET_SAMPLE_RATE / sample_rate)
+    duration = mono.size / sample_rate
+    target_len = int(round(duration * TARGET_SAMPLE_RATE))
+    positions = np.arange(target_len, dtype=np.float64) * (sample_rate / TARGET_SAMPLE_RATE)
+    return np.interp(positions, np.arange(mono.size), mono).astype(np.float32)
+
+
+def to_pcm16(samples) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def wav_to_pcm16(data) -> bytes:
+    """Any WAV buffer → 16 kHz mono 16-bit PCM bytes, ready for the recognizer."""
+    samples, sample_rate = decode_wav(data)
+    return to_pcm16(to_mono_16k(samples, sample_rate))
+
+
+async def _ffmpeg_to_pcm16(data):
+    # Compressed uploads (e.g. browser webm/opus) go through ffmpeg over pipes; no temp files
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise AudioDecodeError("Only WAV uploads are supported (ffmpeg not found for other formats)")
+    process = await asyncio.create_subprocess_exec(
+        ffmpeg, "-loglevel", "error", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-ar", str(TARGET_SAMPLE_RATE), "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    out, err = await process.communicate(bytes(data))
+    if process.returncode != 0:
+        raise AudioDecodeError(f"Could not decode audio: {err.decode(errors='ignore').strip()}")
+    return out
+
+
+async def load_pcm16(upload) -> bytes:
+    """Read an UploadFile and return 16 kHz mono 16-bit PCM.
+
+    WAV is decoded in-process with NumPy (off the event loop); anything
+    else falls back to ffmpeg.
+    """
+    with span("upload_read"):
+        data, spill = await read_upload(upload)
+    try:
+        with span("audio_decode", wav=is_wav(data)):
+            if is_wav(data):
+                return await asyncio.to_thread(wav_to_pcm16, data)
+            return await _ffmpeg_to_pcm16(data)
+    finally:
+        del data
+        if spill is not None:
+            spill.close()
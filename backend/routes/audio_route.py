@@ -1,22 +1,155 @@
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+import os
+import time
 import asyncio
+import logging
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 router = APIRouter()
 
-from shared_audio_cache import AUDIO_CACHE
-@router.get("/audio/{audio_id}")
-async def get_audio(audio_id: str):
-    print(f"🔎 Audio request received for ID: {audio_id}")
-    print(f"🧾 Available IDs in cache: {list(AUDIO_CACHE.keys())}")
+from shared_audio_cache import AUDIO_CACHE, PENDING_AUDIO, AUDIO_PENDING_TTL_SECONDS, wait_for_shared_audio
+from routes.telemetry import log_event
+
+# ⚙️ Disk-tier reads when the server can't sendfile (override via .env)
+AUDIO_FILE_CHUNK_BYTES = int(os.getenv("AUDIO_FILE_CHUNK_BYTES", str(256 * 1024)))
+
+
+class _BufferResponse(Response):
+    """Sends a bytes/memoryview body as is, so a byte range of a cached answer is never copied."""
+
+    def render(self, content):
+        return content
+
+
+class _FileRangeResponse(Response):
+    """Sends ``length`` bytes of a spilled answer starting at ``start``.
+
+    Uses the ASGI zero-copy send extension (sendfile) when the server offers
+    it, otherwise reads the file in AUDIO_FILE_CHUNK_BYTES pieces off the
+    event loop.
+    """
+
+    def __init__(self, path, start, length, status_code, headers):
+        super().__init__(status_code=status_code, headers=headers, media_type="audio/mpeg")
+        self.path = path
+        self.start = start
+        self.length = length
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            f = await asyncio.to_thread(open, self.path, "rb")
+        except OSError:
+            # Evicted from the spill directory between lookup and send
+            await _not_found()(scope, receive, send)
+            return
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if scope["method"] == "HEAD":
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(),
+                            "offset": self.start, "count": self.length})
+                return
+            f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(AUDIO_FILE_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            f.close()
+
+
+def _not_found():
+    return JSONResponse({"status": "error", "detail": "Invalid or expired audio ID"}, status_code=404)
+
+
+def parse_range(header, size):
+    """Inclusive ``(start, end)`` for a single ``bytes=`` range.
+
+    Returns None when the header should be ignored (malformed, another unit,
+    or several ranges, which we answer with the whole file), and raises
+    ValueError when the range can't be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        raise ValueError("Range starts past the end")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header, etag):
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+@router.get("/audio-cache/stats")
+async def get_audio_cache_stats():
+    return {"status": "success", "data": AUDIO_CACHE.stats()}
+
+
+@router.api_route("/audio/{audio_id}", methods=["GET", "HEAD"])
+async def get_audio(audio_id: str, request: Request):
+    log_event("audio_request", logging.DEBUG, audio_id=audio_id)
+
+    # 🌊 Still being synthesized: stream segments as they are produced (length unknown, no ranges yet)
+    pending = PENDING_AUDIO.get(audio_id)
+    if pending is not None:
+        return StreamingResponse(pending.segments(), media_type="audio/mpeg",
+                                 headers={"Cache-Control": "no-store", "Accept-Ranges": "none"})
+
+    audio = await asyncio.to_thread(AUDIO_CACHE.get, audio_id)
+    if audio is None and AUDIO_CACHE.shared:
+        # Another worker may still be synthesizing it; serve it whole once it lands
+        audio = await wait_for_shared_audio(audio_id, AUDIO_PENDING_TTL_SECONDS)
+    if audio is None:
+        return _not_found()
 
-    audio_segments = AUDIO_CACHE.get(audio_id)
-    if not audio_segments:
-        return {"status": "error", "detail": "Invalid or expired audio ID"}
+    # An audio ID always names the same bytes, so clients may keep them until the cache would drop them
+    headers = {
+        "ETag": audio.etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"private, max-age={max(0, int(audio.expires_at - time.monotonic()))}, immutable",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, audio.etag):
+        return Response(status_code=304, headers=headers)
 
-    async def audio_stream():
-        for segment in audio_segments:
-            yield segment
-            await asyncio.sleep(0.05)
+    start, end, status = 0, audio.size - 1, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == audio.etag):
+        try:
+            requested = parse_range(range_header, audio.size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{audio.size}"})
+        if requested is not None:
+            start, end = requested
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{audio.size}"
 
-    return StreamingResponse(audio_stream(), media_type="audio/mpeg")
+    if audio.data is None:
+        return _FileRangeResponse(audio.path, start, end - start + 1, status, headers)
+    body = audio.data if status == 200 else memoryview(audio.data)[start:end + 1]
+    return _BufferResponse(body, status_code=status, headers=headers, media_type="audio/mpeg")
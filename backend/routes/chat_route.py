@@ -1,59 +1,98 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uuid
-from shared_audio_cache import AUDIO_CACHE
+from shared_audio_cache import store_audio
 from routes.cohere_client import generate_answer
 from chroma_local.memory_manager import query_memory
-from routes.elevenlabs_client import text_to_speech, split_text_into_chunks
+from chroma_local.query_cache import QUERY_CACHE, normalize_query
+from routes.context_builder import build_context, RETRIEVAL_TOP_K
+from routes.identity import current_user
+from routes.elevenlabs_client import synthesize_chunks, split_text_into_chunks, ELEVENLABS_VOICE_ID
+from routes.speech_pipeline import start_answer_stream, get_streamed_answer
+from routes.single_flight import CHAT_FLIGHTS
+from routes.telemetry import span, log_event
+from routes.admission import Overloaded, overloaded_response
+from routes.resilience import DeadlineExceeded
 
 import asyncio
+import logging
 
 router = APIRouter()
 
 
 class ChatRequest(BaseModel):
     question: str
+    stream: bool = False  # return the audio URL before the answer is finished
 
-@router.post("/chat")
-async def chat_memory(data: ChatRequest):
-    try:
-        print(f"👉 Incoming question: {data.question}")
 
-        # 1️⃣ Query memory
-        memories, metadata = query_memory(data.question)
-        context = "\n".join(memories) if memories else ""
-        prompt = f"{context}\n\nQuestion: {data.question}"
+async def _answer(question, user_id, stream):
+    """Retrieval → answer → audio for one question; returns (response data, upstream calls made)."""
+    # 1️⃣ Query memory (embedding + search run off the event loop, cached per question)
+    with span("query_memory"):
+        memories, metadata = await asyncio.to_thread(query_memory, question, RETRIEVAL_TOP_K, user_id)
+    # 🧮 Best passages (or their summaries) within CONTEXT_TOKEN_BUDGET
+    context = build_context(memories, metadata)
+    prompt = f"{context}\n\nQuestion: {question}"
 
-        # 2️⃣ Generate answer
-        answer = await generate_answer(prompt)
-        print(f"✅ Answer: {answer}")
+    # 🌊 Streaming mode: answer + audio are produced in the background
+    if stream:
+        answer_stream = await start_answer_stream(prompt)
+        return {
+            "answer": None,
+            "answer_url": f"/chat/answer/{answer_stream.audio_id}",
+            "audio_url": f"/audio/{answer_stream.audio_id}"
+        }, 1  # TTS calls happen later and aren't counted
 
-        # 3️⃣ Generate audio chunks & store
-        chunks = split_text_into_chunks(answer)
-        audio_segments = []
-        for chunk in chunks:
-            audio_data = await text_to_speech(chunk)
-            audio_segments.append(audio_data)
+    # 2️⃣ Generate answer
+    answer = await generate_answer(prompt)
+    log_event("chat_answer", logging.DEBUG, answer=answer)
 
-        # Store in cache with a UUID
-        audio_id = str(uuid.uuid4())
-        AUDIO_CACHE[audio_id] = audio_segments
+    # 3️⃣ Generate audio chunks & store
+    chunks = split_text_into_chunks(answer)
+    audio_segments = await synthesize_chunks(chunks)
+
+    # Store in cache with a UUID
+    audio_id = str(uuid.uuid4())
+    await store_audio(audio_id, audio_segments)  # AudioStoreUnavailable (503) if the shared store is down
+
+    return {"answer": answer, "audio_url": f"/audio/{audio_id}"}, 1 + len(chunks)
 
-        # 4️⃣ Return answer + audio URL
-        return {
-    "status": "success",
-    "data": {
-        "answer": answer,
-        "audio_url": f"/audio/{audio_id}"
-    }
-}
 
+@router.post("/chat")
+async def chat_memory(data: ChatRequest, user_id: str = Depends(current_user)):
+    try:
+        log_event("chat_question", logging.DEBUG, question=data.question)
 
+        # 🤝 Identical questions in flight (or just answered) share one pipeline and one audio_id
+        key = (user_id, QUERY_CACHE.version(user_id), ELEVENLABS_VOICE_ID, data.stream, normalize_query(data.question))
+        (answer, _), shared = await CHAT_FLIGHTS.run(
+            key, lambda: _answer(data.question, user_id, data.stream), cost=lambda result: result[1]
+        )
+        if shared:
+            log_event("chat_joined_flight", logging.DEBUG)
+
+        # 4️⃣ Return answer + audio URL
+        return {"status": "success", "data": answer}
+
+    except Overloaded as e:
+        # 🚦 Cohere or ElevenLabs slots are saturated: shed fast with Retry-After
+        return overloaded_response(e)
+    except DeadlineExceeded as e:
+        return JSONResponse(status_code=504, content={"status": "error", "detail": str(e)})
     except Exception as e:
         import traceback
         traceback.print_exc()
         return {"status": "error", "detail": str(e)}
 
+
+@router.get("/chat/answer/{audio_id}")
+async def get_chat_answer(audio_id: str):
+    answer = await get_streamed_answer(audio_id)
+    if answer is None:
+        return {"status": "error", "detail": "Invalid or expired audio ID"}
+    return {"status": "success", "data": {"answer": answer}}
+
 # @router.post("/chat")
 # async def chat_memory(data: ChatRequest):
 #     try:
@@ -1,17 +1,41 @@
 import os
+import re
+import json
+import time
 import httpx
+from contextlib import aclosing, nullcontext
 from dotenv import load_dotenv
 
+from routes.http_clients import get_client
+from routes.telemetry import span, record
+from routes.admission import Overloaded, register_limiter
+from routes.resilience import DeadlineExceeded, register_upstream
+
 load_dotenv()
 
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
 
+# 🚦 Cohere calls in flight on this worker (ADMISSION_COHERE_* to change); extra calls
+# queue briefly, then raise Overloaded instead of piling up on the upstream
+_cohere_slots = register_limiter("cohere", 16, 64, 10.0)
+
+# 🛡️ Per-attempt timeout, retries and circuit breaker (COHERE_* to change). No hedging:
+# answers differ from call to call and every call costs credits.
+COHERE = register_upstream("cohere", _cohere_slots, attempt_timeout=20.0, retries=1, backoff=0.5)
+
+# ✂️ Limit answers to 150 words to save ElevenLabs credits
+MAX_ANSWER_WORDS = 150
+_WORD = re.compile(r"\S+")
+
 # ✅ For summarizing (training)
-async def summarize(text: str) -> str:
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:  # ⏱️ Extended timeout
+async def summarize(text: str, raise_errors: bool = False, retries: int = None) -> str:
+    # raise_errors=True lets callers that retry see the httpx error instead of an "Error: ..." string
+    client = get_client("cohere")  # 🔌 Pooled keep-alive client from the app lifespan
+
+    async def send(timeout):
+        with span("cohere_summarize"):
             response = await client.post(
-                "https://api.cohere.ai/v1/summarize",
+                "/v1/summarize",
                 headers={
                     "Authorization": f"Bearer {COHERE_API_KEY}",
                     "Content-Type": "application/json",
@@ -20,37 +44,129 @@ async def summarize(text: str) -> str:
                     "text": text,
                     "length": "short",          # ⬅️ Keeps output concise
                     "format": "paragraph"
-                }
+                },
+                timeout=timeout
             )
             response.raise_for_status()
-            return response.json()["summary"]
-    except httpx.HTTPError as e:
+            return response
+
+    try:
+        response = await COHERE.call(send, retries=retries)
+        return response.json()["summary"]
+    except (httpx.HTTPError, Overloaded, DeadlineExceeded) as e:
+        if raise_errors:
+            raise
         return f"Error: {str(e)}"
 
 async def generate_answer(prompt: str) -> str:
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.cohere.ai/v1/chat",
-            headers={
-                "Authorization": f"Bearer {COHERE_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "command-r",
-                "message": prompt,
-                "chat_history": []
-            }
-        )
-        response.raise_for_status()
-        data = response.json()
+    client = get_client("cohere")
+
+    async def send(timeout):
+        with span("cohere_generate"):
+            response = await client.post(
+                "/v1/chat",
+                headers={
+                    "Authorization": f"Bearer {COHERE_API_KEY}",
+                    "Content-Type": "application/json",
+                },
+                json={
+                    "model": "command-r",
+                    "message": prompt,
+                    "chat_history": []
+                },
+                timeout=timeout
+            )
+            response.raise_for_status()
+            return response
+
+    data = (await COHERE.call(send)).json()
+
+    # Get reply
+    answer = data.get("text") or data.get("reply") or ""
+
+    # ✂️ Limit to 150 words to save ElevenLabs credits
+    words = answer.split()
+    if len(words) > MAX_ANSWER_WORDS:
+        answer = " ".join(words[:MAX_ANSWER_WORDS]) + "..."
+
+    return answer
 
-        # Get reply
-        answer = data.get("text") or data.get("reply") or ""
 
-        # ✂️ Limit to 150 words to save ElevenLabs credits
-        max_words = 150
-        words = answer.split()
-        if len(words) > max_words:
-            answer = " ".join(words[:max_words]) + "..."
+async def reserve_stream_slot():
+    """Take a Cohere slot now (raises Overloaded); pass ``slot_reserved=True`` to stream_answer."""
+    COHERE.breaker.check()  # an open circuit fails here, before an audio URL is handed out
+    await _cohere_slots.acquire()
 
-        return answer
+
+def release_stream_slot():
+    _cohere_slots.release()
+
+
+async def stream_answer(prompt: str, slot_reserved: bool = False):
+    """Yield answer text deltas as Cohere generates them.
+
+    Stops (and closes the upstream stream) once the answer passes
+    MAX_ANSWER_WORDS, mirroring the truncation in ``generate_answer``.
+    Words are counted on the text so far, so a word split across two deltas
+    counts once.
+    Records time to first token and to the end of the stream (which
+    includes time the consumer spends between deltas). With
+    ``slot_reserved`` the caller already holds a slot from
+    ``reserve_stream_slot`` and releases it itself, even if this generator
+    never starts. The stream counts towards the circuit breaker and each read is bounded by
+    the request deadline, but it is never retried.
+    """
+    text = ""
+    started = time.perf_counter()
+    first_token = True
+    client = get_client("cohere")
+    slot = nullcontext() if slot_reserved else _cohere_slots
+    try:
+        # aclosing: breaking out early closes the upstream stream right away (and frees the slot)
+        async with slot, COHERE.guard() as timeout, aclosing(_answer_deltas(client, prompt, timeout)) as deltas:
+            async for delta in deltas:
+                if first_token:
+                    record("cohere_first_token", time.perf_counter() - started)
+                    first_token = False
+                text += delta
+                words = list(_WORD.finditer(text))
+                if len(words) > MAX_ANSWER_WORDS:
+                    # Cut where the last allowed word ends (it is complete: more text follows it)
+                    keep = words[MAX_ANSWER_WORDS - 1].end() - (len(text) - len(delta))
+                    if keep > 0:
+                        yield delta[:keep]
+                    yield "..."
+                    break
+                yield delta
+    finally:
+        record("cohere_stream", time.perf_counter() - started)
+
+
+async def _answer_deltas(client, prompt, timeout):
+    async with client.stream(
+        "POST",
+        "/v1/chat",
+        headers={
+            "Authorization": f"Bearer {COHERE_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        json={
+            "model": "command-r",
+            "message": prompt,
+            "chat_history": [],
+            "stream": True
+        },
+        timeout=timeout
+    ) as response:
+        response.raise_for_status()
+        # Cohere streams one JSON event per line
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            event_type = event.get("event_type")
+            if event_type == "stream-end":
+                break
+            if event_type != "text-generation":
+                continue
+            yield event.get("text", "")
@@ -0,0 +1,33 @@
+import os
+
+# ⚙️ Prompt context (override via .env)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))  # candidates offered to the packer
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English prose; close enough for budgeting
+    return max(1, len(text) // 4)
+
+
+def build_context(documents, metadatas, budget=CONTEXT_TOKEN_BUDGET):
+    """Pack ranked memories into at most ``budget`` tokens of prompt context.
+
+    Memories are taken best first. One that doesn't fit in full is replaced
+    by its stored summary; if neither fits it is skipped, and a later (shorter)
+    memory may still fill the remaining space.
+    """
+    parts = []
+    remaining = budget
+    for document, metadata in zip(documents, metadatas):
+        for text in (document, (metadata or {}).get("summary", "")):
+            if not text:
+                continue
+            cost = estimate_tokens(text)
+            if cost <= remaining:
+                parts.append(text)
+                remaining -= cost
+                break
+        if remaining <= 0:
+            break
+    return "\n".join(parts)
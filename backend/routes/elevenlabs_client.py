@@ -1,16 +1,42 @@
 import os
 import httpx
 import re
+import asyncio
+import logging
 from dotenv import load_dotenv
 
+from routes.http_clients import get_client, is_retryable
+from routes.tts_cache import open_tts_cache, make_key
+from routes.telemetry import span, log_event
+from routes.admission import register_limiter
+from routes.resilience import register_upstream
+
 load_dotenv()
 
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "EXAVITQu4vr4xnSDxMaL")
 
-BASE_URL = "https://api.elevenlabs.io/v1/text-to-speech"
+BASE_URL = "/v1/text-to-speech"  # relative to the pooled ElevenLabs client
+
+# ⚙️ Chunk synthesis fan-out (override via .env)
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "8"))          # whole worker (ADMISSION_ELEVENLABS_LIMIT wins)
+TTS_REQUEST_CONCURRENCY = int(os.getenv("TTS_REQUEST_CONCURRENCY", "4"))  # per answer
+TTS_CHUNK_RETRIES = int(os.getenv("TTS_CHUNK_RETRIES", "2"))                # ELEVENLABS_RETRIES wins
+TTS_RETRY_BACKOFF_SECONDS = float(os.getenv("TTS_RETRY_BACKOFF_SECONDS", "0.5"))
+
+# Shared by every request on this worker so a burst of answers can't flood ElevenLabs;
+# chunks wait briefly for a slot and are shed (Overloaded) when the queue is full or too slow
+_tts_slots = register_limiter("elevenlabs", TTS_MAX_CONCURRENCY, 64, 10.0)
+
+# 🛡️ Deadlines, retries, hedging and circuit breaker (ELEVENLABS_* to change). A chunk is
+# short, so a slow one is retried or hedged long before the old flat 60s; hedging is safe
+# because the same text always gives the same audio.
+ELEVENLABS = register_upstream(
+    "elevenlabs", _tts_slots, attempt_timeout=15.0, retries=TTS_CHUNK_RETRIES,
+    backoff=TTS_RETRY_BACKOFF_SECONDS, hedge=True
+)
 
-async def text_to_speech(text: str) -> bytes:
+async def text_to_speech(text: str, retries: int = None) -> bytes:
     url = f"{BASE_URL}/{ELEVENLABS_VOICE_ID}"
     
     headers = {
@@ -28,40 +54,185 @@ async def text_to_speech(text: str) -> bytes:
         "text": text
     }
 
-    print("🔎 ElevenLabs TTS Request")
-    print("URL:", url)
-    print("Headers:", headers)
-    print("Payload:", payload)
+    # ♻️ Same voice + settings + text always yields the same audio
+    cache_key = None
+    cache = await open_tts_cache()
+    if cache is not None:
+        cache_key = make_key(ELEVENLABS_VOICE_ID, payload["model_id"], payload["voice_settings"], text)
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    client = get_client("elevenlabs")  # 🔌 Pooled keep-alive client from the app lifespan
+
+    async def send(timeout):
+        try:
+            with span("tts_chunk", chars=len(text)):
+                response = await client.post(url, headers=headers, json=payload, timeout=timeout)
+                response.raise_for_status()
+            return response
+        except httpx.HTTPStatusError as e:
+            # Error bodies are short JSON; success bodies are MP3 and never logged
+            log_event("elevenlabs_error", logging.WARNING, status=e.response.status_code, body=e.response.text[:500])
+            raise
+
+    response = await ELEVENLABS.call(send, retries=retries)
+    if cache_key is not None:
+        await cache.put(cache_key, response.content)
+    return response.content
+
 
+async def synthesize_chunk(index, chunk, request_slots=None, retries=None) -> bytes:
+    """Synthesize one chunk; ELEVENLABS retries transient failures with jittered backoff."""
+    request_slots = request_slots or asyncio.Semaphore(1)
+    async with request_slots:
+        return await text_to_speech(chunk, retries=retries)
 
+
+async def synthesize_chunks(chunks, max_concurrency=None, retries=None) -> list:
+    """Synthesize ``chunks`` concurrently and return the MP3 segments in order.
+
+    A chunk that still fails with a transient error (429, 5xx, transport)
+    after its retries is dropped and the remaining segments are returned;
+    that raises only when every chunk fails. Anything else (the request
+    deadline, Overloaded or an open circuit, a request ElevenLabs rejects)
+    cancels the other chunks and is raised at once.
+    """
+    chunks = [c for c in chunks if c and c.strip()]
+    if not chunks:
+        return []
+
+    request_slots = asyncio.Semaphore(max_concurrency or TTS_REQUEST_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(synthesize_chunk(i, chunk, request_slots, retries))
+        for i, chunk in enumerate(chunks)
+    ]
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            print("📥 Status Code:", response.status_code)
-            print("📥 Response Text:", response.text)
-            response.raise_for_status()
-            return response.content
-    except httpx.HTTPStatusError as e:
-        print("❌ ElevenLabs API returned an error:")
-        print("Status Code:", e.response.status_code)
-        print("Response Body:", e.response.text)
-        raise
+        for finished in asyncio.as_completed(tasks):
+            try:
+                await finished
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    segments = []
+    errors = []
+    for index, task in enumerate(tasks):
+        if task.exception() is not None:
+            print(f"❌ TTS chunk {index} dropped after retries: {task.exception()}")
+            errors.append(task.exception())
+        else:
+            segments.append(task.result())
+
+    if not segments:
+        raise errors[0]
+    return segments
+
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_CLAUSE_END = re.compile(r'(?<=[,;:])\s+')
+
+
+class SentenceSegmenter:
+    """Incrementally cut streamed text into TTS-sized chunks.
+
+    ``feed`` returns the chunks completed by the new text and ``flush``
+    returns whatever is left at the end of the stream. The first chunk is
+    capped at ``first_chunk_length`` (cut at a clause or word boundary) so
+    speech can start before the first full sentence is generated. Later
+    sentences are grouped until they reach ``min_length``, never exceeding
+    ``max_length``.
+    """
+
+    def __init__(self, max_length=250, first_chunk_length=None, min_length=1):
+        self.max_length = max_length
+        self.first_chunk_length = first_chunk_length
+        self.min_length = min_length
+        self._buffer = ""
+        self._pending = ""
+        self._emitted = 0
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        out = []
+        parts = _SENTENCE_END.split(self._buffer)
+        # The last part has no terminator yet; keep it buffered
+        self._buffer = parts.pop()
+        for sentence in parts:
+            self._add(sentence, out)
+
+        if self._emitted == 0 and not self._pending and self.first_chunk_length:
+            head = self._cut_head(self._buffer, self.first_chunk_length)
+            if head:
+                self._buffer = self._buffer[len(head):].lstrip()
+                self._emit(head, out)
+        return out
+
+    def flush(self) -> list:
+        out = []
+        if self._buffer.strip():
+            self._add(self._buffer, out)
+        self._buffer = ""
+        if self._pending:
+            self._emit(self._pending, out)
+            self._pending = ""
+        return out
+
+    def _add(self, sentence, out):
+        sentence = sentence.strip()
+        if not sentence:
+            return
+
+        if self._emitted == 0 and not self._pending and self.first_chunk_length:
+            head = self._cut_head(sentence, self.first_chunk_length)
+            if not head:
+                self._emit(sentence, out)
+                return
+            self._emit(head, out)
+            sentence = sentence[len(head):].lstrip()
+
+        # Oversized sentences are split on word boundaries
+        while len(sentence) > self.max_length:
+            cut = sentence.rfind(" ", 0, self.max_length)
+            cut = cut if cut > 0 else self.max_length
+            if self._pending:
+                self._emit(self._pending, out)
+                self._pending = ""
+            self._emit(sentence[:cut], out)
+            sentence = sentence[cut:].lstrip()
+
+        if self._pending and len(self._pending) + 1 + len(sentence) > self.max_length:
+            self._emit(self._pending, out)
+            self._pending = ""
+        self._pending = f"{self._pending} {sentence}".strip()
+        if len(self._pending) >= self.min_length:
+            self._emit(self._pending, out)
+            self._pending = ""
+
+    def _emit(self, chunk, out):
+        chunk = chunk.strip()
+        if chunk:
+            out.append(chunk)
+            self._emitted += 1
+
+    @staticmethod
+    def _cut_head(text, limit):
+        """Return a prefix of ``text`` no longer than ``limit`` ending at a clause
+        or word boundary, or "" if ``text`` is still too short to cut."""
+        if len(text) <= limit:
+            return ""
+        window = text[:limit + 1]
+        clauses = [m.start() for m in _CLAUSE_END.finditer(window)]
+        if clauses:
+            return text[:clauses[-1]]
+        space = window.rfind(" ")
+        return text[:space] if space > 0 else ""
 
 
 def split_text_into_chunks(text, max_length=250):
-    sentences = re.split(r'(?<=[.!?]) +', text)
-    chunks = []
-    current = ""
-    for sentence in sentences:
-        if len(current) + len(sentence) <= max_length:
-            current += " " + sentence
-        else:
-            chunks.append(current.strip())
-            current = sentence
-    if current:
-        chunks.append(current.strip())
-    return chunks
-
-# Debug prints
-print("ELEVENLABS_API_KEY:", ELEVENLABS_API_KEY)
-print("ELEVENLABS_VOICE_ID:", ELEVENLABS_VOICE_ID)
+    segmenter = SentenceSegmenter(max_length=max_length, min_length=max_length)
+    return segmenter.feed(text) + segmenter.flush()
@@ -0,0 +1,82 @@
+import os
+import time
+import asyncio
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from chroma_local import memory_manager
+from routes.transcription_pool import TRANSCRIPTION_POOL
+from routes import streaming_recognizer
+from routes.tts_cache import open_tts_cache
+
+router = APIRouter()
+
+# ⚙️ Components /readyz waits for (override via .env); a failed one keeps the worker out of rotation.
+# The others only need to have finished warming up, successfully or not.
+READINESS_REQUIRED = {
+    name.strip() for name in os.getenv("READINESS_REQUIRED", "memory,transcription").split(",") if name.strip()
+}
+
+# component -> "pending" | "ready" | "failed: <reason>"
+READINESS = {"memory": "pending", "transcription": "pending", "tts_cache": "pending"}
+_started_at = time.monotonic()
+_warmup_seconds = None
+_import_seconds = None
+
+
+def record_import_time(seconds):
+    global _import_seconds
+    _import_seconds = round(seconds, 3)
+    print(f"🚀 main imported in {_import_seconds * 1000:.0f}ms")
+
+
+async def _warm(name, warm):
+    try:
+        await warm()
+        READINESS[name] = "ready"
+    except Exception as e:
+        # /readyz reports the reason; only READINESS_REQUIRED components hold readiness back
+        print(f"❌ Warm-up of {name} failed: {e}")
+        READINESS[name] = f"failed: {e}"
+
+
+async def warm_up():
+    """Initialize heavy resources (Chroma + embeddings, Vosk models, the TTS cache index) before taking traffic."""
+    global _warmup_seconds
+    started = time.perf_counter()
+    await asyncio.gather(
+        _warm("memory", lambda: asyncio.to_thread(memory_manager.warm_up)),
+        _warm("transcription", lambda: asyncio.gather(TRANSCRIPTION_POOL.warm_up(), streaming_recognizer.warm_up())),
+        _warm("tts_cache", open_tts_cache),
+    )
+    _warmup_seconds = round(time.perf_counter() - started, 3)
+    print(f"🔥 Warm-up finished in {_warmup_seconds}s: {READINESS}")
+
+
+def is_ready():
+    return all(
+        state == "ready" if name in READINESS_REQUIRED else state != "pending"
+        for name, state in READINESS.items()
+    )
+
+
+@router.get("/healthz")
+async def healthz():
+    # Liveness: the process is up and the event loop is responsive
+    return {
+        "status": "ok",
+        "uptime_seconds": round(time.monotonic() - _started_at, 1),
+        "import_seconds": _import_seconds
+    }
+
+
+@router.get("/readyz")
+async def readyz():
+    body = {
+        "ready": is_ready(),
+        "components": READINESS,
+        "required": sorted(READINESS_REQUIRED),
+        "warmup_seconds": _warmup_seconds,
+    }
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
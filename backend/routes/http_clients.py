@@ -0,0 +1,150 @@
+import os
+import time
+import importlib.util
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ⚙️ Pool sizing (override via .env)
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_POOL_TIMEOUT_SECONDS = float(os.getenv("HTTP_POOL_TIMEOUT_SECONDS", "10"))
+
+# HTTP/2 needs the optional `h2` package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# upstream name -> (base URL, read/write timeout in seconds)
+UPSTREAMS = {
+    "cohere": (
+        os.getenv("COHERE_BASE_URL", "https://api.cohere.ai"),
+        float(os.getenv("COHERE_TIMEOUT_SECONDS", "30")),
+    ),
+    "elevenlabs": (
+        os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io"),
+        float(os.getenv("ELEVENLABS_TIMEOUT_SECONDS", "60")),
+    ),
+}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient upstream failures worth retrying: 429, 5xx and transport errors."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class PoolStats:
+    """Connection reuse and pool-acquire timing for one upstream client.
+
+    Fed by httpcore trace events: a request that opens a TCP connection is
+    counted as new, one that goes straight to sending headers reused a
+    pooled connection. Pool wait is the time from handing the request to the
+    transport until it owns a connection.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.pool_wait_total = 0.0
+        self.pool_wait_max = 0.0
+
+    def snapshot(self):
+        acquired = self.new_connections + self.reused_connections
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_rate": round(self.reused_connections / acquired, 4) if acquired else 0.0,
+            "pool_wait_avg_ms": round(1000 * self.pool_wait_total / acquired, 3) if acquired else 0.0,
+            "pool_wait_max_ms": round(1000 * self.pool_wait_max, 3),
+        }
+
+
+_clients = {}
+_stats = {name: PoolStats() for name in UPSTREAMS}
+
+
+def _make_tracer(stats):
+    async def on_request(request):
+        started = time.perf_counter()
+        acquired = False
+        stats.requests += 1
+
+        async def trace(event_name, info):
+            nonlocal acquired
+            if acquired:
+                return
+            if event_name == "connection.connect_tcp.started":
+                stats.new_connections += 1
+            elif event_name.endswith("send_request_headers.started"):
+                stats.reused_connections += 1
+            else:
+                return
+            acquired = True
+            waited = time.perf_counter() - started
+            stats.pool_wait_total += waited
+            stats.pool_wait_max = max(stats.pool_wait_max, waited)
+
+        request.extensions["trace"] = trace
+
+    return on_request
+
+
+def _build_client(name):
+    base_url, timeout = UPSTREAMS[name]
+    return httpx.AsyncClient(
+        base_url=base_url,
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            timeout,
+            connect=HTTP_CONNECT_TIMEOUT_SECONDS,
+            pool=HTTP_POOL_TIMEOUT_SECONDS,
+        ),
+        event_hooks={"request": [_make_tracer(_stats[name])]},
+    )
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """Shared pooled client for ``name``.
+
+    Normally created by ``open_clients`` in the app lifespan; scripts that run
+    outside the app get one lazily.
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _build_client(name)
+    return client
+
+
+async def open_clients():
+    for name in UPSTREAMS:
+        get_client(name)
+    print(f"🔌 Upstream HTTP clients ready (http2={HTTP2_AVAILABLE})")
+
+
+async def close_clients():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
+
+def client_stats():
+    return {
+        name: {
+            "base_url": UPSTREAMS[name][0],
+            "http2": HTTP2_AVAILABLE,
+            **stats.snapshot(),
+        }
+        for name, stats in _stats.items()
+    }
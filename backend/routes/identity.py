@@ -0,0 +1,15 @@
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from chroma_local.memory_manager import DEFAULT_USER_ID
+
+MAX_USER_ID_LENGTH = 128
+
+
+async def current_user(x_user_id: Optional[str] = Header(default=None)) -> str:
+    """Whose memory bank a request reads or writes: the X-User-Id header, else DEFAULT_USER_ID."""
+    user_id = (x_user_id or "").strip() or DEFAULT_USER_ID
+    if len(user_id) > MAX_USER_ID_LENGTH:
+        raise HTTPException(status_code=400, detail="X-User-Id is too long")
+    return user_id
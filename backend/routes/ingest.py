@@ -0,0 +1,162 @@
+import os
+import re
+import time
+import random
+import asyncio
+
+from routes.cohere_client import summarize
+from routes.http_clients import is_retryable
+from chroma_local.memory_manager import store_memories, find_duplicates
+from chroma_local.dedupe import DEDUPE_POLICY
+
+# ⚙️ Ingestion tuning (override via .env)
+TRAIN_CHUNK_CHARS = int(os.getenv("TRAIN_CHUNK_CHARS", "3000"))
+TRAIN_CHUNK_OVERLAP_CHARS = int(os.getenv("TRAIN_CHUNK_OVERLAP_CHARS", "300"))
+TRAIN_MIN_CHARS = int(os.getenv("TRAIN_MIN_CHARS", "100"))
+TRAIN_SUMMARIZE_CONCURRENCY = int(os.getenv("TRAIN_SUMMARIZE_CONCURRENCY", "4"))
+TRAIN_ADD_BATCH_SIZE = int(os.getenv("TRAIN_ADD_BATCH_SIZE", "256"))
+TRAIN_SUMMARIZE_RETRIES = int(os.getenv("TRAIN_SUMMARIZE_RETRIES", "2"))
+TRAIN_RETRY_BACKOFF_SECONDS = float(os.getenv("TRAIN_RETRY_BACKOFF_SECONDS", "1.0"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+|\n\s*\n")
+
+
+def _split_long(sentence, max_chars):
+    """Hard-split a run-on sentence at word boundaries."""
+    pieces, current = [], ""
+    for word in sentence.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text, max_chars=TRAIN_CHUNK_CHARS, overlap_chars=TRAIN_CHUNK_OVERLAP_CHARS):
+    """Split ``text`` into passages of at most ``max_chars`` on sentence boundaries.
+
+    Consecutive passages share up to ``overlap_chars`` of whole sentences so
+    a memory cut mid-story still has its context on both sides.
+    """
+    sentences = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        sentences.extend(_split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence])
+
+    passages, current = [], []
+    size = 0
+    for sentence in sentences:
+        if current and size + 1 + len(sentence) > max_chars:
+            passages.append(" ".join(current))
+            # Carry the trailing sentences that fit in the overlap into the next passage
+            carried = []
+            carried_size = 0
+            for previous in reversed(current):
+                if carried_size + len(previous) + 1 > overlap_chars:
+                    break
+                carried.insert(0, previous)
+                carried_size += len(previous) + 1
+            if carried_size + len(sentence) > max_chars:
+                carried, carried_size = [], 0
+            current, size = carried, max(carried_size - 1, 0)
+        size += len(sentence) + (1 if current else 0)
+        current.append(sentence)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+async def _summarize_passage(passage, slots, summarize_passages, retries, progress):
+    """Summarize one passage, retrying transient Cohere failures with jittered backoff."""
+    try:
+        if not summarize_passages:
+            return passage[:200]
+        async with slots:
+            for attempt in range(retries + 1):
+                try:
+                    # This loop is the retry policy here (slower backoff suits a bulk job)
+                    return await summarize(passage, raise_errors=True, retries=0)
+                except Exception as e:
+                    if attempt == retries or not is_retryable(e):
+                        return f"Error: {str(e)}"
+                    delay = TRAIN_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+                    print(f"🔁 Summarize failed ({e}); retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay * (0.5 + random.random()))
+    finally:
+        progress["passages_summarized"] += 1
+
+
+def ingest_succeeded(report):
+    """Something was stored, or every passage was a memory the user already has."""
+    return bool(report["stored"] or (report["duplicates"] and not report["failures"]))
+
+
+async def ingest_texts(items, user_id, summarize_passages=True, retries=TRAIN_SUMMARIZE_RETRIES, progress=None):
+    """Chunk, summarize and store a batch of ``{"text", "tags"}`` items.
+
+    Summaries run with at most TRAIN_SUMMARIZE_CONCURRENCY Cohere calls in
+    flight; passages are then embedded and written TRAIN_ADD_BATCH_SIZE at
+    a time off the event loop. ``progress`` (a dict, if given) is updated in
+    place as passages are summarized and stored. With DEDUPE_POLICY=skip,
+    passages already stored are dropped before they cost a summary call.
+    Returns a report with per-item failures, duplicates and throughput.
+    """
+    progress = progress if progress is not None else {}
+    progress.update(passages_total=0, passages_summarized=0, stored=0)
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(TRAIN_SUMMARIZE_CONCURRENCY)
+
+    passages = []
+    failures = []
+    for index, item in enumerate(items):
+        text = item["text"].strip()
+        if len(text) < TRAIN_MIN_CHARS:
+            failures.append({"item": index, "error": f"Text must be at least {TRAIN_MIN_CHARS} characters"})
+            continue
+        for passage in chunk_text(text):
+            passages.append((index, passage, item.get("tags", [])))
+
+    duplicates = []
+    if DEDUPE_POLICY == "skip" and passages:
+        matches = await asyncio.to_thread(find_duplicates, user_id, [passage for _, passage, _ in passages])
+        duplicates = [{"item": index, **match, "action": "skip"}
+                      for (index, _, _), match in zip(passages, matches) if match]
+        passages = [row for row, match in zip(passages, matches) if not match]
+    progress["passages_total"] = len(passages)
+
+    summaries = await asyncio.gather(
+        *(_summarize_passage(passage, slots, summarize_passages, retries, progress) for _, passage, _ in passages)
+    )
+
+    memories, memory_items = [], []
+    item_summaries = {}
+    for (index, passage, tags), summary in zip(passages, summaries):
+        if summary.startswith("Error:"):
+            failures.append({"item": index, "error": summary})
+            continue
+        item_summaries.setdefault(index, summary)
+        memories.append({"user_id": user_id, "text": passage, "summary": summary, "tags": tags})
+        memory_items.append(index)
+
+    ids = []
+    if memories:
+        ids, found = await asyncio.to_thread(store_memories, memories, TRAIN_ADD_BATCH_SIZE)
+        duplicates.extend({"item": memory_items[d.pop("index")], **d} for d in found)
+    progress["stored"] = len(ids)
+
+    seconds = time.perf_counter() - started
+    return {
+        "items": len(items),
+        "passages": len(passages),
+        "stored": len(ids),
+        "ids": ids,
+        "duplicates": duplicates,
+        "summaries": item_summaries,
+        "failures": failures,
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(len(ids) / seconds, 1) if seconds else None,
+    }
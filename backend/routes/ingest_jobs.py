@@ -0,0 +1,193 @@
+import os
+import time
+import uuid
+import asyncio
+from itertools import islice
+from collections import OrderedDict
+
+from routes.ingest import ingest_texts, ingest_succeeded
+from routes.telemetry import HistogramFamily
+
+# ⚙️ Background ingestion (override via .env)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_MAX_QUEUE = int(os.getenv("INGEST_MAX_QUEUE", "100"))
+INGEST_JOBS_RETAINED = int(os.getenv("INGEST_JOBS_RETAINED", "1000"))  # finished jobs kept for polling
+
+INGEST_JOB_SECONDS = HistogramFamily(
+    "swarsmriti_ingest_job_seconds", "Time from submitting a training job until it finished.", "status"
+)
+
+
+class IngestQueueFull(Exception):
+    """INGEST_MAX_QUEUE jobs are already waiting; callers should answer 429."""
+
+
+class IngestJob:
+    def __init__(self, items, user_id, summarize_passages):
+        self.id = uuid.uuid4().hex
+        self.items = items
+        self.item_count = len(items)
+        self.user_id = user_id
+        self.summarize_passages = summarize_passages
+        self.status = "queued"  # queued -> running -> succeeded | failed
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "items": self.item_count,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestQueue:
+    """Bounded queue of training jobs drained by a fixed pool of async workers.
+
+    ``submit`` returns at once with a job to poll; once INGEST_MAX_QUEUE jobs
+    are waiting it raises IngestQueueFull instead of queueing more.
+    Transient Cohere errors are retried per passage inside ingest_texts.
+    """
+
+    def __init__(self, workers=INGEST_WORKERS, max_queue=INGEST_MAX_QUEUE, retained=INGEST_JOBS_RETAINED):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.retained = retained
+        self._queue = None
+        self._tasks = []
+        self._jobs = OrderedDict()
+        self._running = 0
+
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.queue_wait_total = 0.0
+        self.docs_stored = 0
+        self.busy_seconds = 0.0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"📚 Ingest queue ready ({self.workers} workers, queue {self.max_queue})")
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, items, user_id, summarize_passages=True):
+        self.start()
+        job = IngestJob(items, user_id, summarize_passages)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise IngestQueueFull("Ingest queue is full")
+        self.submitted += 1
+        self._jobs[job.id] = job
+        self._forget_old_jobs()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def _forget_old_jobs(self):
+        # Oldest finished jobs go first; queued and running ones are kept (at most
+        # max_queue + workers of them), so the table stays near ``retained``
+        excess = len(self._jobs) - self.retained
+        if excess <= 0:
+            return
+        finished = (job_id for job_id, job in self._jobs.items() if job.finished_at is not None)
+        for job_id in list(islice(finished, excess)):
+            del self._jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            self._running += 1
+            try:
+                job.result = await ingest_texts(
+                    job.items, job.user_id, job.summarize_passages, progress=job.progress
+                )
+                job.status = "succeeded" if ingest_succeeded(job.result) else "failed"
+            except asyncio.CancelledError:
+                job.status, job.error = "failed", "Server shutting down"
+                raise
+            except Exception as e:
+                print(f"❌ Ingest job {job.id} failed: {e}")
+                job.status, job.error = "failed", str(e)
+            finally:
+                self._running -= 1
+                job.finished_at = time.time()
+                job.items = []  # the texts live in the collection now
+                self._record(job)
+                self._queue.task_done()
+
+    def _record(self, job):
+        if job.status == "succeeded":
+            self.succeeded += 1
+            self.docs_stored += job.result["stored"]
+        else:
+            self.failed += 1
+        latency = job.finished_at - job.created_at
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.queue_wait_total += job.started_at - job.created_at
+        self.busy_seconds += job.finished_at - job.started_at
+        INGEST_JOB_SECONDS.observe(job.status, latency)
+        self._forget_old_jobs()
+        print(f"📚 Ingest job {job.id} {job.status} in {latency:.2f}s")
+
+    def stats(self):
+        done = self.succeeded + self.failed
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "job_latency_avg_ms": round(1000 * self.latency_total / done, 1) if done else 0.0,
+            "job_latency_max_ms": round(1000 * self.latency_max, 1),
+            "queue_wait_avg_ms": round(1000 * self.queue_wait_total / done, 1) if done else 0.0,
+            "docs_stored": self.docs_stored,
+            # Passages stored per second of worker time
+            "docs_per_second": round(self.docs_stored / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+        }
+
+
+INGEST_QUEUE = IngestQueue()
+
+
+def exposition():
+    """Ingest queue gauges and job latency in the Prometheus text format."""
+    lines = INGEST_JOB_SECONDS.exposition()
+    stats = INGEST_QUEUE.stats()
+    gauges = [
+        ("swarsmriti_ingest_queue_depth", "Training jobs waiting for a worker.", stats["queue_depth"]),
+        ("swarsmriti_ingest_running", "Training jobs being ingested.", stats["running"]),
+        ("swarsmriti_ingest_jobs_retained", "Jobs kept for polling, finished or not.", len(INGEST_QUEUE._jobs)),
+    ]
+    for metric, help_text, value in gauges:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge", f"{metric} {value}"]
+    return lines
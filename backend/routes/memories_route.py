@@ -1,26 +1,97 @@
-from fastapi import APIRouter
-from chroma_local.memory_manager import collection
+import os
+import asyncio
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from chroma_local.memory_manager import get_user_collection, user_filter, tag_filter, combine_filters
+from routes.identity import current_user
 
 router = APIRouter()
 
+# ⚙️ Listing limits (override via .env)
+MEMORIES_PAGE_MAX = int(os.getenv("MEMORIES_PAGE_MAX", "500"))
+MEMORIES_EXPORT_PAGE = int(os.getenv("MEMORIES_EXPORT_PAGE", "500"))
+
+MEMORY_FIELDS = ("id", "text", "summary", "tags", "timestamp", "voice_path_url")
+
+
+def _parse_fields(fields):
+    if not fields:
+        return MEMORY_FIELDS
+    requested = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = set(requested) - set(MEMORY_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+
+def _fetch_page(user_id, where, offset, limit, fields):
+    """One page of memories with only the requested fields (never embeddings)."""
+    include = []
+    if "text" in fields:
+        include.append("documents")
+    if set(fields) - {"id", "text"}:
+        include.append("metadatas")
+    results = get_user_collection(user_id).get(where=where, limit=limit, offset=offset, include=include)
+
+    memories = []
+    for i, memory_id in enumerate(results['ids']):
+        metadata = results['metadatas'][i] if results.get('metadatas') else {}
+        metadata = metadata or {}
+        memory = {
+            "id": memory_id,
+            "text": results['documents'][i] if results.get('documents') else None,
+            "summary": metadata.get('summary', ''),
+            "tags": metadata.get('tags', '').split(',') if metadata.get('tags') else [],
+            "timestamp": metadata.get('timestamp', ''),
+            "voice_path_url": metadata.get('voice_path_url', '')
+        }
+        memories.append({field: memory[field] for field in fields})
+    return memories
+
+
+async def _export(user_id, where, offset, fields):
+    # 📤 NDJSON export: one memory per line, a page at a time, so memory use stays flat
+    while True:
+        page = await asyncio.to_thread(_fetch_page, user_id, where, offset, MEMORIES_EXPORT_PAGE, fields)
+        if page:
+            yield b"".join(orjson.dumps(memory) + b"\n" for memory in page)
+        if len(page) < MEMORIES_EXPORT_PAGE:
+            return
+        offset += len(page)
+
+
 @router.get("/memories")
-async def get_memories():
+async def get_memories(
+    user_id: str = Depends(current_user),
+    limit: int = Query(100, ge=1, le=MEMORIES_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = None,  # e.g. "id,summary,tags" — default is every field
+    tag: Optional[str] = None,
+    format: str = "json"  # "ndjson" streams every memory from offset on (limit is ignored)
+):
     try:
-        # Get all memories from ChromaDB
-        results = collection.get()
-        
-        memories = []
-        for i, doc in enumerate(results['documents']):
-            metadata = results['metadatas'][i]
-            memories.append({
-                "id": results['ids'][i],
-                "text": doc,
-                "summary": metadata.get('summary', ''),
-                "tags": metadata.get('tags', '').split(',') if metadata.get('tags') else [],
-                "timestamp": metadata.get('timestamp', ''),
-                "voice_path_url": metadata.get('voice_path_url', '')
-            })
-        
-        return {"status": "success", "data": memories}
+        selected = _parse_fields(fields)
+        where = combine_filters(user_filter(user_id), tag_filter(tag) if tag else None)
+
+        if format == "ndjson":
+            return StreamingResponse(_export(user_id, where, offset, selected), media_type="application/x-ndjson")
+
+        # Get one page of this user's memories; one extra row tells us if there is a next page
+        memories = await asyncio.to_thread(_fetch_page, user_id, where, offset, limit + 1, selected)
+        has_more = len(memories) > limit
+        memories = memories[:limit]
+
+        return ORJSONResponse({
+            "status": "success",
+            "data": memories,
+            "page": {
+                "offset": offset,
+                "limit": limit,
+                "next_offset": offset + limit if has_more else None
+            }
+        })
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -0,0 +1,377 @@
+import os
+import math
+import time
+import random
+import asyncio
+import contextlib
+import contextvars
+from collections import deque
+
+import httpx
+
+from routes.admission import Overloaded
+from routes.http_clients import is_retryable
+from routes.telemetry import CounterFamily, log_event
+
+# ⚙️ Upstream resilience (override via .env)
+# Per upstream: <NAME>_ATTEMPT_TIMEOUT_SECONDS, <NAME>_RETRIES, <NAME>_RETRY_BACKOFF_SECONDS,
+# <NAME>_HEDGE (1/0), <NAME>_BREAKER_FAILURES, <NAME>_BREAKER_OPEN_SECONDS, e.g. COHERE_RETRIES=2
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))  # recent outcomes the failure ratio is taken over
+BREAKER_FAILURE_RATIO = float(os.getenv("BREAKER_FAILURE_RATIO", "0.5"))
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "45"))  # /chat, /voice-chat end to end
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))  # recent call latencies the hedge delay is taken from
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))  # no hedging until this many were seen
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.2"))
+RETRY_AFTER_MAX_SECONDS = float(os.getenv("RETRY_AFTER_MAX_SECONDS", "5"))  # longest upstream Retry-After honoured
+
+UPSTREAM_RETRIES = CounterFamily("swarsmriti_upstream_retries_total", "Upstream calls retried after a transient failure.", "upstream")
+UPSTREAM_HEDGES = CounterFamily("swarsmriti_upstream_hedges_total", "Duplicate requests sent after the hedge delay.", "upstream")
+UPSTREAM_HEDGE_WINS = CounterFamily("swarsmriti_upstream_hedge_wins_total", "Hedged requests that answered first.", "upstream")
+UPSTREAM_SHORT_CIRCUITS = CounterFamily(
+    "swarsmriti_upstream_short_circuits_total", "Calls failed fast because the circuit was open.", "upstream"
+)
+
+_deadline = contextvars.ContextVar("deadline", default=None)  # time.monotonic() value
+
+
+class DeadlineExceeded(Exception):
+    """The request's end-to-end deadline passed; callers should answer 504."""
+
+
+class CircuitOpen(Overloaded):
+    """The upstream failed repeatedly and is being given a rest; answered as 503 + Retry-After."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message, status_code=503, retry_after=retry_after)
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    """Give the code inside (and tasks it starts) at most ``seconds``; nested deadlines only shorten."""
+    current = _deadline.get()
+    expires_at = time.monotonic() + seconds
+    token = _deadline.set(expires_at if current is None else min(current, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline, or None when there is none."""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+# Routes whose whole pipeline (retrieval, answer, speech) runs under REQUEST_DEADLINE_SECONDS
+DEADLINE_ROUTES = {("POST", "/chat"), ("POST", "/voice-chat")}
+
+
+class RequestDeadline:
+    """ASGI middleware: the deadline starts when the request arrives, so queueing counts too.
+
+    Tasks the endpoint starts (coalesced pipelines, streamed answers) inherit it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and (scope["method"], scope["path"].rstrip("/")) in DEADLINE_ROUTES:
+            with deadline(REQUEST_DEADLINE_SECONDS):
+                await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class CircuitBreaker:
+    """Fails calls fast while an upstream is unhealthy.
+
+    Opens when at least ``failures`` of the last BREAKER_WINDOW calls failed
+    and they make up BREAKER_FAILURE_RATIO of it, so a few slow calls that
+    time out together don't trip it but an outage does within ``failures``
+    calls. After ``open_seconds`` one probe call is let through (half-open):
+    success closes the circuit, failure opens it for another ``open_seconds``.
+    ``failures=0`` disables the breaker.
+    """
+
+    def __init__(self, name, failures, open_seconds):
+        self.name = name
+        self.failures = failures
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self._outcomes = deque(maxlen=max(BREAKER_WINDOW, failures))  # True = failed
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+
+    def check(self):
+        """Raise CircuitOpen while the circuit is open (without claiming the half-open probe)."""
+        if self.state == "open":
+            wait = self._opened_at + self.open_seconds - time.monotonic()
+            if wait > 0:
+                UPSTREAM_SHORT_CIRCUITS.inc(self.name)
+                raise CircuitOpen(f"{self.name} is failing; not calling it for now", math.ceil(wait))
+
+    def before(self):
+        if self.failures <= 0:
+            return
+        self.check()
+        if self.state == "open":
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            if self._probing:
+                UPSTREAM_SHORT_CIRCUITS.inc(self.name)
+                raise CircuitOpen(f"{self.name} is failing; waiting on a probe call", 1)
+            self._probing = True
+
+    def success(self):
+        self._probing = False
+        if self.state != "closed":
+            self.state = "closed"
+            self._outcomes.clear()
+            log_event("circuit_closed", upstream=self.name)
+        self._outcomes.append(False)
+
+    def failure(self):
+        self._probing = False
+        self._outcomes.append(True)
+        failed = sum(self._outcomes)
+        tripped = failed >= self.failures and failed >= BREAKER_FAILURE_RATIO * len(self._outcomes)
+        if self.failures > 0 and self.state != "open" and (self.state == "half_open" or tripped):
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            self.opened += 1
+            log_event("circuit_opened", upstream=self.name, recent_failures=failed, window=len(self._outcomes))
+
+    def abandon(self):
+        # The call ended without telling us anything about the upstream (cancelled, shed locally)
+        self._probing = False
+
+
+class Upstream:
+    """Deadline, retry, hedging and circuit-breaker policy for one upstream.
+
+    ``call(send)`` runs ``send(timeout)`` (which makes one HTTP request and
+    raises for bad statuses) under the upstream's limiter. Each attempt gets
+    ``attempt_timeout`` or whatever is left of the request deadline, if less.
+    Retryable failures (429, 5xx, transport errors, timeouts) are retried with
+    jittered exponential backoff, honouring a short Retry-After; a retry that
+    could not finish before the deadline is not started. With ``hedge``, a
+    duplicate request goes out once an attempt has taken longer than the p95
+    of recent calls, and the first answer wins. Only hedge idempotent calls.
+    """
+
+    def __init__(self, name, limiter, attempt_timeout, retries, backoff, hedge, breaker):
+        self.name = name
+        self.limiter = limiter
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.breaker = breaker
+        self._latencies = deque(maxlen=HEDGE_WINDOW)
+
+        self.calls = 0
+        self.failures = 0
+        self.deadline_exceeded = 0
+
+    def timeout(self):
+        """Time allowed for one attempt; raises DeadlineExceeded if none is left."""
+        left = remaining()
+        if left is None:
+            return self.attempt_timeout
+        if left <= 0:
+            self.deadline_exceeded += 1
+            raise DeadlineExceeded(f"No time left for a {self.name} call")
+        return min(self.attempt_timeout, left)
+
+    def hedge_delay(self):
+        if not self.hedge or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return max(HEDGE_MIN_DELAY_SECONDS, ordered[int(0.95 * (len(ordered) - 1))])
+
+    async def call(self, send, retries=None):
+        retries = self.retries if retries is None else retries
+        self.calls += 1
+        for attempt in range(retries + 1):
+            self.breaker.before()
+            try:
+                result = await self._attempt(send)
+            except (DeadlineExceeded, Overloaded):
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.success()  # it answered; the request was the problem
+                    raise
+                self.breaker.failure()
+                delay = self._backoff(attempt, e)
+                left = remaining()
+                if attempt == retries or (left is not None and delay >= left):
+                    self.failures += 1
+                    raise
+                UPSTREAM_RETRIES.inc(self.name)
+                log_event("upstream_retry", upstream=self.name, attempt=attempt + 1, error=repr(e),
+                          delay_ms=round(1000 * delay))
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.abandon()
+                raise
+            self.breaker.success()
+            return result
+
+    def _backoff(self, attempt, error):
+        delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+        if isinstance(error, httpx.HTTPStatusError):
+            try:
+                delay = max(delay, min(float(error.response.headers.get("Retry-After", 0)), RETRY_AFTER_MAX_SECONDS))
+            except ValueError:
+                pass  # an HTTP date; the jittered backoff will do
+        return delay
+
+    async def _send_once(self, send, slot_held=False):
+        if not slot_held:
+            await self.limiter.acquire(timeout=remaining())
+        try:
+            timeout = self.timeout()
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(send(timeout), timeout)
+            except asyncio.TimeoutError:
+                if timeout < self.attempt_timeout:
+                    self.deadline_exceeded += 1
+                    raise DeadlineExceeded(f"{self.name} call ran past the request deadline") from None
+                raise httpx.TimeoutException(f"{self.name} call took longer than {timeout:.1f}s") from None
+            except httpx.TimeoutException:
+                if timeout < self.attempt_timeout:
+                    self.deadline_exceeded += 1
+                    raise DeadlineExceeded(f"{self.name} call ran past the request deadline") from None
+                raise
+            self._latencies.append(time.perf_counter() - started)
+            return result
+        finally:
+            self.limiter.release()
+
+    async def _attempt(self, send):
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._send_once(send)
+
+        first = asyncio.create_task(self._send_once(send))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and self.limiter.try_acquire():
+                # Only hedge with a spare slot: never queue behind real work for a duplicate
+                UPSTREAM_HEDGES.inc(self.name)
+                hedge = asyncio.create_task(self._send_once(send, slot_held=True))
+                pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            UPSTREAM_HEDGE_WINS.inc(self.name)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @contextlib.asynccontextmanager
+    async def guard(self):
+        """Breaker and deadline for a call driven by the caller (e.g. a stream); yields its timeout.
+
+        No retries or hedging: part of the answer may already have been used.
+        """
+        self.breaker.before()
+        self.calls += 1
+        try:
+            timeout = self.timeout()
+        except DeadlineExceeded:
+            self.breaker.abandon()
+            raise
+        try:
+            yield timeout
+        except (DeadlineExceeded, Overloaded):
+            self.breaker.abandon()
+            raise
+        except httpx.TimeoutException:
+            if timeout < self.attempt_timeout:
+                self.breaker.abandon()
+                self.deadline_exceeded += 1
+                raise DeadlineExceeded(f"{self.name} stream ran past the request deadline") from None
+            self.breaker.failure()
+            self.failures += 1
+            raise
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.failure()
+                self.failures += 1
+            else:
+                self.breaker.success()
+            raise
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        self.breaker.success()
+
+    def stats(self):
+        delay = self.hedge_delay()
+        return {
+            "attempt_timeout_seconds": self.attempt_timeout,
+            "retries": self.retries,
+            "hedge": self.hedge,
+            "hedge_delay_ms": round(1000 * delay, 1) if delay is not None else None,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "calls": self.calls,
+            "failures": self.failures,
+            "deadline_exceeded": self.deadline_exceeded,
+            "retried": UPSTREAM_RETRIES.snapshot().get(self.name, 0),
+            "hedged": UPSTREAM_HEDGES.snapshot().get(self.name, 0),
+            "hedge_wins": UPSTREAM_HEDGE_WINS.snapshot().get(self.name, 0),
+            "short_circuited": UPSTREAM_SHORT_CIRCUITS.snapshot().get(self.name, 0),
+        }
+
+
+UPSTREAM_POLICIES = {}
+
+
+def register_upstream(name, limiter, attempt_timeout, retries, backoff, hedge=False, breaker_failures=5,
+                      breaker_open_seconds=15.0):
+    """Create the policy for ``name``; <NAME>_* settings override the defaults."""
+    prefix = name.upper()
+    upstream = Upstream(
+        name,
+        limiter,
+        float(os.getenv(f"{prefix}_ATTEMPT_TIMEOUT_SECONDS", str(attempt_timeout))),
+        int(os.getenv(f"{prefix}_RETRIES", str(retries))),
+        float(os.getenv(f"{prefix}_RETRY_BACKOFF_SECONDS", str(backoff))),
+        os.getenv(f"{prefix}_HEDGE", "1" if hedge else "0") == "1",
+        CircuitBreaker(
+            name,
+            int(os.getenv(f"{prefix}_BREAKER_FAILURES", str(breaker_failures))),
+            float(os.getenv(f"{prefix}_BREAKER_OPEN_SECONDS", str(breaker_open_seconds))),
+        ),
+    )
+    UPSTREAM_POLICIES[name] = upstream
+    return upstream
+
+
+def exposition():
+    lines = []
+    for family in (UPSTREAM_RETRIES, UPSTREAM_HEDGES, UPSTREAM_HEDGE_WINS, UPSTREAM_SHORT_CIRCUITS):
+        lines += family.exposition()
+    metric = "swarsmriti_upstream_circuit_state"
+    lines += [f"# HELP {metric} 0 closed, 1 half-open, 2 open.", f"# TYPE {metric} gauge"]
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    lines += [f'{metric}{{upstream="{name}"}} {states[upstream.breaker.state]}'
+              for name, upstream in sorted(UPSTREAM_POLICIES.items())]
+    return lines
@@ -0,0 +1,85 @@
+import os
+import time
+import asyncio
+
+# ⚙️ Request coalescing (override via .env)
+CHAT_COALESCE_GRACE_SECONDS = float(os.getenv("CHAT_COALESCE_GRACE_SECONDS", "5"))
+
+
+class SingleFlight:
+    """Run one pipeline per key; concurrent callers with the same key share it.
+
+    The pipeline runs as its own task, so a caller that disconnects doesn't
+    cancel it for the others. A successful result is also handed to callers
+    arriving within ``grace_seconds`` after it finished; failures are not
+    kept. ``cost(result)`` is the number of upstream calls the pipeline made,
+    used to report how many were saved.
+    """
+
+    def __init__(self, grace_seconds=CHAT_COALESCE_GRACE_SECONDS):
+        self.grace_seconds = grace_seconds
+        self._inflight = {}  # key -> asyncio.Task
+        self._recent = {}  # key -> (expires_at, result, cost)
+
+        self.runs = 0
+        self.coalesced = 0
+        self.grace_hits = 0
+        self.failures = 0
+        self.upstream_calls = 0
+        self.upstream_calls_saved = 0
+
+    async def run(self, key, factory, cost=lambda result: 1):
+        """Result of ``factory()`` for ``key``; returns ``(result, shared)``."""
+        self._expire()
+        recent = self._recent.get(key)
+        if recent is not None:
+            self.grace_hits += 1
+            self.upstream_calls_saved += recent[2]
+            return recent[1], True
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            result = await asyncio.shield(task)
+            self.upstream_calls_saved += cost(result)
+            return result, True
+
+        task = asyncio.create_task(factory())
+        self._inflight[key] = task
+        self.runs += 1
+        task.add_done_callback(lambda done: self._finished(key, done, cost))
+        return await asyncio.shield(task), False
+
+    def _finished(self, key, task, cost):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            self.failures += 1
+            return
+        calls = cost(task.result())
+        self.upstream_calls += calls
+        if self.grace_seconds > 0:
+            self._recent[key] = (time.monotonic() + self.grace_seconds, task.result(), calls)
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _, _) in self._recent.items() if expires_at <= now]:
+            del self._recent[key]
+
+    def stats(self):
+        self._expire()
+        shared = self.coalesced + self.grace_hits
+        return {
+            "grace_seconds": self.grace_seconds,
+            "in_flight": len(self._inflight),
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+            "grace_hits": self.grace_hits,
+            "shared_rate": round(shared / (shared + self.runs), 4) if shared + self.runs else 0.0,
+            "failures": self.failures,
+            "upstream_calls": self.upstream_calls,
+            "upstream_calls_saved": self.upstream_calls_saved,
+        }
+
+
+# /chat answers, keyed on (user, memory version, voice, stream flag, normalized question)
+CHAT_FLIGHTS = SingleFlight()
@@ -0,0 +1,156 @@
+import os
+import uuid
+import asyncio
+from contextlib import aclosing
+from collections import OrderedDict
+
+from routes.cohere_client import stream_answer, reserve_stream_slot, release_stream_slot
+from routes.elevenlabs_client import SentenceSegmenter, synthesize_chunk, TTS_REQUEST_CONCURRENCY
+from routes.http_clients import is_retryable
+from shared_audio_cache import open_audio_stream, close_audio_stream, AUDIO_CACHE, PENDING_AUDIO, AUDIO_PENDING_TTL_SECONDS
+
+# ⚙️ Streaming chunk sizes (override via .env)
+STREAM_FIRST_CHUNK_CHARS = int(os.getenv("STREAM_FIRST_CHUNK_CHARS", "60"))
+STREAM_MAX_CHUNK_CHARS = int(os.getenv("STREAM_MAX_CHUNK_CHARS", "250"))
+RECENT_ANSWERS_MAX = 256
+
+# Keep references so running pipelines aren't garbage collected
+_pipelines = set()
+# audio_id -> full answer text for recently finished streams
+_recent_answers = OrderedDict()
+
+
+def _release_once():
+    """``release_stream_slot`` that only releases on its first call."""
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            release_stream_slot()
+
+    return release
+
+
+async def _run_pipeline(prompt, stream, release_slot):
+    """LLM token stream → sentence segmenter → TTS → progressive audio stream.
+
+    ``release_slot`` hands back the Cohere slot reserved by
+    ``start_answer_stream`` as soon as the answer stream is over, however it ends.
+    Like ``synthesize_chunks``, only a chunk that used up its retries on a
+    transient error is dropped. Anything else (the request deadline,
+    Overloaded, an open circuit) stops the pipeline: outstanding chunks are
+    cancelled and the stream is closed with that error, even if some audio
+    was already sent.
+    """
+    segmenter = SentenceSegmenter(
+        max_length=STREAM_MAX_CHUNK_CHARS,
+        first_chunk_length=STREAM_FIRST_CHUNK_CHARS
+    )
+    request_slots = asyncio.Semaphore(TTS_REQUEST_CONCURRENCY)
+    in_order = asyncio.Queue()
+    tasks = []
+    last_error = None
+    fatal = None
+
+    async def writer():
+        nonlocal last_error, fatal
+        # Chunks synthesize concurrently but are appended in answer order
+        while True:
+            task = await in_order.get()
+            if task is None:
+                return
+            try:
+                await stream.append(await task)
+            except Exception as e:
+                if not is_retryable(e):
+                    print(f"❌ TTS failed, stopping the answer: {e}")
+                    fatal = e
+                    return
+                print(f"❌ TTS chunk dropped after retries: {e}")
+                last_error = e
+
+    def schedule(chunks):
+        if fatal is not None:
+            return
+        for chunk in chunks:
+            task = asyncio.create_task(synthesize_chunk(len(tasks), chunk, request_slots))
+            tasks.append(task)
+            in_order.put_nowait(task)
+
+    writer_task = asyncio.create_task(writer())
+    try:
+        # aclosing: the upstream stream is closed even if we stop early or fail
+        async with aclosing(stream_answer(prompt, slot_reserved=True)) as deltas:
+            async for delta in deltas:
+                stream.text += delta
+                schedule(segmenter.feed(delta))
+                if fatal is not None:
+                    break
+        schedule(segmenter.flush())
+    except Exception as e:
+        print(f"❌ Answer stream failed: {e}")
+        last_error = e
+    finally:
+        release_slot()  # Cohere is done; the TTS tail doesn't need its slot
+        in_order.put_nowait(None)
+        await writer_task
+        # Left over only when the writer stopped early (or we were cancelled)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _remember_answer(stream.audio_id, stream.text.strip())
+        if AUDIO_CACHE.shared:
+            try:
+                await asyncio.to_thread(AUDIO_CACHE.set_answer, stream.audio_id, stream.text.strip())
+            except Exception as e:
+                print(f"❌ Storing answer text for {stream.audio_id} failed: {e}")
+        await close_audio_stream(stream, fatal or (None if stream.chunks else last_error))
+
+
+def _remember_answer(audio_id, text):
+    _recent_answers[audio_id] = text
+    while len(_recent_answers) > RECENT_ANSWERS_MAX:
+        _recent_answers.popitem(last=False)
+
+
+async def start_answer_stream(prompt: str):
+    """Start generating the answer and its audio in the background.
+
+    Returns the AudioStream right away so the caller can hand out
+    ``/audio/{audio_id}`` before the first byte is synthesized. The Cohere
+    slot is taken first, so an overloaded worker raises Overloaded here
+    instead of handing out an audio URL that would never play.
+    """
+    await reserve_stream_slot()
+    try:
+        stream = await open_audio_stream(str(uuid.uuid4()))
+    except BaseException:
+        release_stream_slot()
+        raise
+    release_slot = _release_once()
+    task = asyncio.create_task(_run_pipeline(prompt, stream, release_slot))
+    _pipelines.add(task)
+    task.add_done_callback(_pipelines.discard)
+    # A task cancelled before its first step never reaches _run_pipeline's finally
+    task.add_done_callback(lambda _: release_slot())
+    return stream
+
+
+async def get_streamed_answer(audio_id: str):
+    """Full answer text for a streamed reply, waiting for it if still running."""
+    stream = PENDING_AUDIO.get(audio_id)
+    if stream is not None:
+        await stream.wait_done()
+        return stream.text.strip()
+    answer = _recent_answers.get(audio_id)
+    if answer is None and AUDIO_CACHE.shared:
+        # Produced by another worker: wait for it to finish, then read it from the shared store
+        deadline = asyncio.get_running_loop().time() + AUDIO_PENDING_TTL_SECONDS
+        while await asyncio.to_thread(AUDIO_CACHE.is_pending, audio_id):
+            if asyncio.get_running_loop().time() > deadline:
+                return None
+            await asyncio.sleep(0.1)
+        answer = await asyncio.to_thread(AUDIO_CACHE.get_answer, audio_id)
+    return answer
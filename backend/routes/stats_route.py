@@ -0,0 +1,69 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from routes.http_clients import client_stats
+from routes.tts_cache import open_tts_cache
+from routes.transcription_pool import TRANSCRIPTION_POOL
+from routes.ingest_jobs import INGEST_QUEUE
+from chroma_local.query_cache import QUERY_CACHE
+from routes.single_flight import CHAT_FLIGHTS
+from routes.telemetry import STAGE_SECONDS, STAGE_ERRORS, REQUEST_SECONDS, exposition
+from routes import admission, resilience, ingest_jobs
+
+router = APIRouter()
+
+
+@router.get("/upstreams/stats")
+async def get_upstream_stats():
+    data = client_stats()
+    for name, upstream in resilience.UPSTREAM_POLICIES.items():
+        data.setdefault(name, {})["resilience"] = upstream.stats()
+    return {"status": "success", "data": data}
+
+
+@router.get("/tts-cache/stats")
+async def get_tts_cache_stats():
+    cache = await open_tts_cache()
+    if cache is None:
+        return {"status": "success", "data": {"enabled": False}}
+    return {"status": "success", "data": {"enabled": True, **cache.stats()}}
+
+
+@router.get("/transcription/stats")
+async def get_transcription_stats():
+    return {"status": "success", "data": TRANSCRIPTION_POOL.stats()}
+
+
+@router.get("/ingest/stats")
+async def get_ingest_stats():
+    return {"status": "success", "data": INGEST_QUEUE.stats()}
+
+
+@router.get("/memory-cache/stats")
+async def get_memory_cache_stats():
+    return {"status": "success", "data": QUERY_CACHE.stats()}
+
+
+@router.get("/chat-coalescing/stats")
+async def get_chat_coalescing_stats():
+    return {"status": "success", "data": CHAT_FLIGHTS.stats()}
+
+
+@router.get("/stages/stats")
+async def get_stage_stats():
+    # p50/p95/p99 are interpolated from the /metrics histogram buckets
+    return {
+        "status": "success",
+        "data": {
+            "stages": STAGE_SECONDS.summary(),
+            "stage_errors": STAGE_ERRORS.snapshot(),
+            "routes": REQUEST_SECONDS.summary(),
+        }
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    extra = admission.exposition() + resilience.exposition() + ingest_jobs.exposition()
+    body = exposition() + "\n".join(extra) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
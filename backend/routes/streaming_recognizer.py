@@ -0,0 +1,137 @@
+import os
+import json
+import asyncio
+
+from vosk import KaldiRecognizer
+
+from routes.vosk_transcriber import get_model
+
+# ⚙️ Live recognition sessions (override via .env)
+STT_MAX_STREAMS = int(os.getenv("STT_MAX_STREAMS", "16"))
+STT_STREAM_SAMPLE_RATE = int(os.getenv("STT_STREAM_SAMPLE_RATE", "16000"))
+STT_STREAM_MIN_SAMPLE_RATE = 8000   # telephone audio
+STT_STREAM_MAX_SAMPLE_RATE = 48000  # the highest rate browsers capture at
+
+_active_streams = 0
+
+
+class StreamBusy(Exception):
+    """Too many live recognition sessions on this worker."""
+
+
+class UnsupportedSampleRate(ValueError):
+    """The client asked for a sample rate Vosk shouldn't be built with."""
+
+
+async def warm_up():
+    """Load the model in this process, so the first live session doesn't stall on it.
+
+    Live sessions decode in the web process, not in the transcription pool's
+    workers, which in process mode never load the parent's copy.
+    """
+    if STT_MAX_STREAMS > 0:
+        await asyncio.to_thread(get_model)
+
+
+class StreamingRecognizer:
+    """One KaldiRecognizer fed with PCM frames as they arrive.
+
+    Frames are 16-bit little-endian mono PCM at ``sample_rate``. Decoding
+    runs in a worker thread (Vosk releases the GIL) so the event loop keeps
+    serving other sockets. Use as an async context manager so the session
+    slot is always released.
+    """
+
+    def __init__(self, sample_rate=STT_STREAM_SAMPLE_RATE):
+        if not STT_STREAM_MIN_SAMPLE_RATE <= sample_rate <= STT_STREAM_MAX_SAMPLE_RATE:
+            raise UnsupportedSampleRate(
+                f"sample_rate must be between {STT_STREAM_MIN_SAMPLE_RATE} and {STT_STREAM_MAX_SAMPLE_RATE} Hz"
+            )
+        self.sample_rate = sample_rate
+        self.finals = []
+        self.audio_bytes = 0
+        self._last_partial = ""
+        self._recognizer = None
+
+    async def __aenter__(self):
+        global _active_streams
+        if _active_streams >= STT_MAX_STREAMS:
+            raise StreamBusy("Too many live transcription sessions")
+        _active_streams += 1
+        try:
+            # get_model() may load (or download) the model: keep it off the event loop too
+            self._recognizer = await asyncio.to_thread(
+                lambda: KaldiRecognizer(get_model(), self.sample_rate)
+            )
+        except Exception:
+            _active_streams -= 1
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        global _active_streams
+        _active_streams -= 1
+        self._recognizer = None
+
+    async def accept(self, pcm: bytes):
+        """Feed one frame; returns a message dict to push to the client, or None.
+
+        ``{"type": "final", ...}`` means Vosk detected the end of an utterance.
+        """
+        self.audio_bytes += len(pcm)
+        endpoint = await asyncio.to_thread(self._recognizer.AcceptWaveform, pcm)
+        if endpoint:
+            text = json.loads(self._recognizer.Result()).get("text", "")
+            self._last_partial = ""
+            if text:
+                self.finals.append(text)
+                return {"type": "final", "text": text}
+            return None
+
+        partial = json.loads(self._recognizer.PartialResult()).get("partial", "")
+        if partial and partial != self._last_partial:
+            self._last_partial = partial
+            return {"type": "partial", "text": partial}
+        return None
+
+    async def finish(self) -> str:
+        """Flush the recognizer and return the whole transcript."""
+        text = json.loads(await asyncio.to_thread(self._recognizer.FinalResult)).get("text", "")
+        if text:
+            self.finals.append(text)
+        return " ".join(self.finals).strip()
+
+    @property
+    def audio_seconds(self):
+        return self.audio_bytes / (2 * self.sample_rate)
+
+
+async def recognize_from_socket(websocket, recognizer, stop_on_endpoint=False):
+    """Pump PCM frames from ``websocket`` into ``recognizer``.
+
+    Binary messages are audio; the text message ``{"type": "end"}`` marks the
+    end of capture. Partial and final hypotheses are pushed back as they
+    appear. With ``stop_on_endpoint`` the first non-empty final result ends
+    the session, so callers can act on the utterance immediately. Returns the
+    transcript, or None if the client disconnected.
+    """
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return None
+
+        if message.get("bytes"):
+            update = await recognizer.accept(message["bytes"])
+            if update:
+                await websocket.send_json(update)
+                if stop_on_endpoint and update["type"] == "final":
+                    break
+        elif message.get("text"):
+            try:
+                control = json.loads(message["text"])
+            except ValueError:
+                continue
+            if control.get("type") == "end":
+                break
+
+    return await recognizer.finish()
@@ -0,0 +1,270 @@
+import os
+import sys
+import time
+import queue
+import logging
+import threading
+import contextlib
+import logging.handlers
+
+import orjson
+
+# ⚙️ Logging and tracing (override via .env)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "0") == "1"  # exporter reads OTEL_EXPORTER_OTLP_* itself
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "swarsmriti-backend")
+
+# Seconds; from a cache hit up to a slow LLM answer
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+log = logging.getLogger("swarsmriti")
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items())
+        return f"{self.formatTime(record)} {record.levelname} {record.getMessage()} {fields}".rstrip()
+
+
+_listener = None
+
+
+def setup_logging():
+    """Send the "swarsmriti" logger through a queue; a background thread does the writing.
+
+    Request handlers only pay for putting a record on the queue, never for
+    formatting or a slow stdout.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    records = queue.SimpleQueue()
+    log.addHandler(logging.handlers.QueueHandler(records))
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+
+
+def shutdown_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def log_event(event, level=logging.INFO, **fields):
+    if log.isEnabledFor(level):
+        log.log(level, event, extra={"fields": fields})
+
+
+class HistogramFamily:
+    """Prometheus-style cumulative histograms, one per label value."""
+
+    def __init__(self, name, help_text, label, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, seconds):
+        with self._lock:
+            series = self._series.get(value)
+            if series is None:
+                series = self._series[value] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += seconds
+
+    def _quantile(self, counts, q):
+        # Same linear interpolation within a bucket as PromQL's histogram_quantile
+        total = sum(counts)
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            if count and seen + count >= rank:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+    def summary(self):
+        with self._lock:
+            snapshot = {value: list(series) for value, series in self._series.items()}
+        result = {}
+        for value, series in sorted(snapshot.items()):
+            counts, total_seconds = series[:-1], series[-1]
+            count = sum(counts)
+            result[value] = {
+                "count": count,
+                "mean_ms": round(1000 * total_seconds / count, 2) if count else 0.0,
+                **{f"p{int(q * 100)}_ms": round(1000 * self._quantile(counts, q), 2) for q in (0.5, 0.95, 0.99)},
+            }
+        return result
+
+    def exposition(self):
+        with self._lock:
+            snapshot = {value: list(series) for value, series in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for value, series in sorted(snapshot.items()):
+            label = f'{self.label}="{_escape(value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+
+class CounterFamily:
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value, amount=1):
+        with self._lock:
+            self._values[value] = self._values.get(value, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for value, count in sorted(self.snapshot().items()):
+            lines.append(f'{self.name}{{{self.label}="{_escape(value)}"}} {count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+STAGE_SECONDS = HistogramFamily(
+    "swarsmriti_stage_duration_seconds", "Time spent in each pipeline stage.", "stage"
+)
+STAGE_ERRORS = CounterFamily(
+    "swarsmriti_stage_errors_total", "Pipeline stages that raised.", "stage"
+)
+REQUEST_SECONDS = HistogramFamily(
+    "swarsmriti_request_duration_seconds", "HTTP request time until the last body byte is sent.", "route"
+)
+
+_tracer = None
+_tracer_provider = None
+
+
+def setup_tracing():
+    """Export stage spans over OTLP when OTEL_ENABLED=1 (spans are batched on a background thread)."""
+    global _tracer, _tracer_provider
+    if not OTEL_ENABLED or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    except ImportError as e:
+        print(f"⚠️ OTEL_ENABLED=1 but OpenTelemetry isn't installed ({e}); tracing is off")
+        return
+    _tracer_provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+    _tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(_tracer_provider)
+    _tracer = trace.get_tracer("swarsmriti")
+    print(f"🔭 OpenTelemetry tracing on as {OTEL_SERVICE_NAME}")
+
+
+def shutdown_tracing():
+    global _tracer, _tracer_provider
+    if _tracer_provider is not None:
+        _tracer_provider.shutdown()
+    _tracer = _tracer_provider = None
+
+
+@contextlib.contextmanager
+def span(stage, **attributes):
+    """Time a pipeline stage: histogram, error count, debug log line and (optionally) a trace span.
+
+    Works in sync and async code alike (``with span("query_memory"): ...``).
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    traced = _tracer.start_as_current_span(stage, attributes=attributes) if _tracer else contextlib.nullcontext()
+    with traced:
+        try:
+            yield
+        except Exception:
+            outcome = "error"
+            STAGE_ERRORS.inc(stage)
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            STAGE_SECONDS.observe(stage, seconds)
+            log_event("stage", logging.DEBUG, stage=stage, ms=round(1000 * seconds, 2), outcome=outcome, **attributes)
+
+
+def record(stage, seconds, **attributes):
+    """Record a stage timed elsewhere (e.g. in a worker process) as if it had just ended."""
+    STAGE_SECONDS.observe(stage, seconds)
+    log_event("stage", logging.DEBUG, stage=stage, ms=round(1000 * seconds, 2), outcome="ok", **attributes)
+    if _tracer is not None:
+        end = time.time_ns()
+        _tracer.start_span(stage, attributes=attributes, start_time=end - int(seconds * 1e9)).end(end_time=end)
+
+
+class RequestTimer:
+    """ASGI middleware: request latency per route template (never the raw path, to bound cardinality)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(f"{scope['method']} {path}", time.perf_counter() - started)
+
+
+def exposition():
+    """Everything above in the Prometheus text format (version 0.0.4)."""
+    lines = STAGE_SECONDS.exposition() + STAGE_ERRORS.exposition() + REQUEST_SECONDS.exposition()
+    return "\n".join(lines) + "\n"
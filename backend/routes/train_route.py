@@ -1,20 +1,44 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List
+import logging
 
-from routes.cohere_client import summarize
-from chroma_local.memory_manager import store_memory
+from routes.ingest import ingest_texts, ingest_succeeded
+from routes.ingest_jobs import INGEST_QUEUE, IngestQueueFull
+from routes.identity import current_user
+from routes.telemetry import log_event
 
 router = APIRouter()
 
-class TrainRequest(BaseModel):
+class TrainItem(BaseModel):
     text: str
     tags: List[str] = []
 
-@router.post("/train")
-async def train_memory(data: TrainRequest):
-    MAX_INPUT_CHARS = 3000
+class TrainRequest(TrainItem):
+    background: bool = False  # ⬅️ True queues the work and returns a job id at once
+
+class TrainBatchRequest(BaseModel):
+    items: List[TrainItem]
+    summarize: bool = True  # ⬅️ False stores passages with a text excerpt as the summary (no Cohere calls)
+    background: bool = False
+
+def enqueue(items, user_id, summarize_passages=True):
+    try:
+        job = INGEST_QUEUE.submit(items, user_id=user_id, summarize_passages=summarize_passages)
+    except IngestQueueFull as e:
+        return JSONResponse(
+            status_code=429,
+            content={"status": "error", "message": str(e)},
+            headers={"Retry-After": "5"}
+        )
+    return JSONResponse(
+        status_code=202,
+        content={"status": "queued", "job_id": job.id, "status_url": f"/train/jobs/{job.id}"}
+    )
 
+@router.post("/train")
+async def train_memory(data: TrainRequest, user_id: str = Depends(current_user)):
     cleaned_text = data.text.strip()
     if len(cleaned_text) < 100:  # ⬅️ Allow shorter inputs (not just >250)
         return {
@@ -22,31 +46,66 @@ async def train_memory(data: TrainRequest):
             "message": "Text must be at least 100 characters for training."
         }
 
-    # Truncate if too long
-    if len(cleaned_text) > MAX_INPUT_CHARS:
-        cleaned_text = cleaned_text[:MAX_INPUT_CHARS]
+    log_event("train_input", logging.DEBUG, chars=len(cleaned_text))
 
-    print("🧪 Input text length:", len(cleaned_text))
+    if data.background:
+        return enqueue([{"text": cleaned_text, "tags": data.tags}], user_id)
 
-    summary = await summarize(cleaned_text)
+    # ✂️ Long texts are split into overlapping passages instead of truncated
+    report = await ingest_texts([{"text": cleaned_text, "tags": data.tags}], user_id=user_id)
 
-    if summary.startswith("Error:"):
+    if not ingest_succeeded(report):
         return {
             "status": "error",
-            "error_message": summary
+            "error_message": report["failures"][0]["error"] if report["failures"] else "Nothing stored"
         }
 
-    store_memory(
-        user_id="arpit",
-        text=cleaned_text,
-        summary=summary,
-        tags=data.tags
-    )
+    if not report["stored"]:
+        # ♻️ A resubmission: every passage is already stored
+        return {
+            "status": "success",
+            "message": "✅ This memory is already stored",
+            "data": {"summary": None, "passages": 0, "duplicates": report["duplicates"], "failures": []}
+        }
 
+    # ⚠️ Some passages can fail (e.g. Cohere errors) while the rest are stored
+    failures = report["failures"]
     return {
         "status": "success",
-    "message": "✅ Memory stored successfully!",
+    "message": f"⚠️ Memory stored, but {len(failures)} passage(s) failed" if failures else "✅ Memory stored successfully!",
     "data": {
-        "summary": summary  # or whatever you're generating
+        "summary": report["summaries"][0],
+        "passages": report["stored"],
+        "failures": failures
     }
     }
+
+@router.post("/train/batch")
+async def train_batch(data: TrainBatchRequest, user_id: str = Depends(current_user)):
+    if not data.items:
+        return {"status": "error", "message": "No items to train on."}
+
+    items = [item.model_dump() for item in data.items]
+    if data.background:
+        return enqueue(items, user_id, data.summarize)
+
+    report = await ingest_texts(
+        items,
+        user_id=user_id,
+        summarize_passages=data.summarize
+    )
+    log_event("train_batch", logging.DEBUG, stored=report["stored"], items=report["items"],
+              seconds=report["seconds"], docs_per_second=report["docs_per_second"])
+
+    return {
+        "status": "success" if ingest_succeeded(report) else "error",
+        "data": report
+    }
+
+@router.get("/train/jobs/{job_id}")
+async def get_train_job(job_id: str, user_id: str = Depends(current_user)):
+    job = INGEST_QUEUE.get(job_id)
+    # 🔒 Someone else's job looks the same as an unknown one
+    if job is None or job.user_id != user_id:
+        return JSONResponse(status_code=404, content={"status": "error", "message": "Unknown or expired job id"})
+    return {"status": "success", "data": job.to_dict()}
@@ -1,33 +1,59 @@
-from fastapi import APIRouter, File, UploadFile
+from fastapi import APIRouter, File, UploadFile, WebSocket
 from fastapi.responses import JSONResponse
-from routes.vosk_transcriber import transcribe_from_path
-import shutil
-import os
-import uuid
+from routes.transcription_pool import transcribe, TranscriptionBusy, TranscriptionTimeout
+from routes.streaming_recognizer import (
+    StreamingRecognizer, StreamBusy, UnsupportedSampleRate, recognize_from_socket, STT_STREAM_SAMPLE_RATE
+)
+from routes.audio_frontend import load_pcm16, AudioDecodeError, UploadTooLarge
+from routes.admission import overloaded_response
 
 router = APIRouter()
 
 @router.post("/transcribe")
 async def transcribe_audio(file: UploadFile = File(...)):
     try:
-        if not file.filename.endswith(".wav"):
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Only .wav files are supported. Please upload a WAV file (mono, 16-bit PCM)."}
-            )
+        # Read + decode in memory: any WAV (rate / channels / bit depth) → 16 kHz mono PCM
+        try:
+            pcm = await load_pcm16(file)
+        except AudioDecodeError as e:
+            return JSONResponse(status_code=415, content={"error": str(e)})
+        except UploadTooLarge as e:
+            return JSONResponse(status_code=413, content={"error": str(e)})
 
-        # Save uploaded .wav file to disk
-        temp_wav = f"temp_{uuid.uuid4()}.wav"
-        with open(temp_wav, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Transcribe in the worker pool (off the event loop)
+        transcript, timing = await transcribe(pcm)
 
-        # Transcribe directly
-        transcript = transcribe_from_path(temp_wav)
-
-        # Cleanup
-        os.remove(temp_wav)
-
-        return {"transcript": transcript}
+        return {"transcript": transcript, "timing": timing}
 
+    except TranscriptionBusy as e:
+        return overloaded_response(e, body_key="error")
+    except TranscriptionTimeout as e:
+        return JSONResponse(status_code=504, content={"error": str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+# 🎙️ Live transcription: binary PCM frames in (16-bit mono), JSON hypotheses out
+@router.websocket("/ws/transcribe")
+async def transcribe_stream(websocket: WebSocket, sample_rate: int = STT_STREAM_SAMPLE_RATE):
+    await websocket.accept()
+    try:
+        async with StreamingRecognizer(sample_rate) as recognizer:
+            await websocket.send_json({"type": "ready", "sample_rate": sample_rate})
+            transcript = await recognize_from_socket(websocket, recognizer)
+            if transcript is None:
+                return
+            await websocket.send_json({
+                "type": "done",
+                "transcript": transcript,
+                "audio_seconds": round(recognizer.audio_seconds, 2)
+            })
+    except StreamBusy as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close(code=1013)  # try again later
+        return
+    except UnsupportedSampleRate as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close(code=1003)  # unsupported data
+        return
+    await websocket.close()
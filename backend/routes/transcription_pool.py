@@ -0,0 +1,239 @@
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from routes.vosk_transcriber import get_model, resolve_model_path, transcribe_pcm, warm_up as warm_up_model
+from routes.vad import trim_silence
+from routes.telemetry import record, log_event
+from routes.admission import Overloaded, register_limiter
+
+# ⚙️ Speech-to-text workers (override via .env)
+STT_EXECUTOR = os.getenv("STT_EXECUTOR", "process")  # "process" or "thread"
+STT_WORKERS = int(os.getenv("STT_WORKERS", str(os.cpu_count() or 1)))
+STT_MAX_QUEUE = int(os.getenv("STT_MAX_QUEUE", str(2 * (os.cpu_count() or 1))))
+STT_JOB_TIMEOUT_SECONDS = float(os.getenv("STT_JOB_TIMEOUT_SECONDS", "60"))
+STT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("STT_QUEUE_TIMEOUT_SECONDS", "10"))  # longest wait for a free worker
+
+
+class TranscriptionBusy(Overloaded):
+    """No worker came free: 429 when the wait queue is full, 503 when the wait timed out."""
+
+
+class TranscriptionTimeout(Exception):
+    """The job did not finish within STT_JOB_TIMEOUT_SECONDS."""
+
+
+def _init_worker(model_path):
+    # Each worker process loads its own Model once, up front, from the path the parent resolved
+    get_model(model_path)
+
+
+def _decode_job(pcm, submitted_at):
+    # Runs inside a worker. time.time() is comparable across processes.
+    started = time.time()
+    # 🔇 Only voiced audio reaches Kaldi
+    voiced, seconds_in, seconds_decoded = trim_silence(pcm)
+    text = transcribe_pcm(get_model(), voiced) if voiced else ""
+    finished = time.time()
+    return text, started - submitted_at, finished - started, seconds_in, seconds_decoded
+
+
+class TranscriptionPool:
+    """Bounded executor for Vosk decoding, kept off the event loop.
+
+    In ``process`` mode every worker process holds its own loaded Model. In
+    ``thread`` mode the workers share one Model; Vosk's cffi calls release the
+    GIL, so decodes still run in parallel. Jobs are admitted through the
+    "vosk" limiter: one per worker, with up to ``max_queue`` more waiting for
+    at most ``queue_timeout`` seconds; past that ``submit`` raises
+    TranscriptionBusy. A job keeps its slot until the worker is done with it,
+    even when the caller has already timed out.
+
+    The model is located (or downloaded) once, in this process, before any
+    worker starts; workers only load it from that path. An executor that
+    breaks (a worker or its initializer died) is replaced on the next job.
+    """
+
+    def __init__(self, mode=STT_EXECUTOR, workers=STT_WORKERS, max_queue=STT_MAX_QUEUE,
+                 timeout=STT_JOB_TIMEOUT_SECONDS, queue_timeout=STT_QUEUE_TIMEOUT_SECONDS):
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.limiter = register_limiter("vosk", self.workers, max(0, max_queue), queue_timeout)
+        self.model_path = None
+        self._executor = None
+        self._starting = asyncio.Lock()
+        self._inflight = 0
+        self.restarts = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failed = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.decode_total = 0.0
+        self.decode_max = 0.0
+        self.audio_seconds_in = 0.0
+        self.audio_seconds_decoded = 0.0
+
+    async def start(self):
+        """The running executor, creating it (and resolving the model) if needed."""
+        if self._executor is not None:
+            return self._executor
+        async with self._starting:
+            if self._executor is None:
+                if self.model_path is None:
+                    # May download the model: off the event loop, and only here, never in the workers
+                    self.model_path = await asyncio.to_thread(resolve_model_path)
+                self._executor = self._build_executor()
+                print(f"🎙️ Transcription pool ready ({self.mode} x{self.workers}, queue {self.limiter.max_queue})")
+        return self._executor
+
+    def _build_executor(self):
+        if self.mode == "thread":
+            return ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="stt",
+                initializer=_init_worker, initargs=(self.model_path,)
+            )
+        # spawn: don't fork a process that is running an event loop
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_path,),
+        )
+
+    def _discard(self, executor, error):
+        # A broken executor refuses all further work; the next job builds a new one
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.restarts += 1
+            log_event("stt_pool_broken", logging.WARNING, mode=self.mode, error=str(error))
+
+    async def _submit(self, fn, *args):
+        """``(executor, future)`` for ``fn`` on a worker, replacing a broken executor once."""
+        for attempt in range(2):
+            executor = await self.start()
+            try:
+                return executor, executor.submit(fn, *args)
+            except BrokenExecutor as e:
+                self._discard(executor, e)
+                if attempt:
+                    raise
+
+    async def warm_up(self):
+        """Start the workers and run one decode in each, so every Model is loaded."""
+        # Threads share one Model; processes each need their own
+        count = self.workers if self.mode == "process" else 1
+        for attempt in range(2):
+            jobs = [await self._submit(warm_up_model) for _ in range(count)]
+            try:
+                await asyncio.gather(*(asyncio.wrap_future(future) for _, future in jobs))
+                return
+            except BrokenExecutor as e:
+                self._discard(jobs[0][0], e)
+                if attempt:
+                    raise
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, pcm):
+        """Decode 16 kHz mono 16-bit ``pcm`` in a worker; returns (text, timing dict)."""
+        try:
+            await self.limiter.acquire()
+        except Overloaded as e:
+            self.rejected += 1
+            raise TranscriptionBusy(str(e), e.status_code, e.retry_after) from None
+
+        self._inflight += 1
+        loop = asyncio.get_running_loop()
+        try:
+            executor, future = await self._submit(_decode_job, pcm, time.time())
+        except BaseException:
+            self._job_done()
+            raise
+        # Done callbacks run on an executor thread; hand the slot back on the loop
+        future.add_done_callback(lambda _: self._call_soon(loop, self._job_done))
+        try:
+            text, queue_wait, decode, seconds_in, seconds_decoded = await asyncio.wait_for(
+                asyncio.wrap_future(future, loop=loop), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            # A job that already started can't be interrupted; it keeps its worker and slot until it finishes
+            future.cancel()
+            self.timeouts += 1
+            raise TranscriptionTimeout(f"Transcription took longer than {self.timeout}s")
+        except Exception as e:
+            self.failed += 1
+            if isinstance(e, BrokenExecutor):
+                self._discard(executor, e)
+            raise
+
+        self.completed += 1
+        self.queue_wait_total += queue_wait
+        self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+        self.decode_total += decode
+        self.decode_max = max(self.decode_max, decode)
+        self.audio_seconds_in += seconds_in
+        self.audio_seconds_decoded += seconds_decoded
+        timing = {
+            "queue_wait_ms": round(queue_wait * 1000, 1),
+            "decode_ms": round(decode * 1000, 1),
+            "audio_seconds_in": round(seconds_in, 2),
+            "audio_seconds_decoded": round(seconds_decoded, 2),
+        }
+        # ⏱️ Timed in the worker, recorded here
+        record("stt_queue_wait", queue_wait)
+        record("vosk_decode", decode, audio_seconds=timing["audio_seconds_decoded"])
+        log_event("stt_job", **timing)
+        return text, timing
+
+    def _job_done(self):
+        self._inflight -= 1
+        self.limiter.release()
+
+    @staticmethod
+    def _call_soon(loop, callback):
+        try:
+            loop.call_soon_threadsafe(callback)
+        except RuntimeError:
+            pass  # loop already closed (shutdown): nothing left to admit
+
+    def stats(self):
+        done = self.completed
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "model_path": self.model_path,
+            "restarts": self.restarts,
+            "max_queue": self.limiter.max_queue,
+            "inflight": self._inflight,
+            "queued": self.limiter.stats()["queued"],
+            "completed": done,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "failed": self.failed,
+            "queue_wait_avg_ms": round(1000 * self.queue_wait_total / done, 1) if done else 0.0,
+            "queue_wait_max_ms": round(1000 * self.queue_wait_max, 1),
+            "decode_avg_ms": round(1000 * self.decode_total / done, 1) if done else 0.0,
+            "decode_max_ms": round(1000 * self.decode_max, 1),
+            "audio_seconds_in": round(self.audio_seconds_in, 2),
+            "audio_seconds_decoded": round(self.audio_seconds_decoded, 2),
+            "vad_trimmed_ratio": round(1 - self.audio_seconds_decoded / self.audio_seconds_in, 4)
+            if self.audio_seconds_in else 0.0,
+        }
+
+
+TRANSCRIPTION_POOL = TranscriptionPool()
+
+
+async def transcribe(pcm):
+    return await TRANSCRIPTION_POOL.submit(pcm)
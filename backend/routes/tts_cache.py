@@ -0,0 +1,216 @@
+import os
+import json
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ⚙️ TTS result cache (override via .env)
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") == "1"
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "/tmp/swarsmriti_tts_cache")
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024)))
+
+
+def normalize_text(text: str) -> str:
+    # Whitespace and Unicode form don't change the spoken result
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_key(voice_id, model_id, voice_settings, text) -> str:
+    material = json.dumps(
+        [voice_id, model_id, voice_settings, normalize_text(text)],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Content-addressed MP3 cache: an in-memory hot tier over an on-disk store.
+
+    Both tiers are LRU with a byte cap. Disk entries are ``<dir>/<k[:2]>/<k>.mp3``;
+    the index is rebuilt from file mtimes on startup so the cache survives
+    restarts. Disk I/O runs in a worker thread to keep the event loop free.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, disk_bytes=TTS_CACHE_DISK_BYTES,
+                 memory_bytes=TTS_CACHE_MEMORY_BYTES):
+        self.directory = directory
+        self.disk_bytes = disk_bytes
+        self.memory_bytes = memory_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> bytes
+        self._memory_used = 0
+        self._disk = OrderedDict()     # key -> size, least recently used first
+        self._disk_used = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_index()
+
+    # ---- public API -------------------------------------------------------
+
+    async def get(self, key):
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.bytes_saved += len(audio)
+                return audio
+            on_disk = key in self._disk
+
+        if on_disk:
+            audio = await asyncio.to_thread(self._read, key)
+            if audio is not None:
+                with self._lock:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self.disk_hits += 1
+                    self.bytes_saved += len(audio)
+                    self._remember(key, audio)
+                return audio
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def put(self, key, audio):
+        with self._lock:
+            self._remember(key, audio)
+        if self.directory and len(audio) <= self.disk_bytes:
+            await asyncio.to_thread(self._write, key, audio)
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "memory_max_bytes": self.memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_used,
+                "disk_max_bytes": self.disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions,
+            }
+
+    # ---- internals --------------------------------------------------------
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.mp3")
+
+    def _remember(self, key, audio):
+        # Hot tier; caller holds the lock
+        if len(audio) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= len(old)
+        self._memory[key] = audio
+        self._memory_used += len(audio)
+        while self._memory_used > self.memory_bytes:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_used -= len(dropped)
+
+    def _load_index(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".mp3"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_used += size
+        self._evict_disk()
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)  # LRU order survives restarts via mtime
+            return audio
+        except OSError:
+            with self._lock:
+                size = self._disk.pop(key, None)
+                if size is not None:
+                    self._disk_used -= size
+            return None
+
+    def _write(self, key, audio):
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(audio)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"❌ TTS cache write failed: {e}")
+            return
+        with self._lock:
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_used -= old
+            self._disk[key] = len(audio)
+            self._disk_used += len(audio)
+            self._evict_disk()
+
+    def _evict_disk(self):
+        # Caller holds the lock (or is still in __init__)
+        while self._disk_used > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_used -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+# Opened on first use (or by the app's warm-up), once per process: opening creates
+# the directory and walks it to rebuild the index, which is too slow for import time
+TTS_CACHE = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """The process-wide cache, or None when TTS_CACHE_ENABLED=0. Blocks on the first call."""
+    global TTS_CACHE
+    if TTS_CACHE is None and TTS_CACHE_ENABLED:
+        with _cache_lock:
+            if TTS_CACHE is None:
+                TTS_CACHE = TTSCache()
+    return TTS_CACHE
+
+
+async def open_tts_cache():
+    """``get_tts_cache`` without blocking the event loop while the index is rebuilt."""
+    if TTS_CACHE is not None or not TTS_CACHE_ENABLED:
+        return TTS_CACHE
+    return await asyncio.to_thread(get_tts_cache)
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+
+# ⚙️ Energy-based voice activity detection (override via .env)
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") == "1"
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "12"))      # above the noise floor
+VAD_ABS_FLOOR_DBFS = float(os.getenv("VAD_ABS_FLOOR_DBFS", "-50"))  # never call quieter than this speech
+VAD_MAX_BELOW_PEAK_DB = float(os.getenv("VAD_MAX_BELOW_PEAK_DB", "30"))  # keeps quiet speech in busy clips
+VAD_PADDING_MS = int(os.getenv("VAD_PADDING_MS", "200"))           # kept around every speech span
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "500"))   # shorter pauses are kept as-is
+
+
+def _fill_short_gaps(mask, max_gap):
+    """Mark runs of False no longer than ``max_gap`` (between speech) as speech."""
+    speech = np.flatnonzero(mask)
+    if speech.size < 2:
+        return mask
+    gaps = np.diff(speech) - 1
+    short = (gaps > 0) & (gaps <= max_gap)
+    filled = mask.copy()
+    for start, gap in zip(speech[:-1][short], gaps[short]):
+        filled[start + 1:start + 1 + gap] = True
+    return filled
+
+
+def trim_silence(pcm, sample_rate=16000):
+    """Drop leading/trailing silence and long pauses from 16-bit mono PCM.
+
+    Frames are classified by RMS energy against an adaptive threshold: the
+    recording's own noise floor (10th percentile) plus VAD_THRESHOLD_DB, at
+    most VAD_MAX_BELOW_PEAK_DB under the loudest frame and never below
+    VAD_ABS_FLOOR_DBFS. Speech spans are padded, pauses shorter
+    than VAD_MIN_SILENCE_MS are kept, and everything else is cut.
+
+    Returns ``(pcm, seconds_in, seconds_kept)``.
+    """
+    samples = np.frombuffer(pcm, dtype="<i2")
+    seconds_in = samples.size / sample_rate
+    frame = max(1, sample_rate * VAD_FRAME_MS // 1000)
+    frames = samples.size // frame
+    if not VAD_ENABLED or frames == 0:
+        return pcm, seconds_in, seconds_in
+
+    framed = samples[:frames * frame].reshape(frames, frame).astype(np.float32) / 32768.0
+    energy_db = 10.0 * np.log10(np.mean(framed * framed, axis=1) + 1e-10)
+    noise_floor = np.percentile(energy_db, 10)
+    peak = energy_db.max()
+    threshold = max(min(noise_floor + VAD_THRESHOLD_DB, peak - VAD_MAX_BELOW_PEAK_DB), VAD_ABS_FLOOR_DBFS)
+    mask = energy_db > threshold
+
+    if not mask.any():
+        return b"", seconds_in, 0.0
+
+    pad = VAD_PADDING_MS // VAD_FRAME_MS
+    if pad:
+        mask = np.convolve(mask, np.ones(2 * pad + 1), mode="same") > 0
+    mask = _fill_short_gaps(mask, VAD_MIN_SILENCE_MS // VAD_FRAME_MS)
+
+    # The partial frame at the end follows its neighbour
+    keep = np.repeat(mask, frame)
+    tail = samples.size - keep.size
+    if tail:
+        keep = np.concatenate([keep, np.full(tail, mask[-1])])
+
+    kept = samples[keep]
+    return kept.tobytes(), seconds_in, kept.size / sample_rate
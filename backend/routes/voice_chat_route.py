@@ -1,60 +1,72 @@
-from fastapi import APIRouter, UploadFile, File
-from routes.elevenlabs_client import text_to_speech, split_text_into_chunks
+from fastapi import APIRouter, UploadFile, File, WebSocket
+from fastapi.responses import JSONResponse
+from routes.elevenlabs_client import synthesize_chunks, split_text_into_chunks
 from routes.cohere_client import generate_answer
-from shared_audio_cache import AUDIO_CACHE
-from routes.vosk_transcriber import transcribe_from_path
+from routes.speech_pipeline import start_answer_stream
+from shared_audio_cache import store_audio
+from routes.transcription_pool import transcribe, TranscriptionTimeout
+from routes.audio_frontend import load_pcm16, AudioDecodeError, UploadTooLarge
+from routes.admission import Overloaded, overloaded_response
+from routes.telemetry import log_event
+from routes.resilience import DeadlineExceeded
+from routes.streaming_recognizer import (
+    StreamingRecognizer, StreamBusy, UnsupportedSampleRate, recognize_from_socket, STT_STREAM_SAMPLE_RATE
+)
 
 import uuid
-import os
+import logging
 
 router = APIRouter()
 
-@router.post("/voice-chat")
-async def voice_chat(audio: UploadFile = File(...)):
-    print("🎤 /voice-chat endpoint hit")
-    
-    file_ext = audio.filename.split('.')[-1]
-    temp_path = f"temp_{uuid.uuid4()}.{file_ext}"
-    wav_path = None  # <== FIXED
-    with open(temp_path, "wb") as f:
-        f.write(await audio.read())
 
-    try:
-        print("📥 Saved audio to:", temp_path)
+def build_voice_prompt(transcript):
+    if not transcript or len(transcript.strip()) < 3 or not any(c.isalpha() for c in transcript):
+        return "The user's speech was unclear or unintelligible. Respond kindly and ask them to repeat or rephrase."
+    return (
+        f"You are a helpful and friendly AI assistant.\n"
+        f"The user said: \"{transcript}\".\n"
+        "Respond in a natural, human-like tone."
+    )
+
 
-        # Convert the uploaded file to WAV
-        wav_path = convert_to_wav(temp_path)
+@router.post("/voice-chat")
+async def voice_chat(audio: UploadFile = File(...), stream: bool = False):
+    try:
+        # Decode the upload in memory to 16 kHz mono PCM (no temp files)
+        pcm = await load_pcm16(audio)
+        log_event("voice_audio_decoded", logging.DEBUG, seconds=round(len(pcm) / 32000, 2))
 
-        # Transcribe from the WAV file
-        transcript = transcribe_from_path(wav_path)
+        # Transcribe in the worker pool
+        transcript, timing = await transcribe(pcm)
         
-        print("📝 Transcript:", transcript)
+        log_event("voice_transcript", logging.DEBUG, transcript=transcript)
 
         # Generate prompt intelligently
-        if not transcript or len(transcript.strip()) < 3 or not any(c.isalpha() for c in transcript):
-            prompt = "The user's speech was unclear or unintelligible. Respond kindly and ask them to repeat or rephrase."
-        else:
-            prompt = (
-                f"You are a helpful and friendly AI assistant.\n"
-                f"The user said: \"{transcript}\".\n"
-                "Respond in a natural, human-like tone."
-            )
+        prompt = build_voice_prompt(transcript)
+
+        # 🌊 Streaming mode: answer + audio are produced in the background
+        if stream:
+            answer_stream = await start_answer_stream(prompt)
+            return {
+                "status": "success",
+                "transcript": transcript,
+                "answer": None,
+                "answer_url": f"/chat/answer/{answer_stream.audio_id}",
+                "audio_url": f"/audio/{answer_stream.audio_id}"
+            }
 
         # Get LLM response
         answer = await generate_answer(prompt)
-        print("💬 LLM Answer:", answer)
+        log_event("voice_answer", logging.DEBUG, answer=answer)
 
         # Convert to speech using ElevenLabs
         chunks = split_text_into_chunks(answer)
-        audio_segments = []
-        for chunk in chunks:
-            print("🔊 TTS chunk:", chunk)
-            audio_data = await text_to_speech(chunk)
-            audio_segments.append(audio_data)
+        log_event("voice_tts_chunks", logging.DEBUG, chunks=len(chunks))
+        audio_segments = await synthesize_chunks(chunks)
 
         # Store audio in memory cache
         audio_id = str(uuid.uuid4())
-        AUDIO_CACHE[audio_id] = audio_segments
+        await store_audio(audio_id, audio_segments)
 
         return {
             "status": "success",
@@ -63,14 +75,52 @@ async def voice_chat(audio: UploadFile = File(...)):
             "audio_url": f"/audio/{audio_id}"
         }
 
+    except AudioDecodeError as e:
+        return JSONResponse(status_code=415, content={"status": "error", "message": str(e)})
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"status": "error", "message": str(e)})
+    except Overloaded as e:
+        # Vosk workers (TranscriptionBusy) or an upstream limiter are saturated
+        return overloaded_response(e)
+    except (TranscriptionTimeout, DeadlineExceeded) as e:
+        return JSONResponse(status_code=504, content={"status": "error", "message": str(e)})
     except Exception as e:
         print("❌ ERROR:", str(e))
         import traceback
         traceback.print_exc()
         return {"status": "error", "message": str(e)}
 
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        if os.path.exists(wav_path):
-            os.remove(wav_path)
+
+# 🎙️ Streaming voice chat: the answer starts as soon as Vosk detects end of utterance
+@router.websocket("/ws/voice-chat")
+async def voice_chat_stream(websocket: WebSocket, sample_rate: int = STT_STREAM_SAMPLE_RATE):
+    await websocket.accept()
+    try:
+        async with StreamingRecognizer(sample_rate) as recognizer:
+            await websocket.send_json({"type": "ready", "sample_rate": sample_rate})
+            transcript = await recognize_from_socket(websocket, recognizer, stop_on_endpoint=True)
+    except StreamBusy as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close(code=1013)  # try again later
+        return
+    except UnsupportedSampleRate as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close(code=1003)  # unsupported data
+        return
+    if transcript is None:
+        return
+
+    log_event("voice_transcript", logging.DEBUG, transcript=transcript, streamed=True)
+    try:
+        answer_stream = await start_answer_stream(build_voice_prompt(transcript))
+    except Overloaded as e:
+        await websocket.send_json({"type": "error", "message": str(e), "retry_after": e.retry_after})
+        await websocket.close(code=1013)  # try again later
+        return
+    await websocket.send_json({
+        "type": "answer",
+        "transcript": transcript,
+        "answer_url": f"/chat/answer/{answer_stream.audio_id}",
+        "audio_url": f"/audio/{answer_stream.audio_id}"
+    })
+    await websocket.close()
@@ -1,66 +1,140 @@
-import wave
 import json
+import shutil
 import zipfile
+import tempfile
 import urllib.request
 import os
-import subprocess
-import shutil
+import threading
+from contextlib import contextmanager
 from vosk import Model, KaldiRecognizer
 
+from routes.audio_frontend import wav_to_pcm16, TARGET_SAMPLE_RATE
+
 
-MODEL_PATH = "/tmp/vosk_model"
 MODEL_URL = "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip"
-# Load Vosk model globally once
-def setup_vosk_model():
-    if not os.path.exists(MODEL_PATH):
-        print("🔽 Downloading Vosk model...")
-        zip_path = "/tmp/vosk_model.zip"
-        urllib.request.urlretrieve(MODEL_URL, zip_path)
+DOWNLOAD_PATH = "/tmp/vosk_model"
+BUNDLED_MODEL_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "vosk_model"))
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "")
+VOSK_ALLOW_DOWNLOAD = os.getenv("VOSK_ALLOW_DOWNLOAD", "1") == "1"
+
+# Set once the model location has been resolved
+MODEL_PATH = None
+
+
+def _is_complete_model(path):
+    # A usable model has at least the acoustic model and its config
+    return (
+        os.path.isfile(os.path.join(path, "am", "final.mdl"))
+        and os.path.isfile(os.path.join(path, "conf", "model.conf"))
+    )
+
+
+def resolve_model_path():
+    """Pick the first usable model: $VOSK_MODEL_PATH, the bundled backend/vosk_model,
+    a previous download in /tmp, and only then download one."""
+    for candidate in (VOSK_MODEL_PATH, BUNDLED_MODEL_PATH, DOWNLOAD_PATH):
+        if candidate and _is_complete_model(candidate):
+            return candidate
+    if VOSK_MODEL_PATH:
+        raise RuntimeError(f"VOSK_MODEL_PATH={VOSK_MODEL_PATH} is not a complete Vosk model")
+    if not VOSK_ALLOW_DOWNLOAD:
+        raise RuntimeError("No local Vosk model found and VOSK_ALLOW_DOWNLOAD=0")
+    return setup_vosk_model()
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on ``path`` across processes (and threads, each opening its own handle)."""
+    with open(path, "a+b") as f:
+        try:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt  # Windows
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10 s; keep waiting
+        yield  # closing the file releases the lock
 
-        print("📦 Extracting Vosk model...")
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall("/tmp")
 
-        # Rename extracted folder to standard path
-        os.rename("/tmp/vosk-model-small-en-us-0.15", MODEL_PATH)
+def setup_vosk_model():
+    """Download the model to DOWNLOAD_PATH once, however many processes ask at the same time.
+
+    The first caller downloads and extracts into a private temp directory and
+    renames the model into place; the others wait on the lock and find it there.
+    """
+    parent = os.path.dirname(DOWNLOAD_PATH)
+    with _file_lock(f"{DOWNLOAD_PATH}.lock"):
+        if _is_complete_model(DOWNLOAD_PATH):
+            print("✅ Vosk model already available.")
+            return DOWNLOAD_PATH
+
+        staging = tempfile.mkdtemp(prefix="vosk_download_", dir=parent)
+        try:
+            print("🔽 Downloading Vosk model...")
+            zip_path = os.path.join(staging, "model.zip")
+            urllib.request.urlretrieve(MODEL_URL, zip_path)
+
+            print("📦 Extracting Vosk model...")
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                zip_ref.extractall(staging)
+            extracted = os.path.join(staging, "vosk-model-small-en-us-0.15")
+            if not _is_complete_model(extracted):
+                raise RuntimeError(f"Downloaded Vosk model from {MODEL_URL} is incomplete")
+
+            # A half-written model from an interrupted run is replaced, not trusted
+            if os.path.exists(DOWNLOAD_PATH):
+                shutil.rmtree(DOWNLOAD_PATH)
+            os.rename(extracted, DOWNLOAD_PATH)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
         print("✅ Model ready.")
 
-    else:
-        print("✅ Vosk model already available.")
+    return DOWNLOAD_PATH
 
-    return Model(MODEL_PATH)
 
-model = setup_vosk_model()
+# Loaded on first use (or by the app's warm-up), once per process
+model = None
+_model_lock = threading.Lock()
 
-# def convert_to_wav(input_path: str) -> str:
-#     output_path = input_path.replace(".webm", ".wav")
+def get_model(model_path=None):
+    """The process-wide Model; ``model_path`` (already resolved by the caller) skips the lookup."""
+    global model, MODEL_PATH
+    if model is None:
+        with _model_lock:
+            if model is None:
+                MODEL_PATH = model_path or resolve_model_path()
+                print(f"🎙️ Loading Vosk model from {MODEL_PATH}")
+                model = Model(MODEL_PATH)
+    return model
 
-#     # Try to find ffmpeg in PATH
-#     ffmpeg_path = shutil.which("ffmpeg")
-#     if not ffmpeg_path:
-#         raise RuntimeError("❌ ffmpeg not found. Make sure it's in your system PATH.")
 
-#     command = [ffmpeg_path, "-i", input_path, "-ar", "16000", "-ac", "1", output_path]
-#     print("Running command:", " ".join(command))
-#     subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+def warm_up():
+    """Load the model and run one short decode so the first request doesn't pay for it."""
+    transcribe_pcm(get_model(), bytes(TARGET_SAMPLE_RATE))  # 0.5 s of silence
 
-#     return output_path
+# 4000 frames of 16-bit mono per AcceptWaveform call
+PCM_CHUNK_BYTES = 4000 * 2
 
 
 def transcribe_from_path(file_path: str) -> str:
-    wf = wave.open(file_path, "rb")
+    with open(file_path, "rb") as f:
+        pcm = wav_to_pcm16(f.read())
+    return transcribe_pcm(get_model(), pcm)
 
-    if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getcomptype() != "NONE":
-        raise ValueError("Audio must be WAV format, mono channel, 16-bit PCM")
 
-    rec = KaldiRecognizer(model, wf.getframerate())
+def transcribe_pcm(model, pcm, sample_rate=TARGET_SAMPLE_RATE) -> str:
+    """Decode 16-bit mono PCM straight from memory."""
+    rec = KaldiRecognizer(model, sample_rate)
     result = ""
 
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
-        if rec.AcceptWaveform(data):
+    view = memoryview(pcm)
+    for offset in range(0, len(view), PCM_CHUNK_BYTES):
+        if rec.AcceptWaveform(bytes(view[offset:offset + PCM_CHUNK_BYTES])):
             result += json.loads(rec.Result())["text"] + " "
 
     result += json.loads(rec.FinalResult())["text"]
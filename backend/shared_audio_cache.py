@@ -1,3 +1,397 @@
 # backend/shared_audio_cache.py
+import os
+import asyncio
+import time
+import threading
+from collections import OrderedDict
 
-AUDIO_CACHE = {}
+from audio_backends import CachedAudio, DirectoryAudioStore, RedisAudioStore, AudioStoreError, SAFE_ID, audio_etag
+from routes.telemetry import span
+from routes.admission import Overloaded
+
+# ⚙️ Limits (override via .env)
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+AUDIO_CACHE_TTL_SECONDS = float(os.getenv("AUDIO_CACHE_TTL_SECONDS", "900"))
+AUDIO_CACHE_SPILL_DIR = os.getenv("AUDIO_CACHE_SPILL_DIR", "")
+AUDIO_CACHE_SPILL_MAX_BYTES = int(os.getenv("AUDIO_CACHE_SPILL_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# ⚙️ Where audio lives (override via .env): memory | directory | redis
+AUDIO_STORE = os.getenv("AUDIO_STORE", "memory")
+AUDIO_STORE_DIR = os.getenv("AUDIO_STORE_DIR", "audio_store")
+AUDIO_STORE_MAX_BYTES = int(os.getenv("AUDIO_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+AUDIO_STORE_URL = os.getenv("AUDIO_STORE_URL", "redis://localhost:6379/0")
+AUDIO_PENDING_TTL_SECONDS = float(os.getenv("AUDIO_PENDING_TTL_SECONDS", "120"))
+
+
+class _Entry:
+    __slots__ = ("data", "size", "etag", "expires_at")
+
+    def __init__(self, data, etag, expires_at):
+        self.data = data
+        self.size = len(data)
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class AudioCache:
+    """LRU cache of MP3 answers with a byte budget and per-entry TTL.
+
+    Segments are joined into one contiguous buffer on ``set`` so replays and
+    byte ranges can be served as slices without copying. Entries pushed out
+    of memory by the byte budget are written to ``spill_dir`` (when
+    configured) as plain MP3 files and served from there, so recent answers
+    can still be replayed. Files spilled by an earlier process are indexed on
+    startup, so they count against ``spill_max_bytes`` and expire as usual.
+    All operations take a lock, so the cache can be
+    shared between the event loop and worker threads (but not between
+    processes; see audio_backends for stores that can).
+    """
+
+    shared = False
+
+    def __init__(self, max_bytes=AUDIO_CACHE_MAX_BYTES, ttl_seconds=AUDIO_CACHE_TTL_SECONDS,
+                 spill_dir=AUDIO_CACHE_SPILL_DIR, spill_max_bytes=AUDIO_CACHE_SPILL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir or None
+        self.spill_max_bytes = spill_max_bytes
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # spill index: audio_id -> (size, expires_at, etag), oldest first
+        self._spilled = OrderedDict()
+        self._spilled_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.spills = 0
+        self.spill_hits = 0
+
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._load_spilled()
+
+    # ---- public API -------------------------------------------------------
+
+    def set(self, audio_id, segments, ttl_seconds=None):
+        if not SAFE_ID.match(audio_id):
+            raise ValueError(f"Unsafe audio id: {audio_id!r}")
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        data = segments if isinstance(segments, bytes) else b"".join(segments)
+        entry = _Entry(data, audio_etag(data), time.monotonic() + ttl)
+
+        with self._lock:
+            self._discard(audio_id)
+            if entry.size > self.max_bytes:
+                # Too big to ever sit in memory; go straight to disk if we can
+                print(f"⚠️ Audio {audio_id} ({entry.size} bytes) exceeds the memory budget")
+                self._spill(audio_id, entry)
+                return
+            self._entries[audio_id] = entry
+            self._bytes += entry.size
+            self._enforce_budget()
+
+    def get(self, audio_id, default=None):
+        """A ``CachedAudio`` for ``audio_id``, or ``default``.
+
+        Spilled entries stay on disk and are returned by path, so the route
+        can send the file instead of reading it back into memory.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(audio_id)
+            if entry is not None:
+                if entry.expires_at <= now:
+                    self._remove(audio_id)
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(audio_id)
+                    self.hits += 1
+                    return CachedAudio(entry.data, None, entry.size, entry.etag, entry.expires_at)
+
+            meta = self._spilled.get(audio_id)
+            if meta is not None:
+                size, expires_at, etag = meta
+                if expires_at <= now:
+                    self._unspill(audio_id)
+                    self.expirations += 1
+                else:
+                    self._spilled.move_to_end(audio_id)
+                    self.hits += 1
+                    self.spill_hits += 1
+                    return CachedAudio(None, self._spill_path(audio_id), size, etag, expires_at)
+
+            self.misses += 1
+            return default
+
+    def purge_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, e in self._entries.items() if e.expires_at <= now]
+            for audio_id in expired:
+                self._remove(audio_id)
+            spilled = [k for k, (_, exp, _) in self._spilled.items() if exp <= now]
+            for audio_id in spilled:
+                self._unspill(audio_id)
+            self.expirations += len(expired) + len(spilled)
+            return len(expired) + len(spilled)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "spill_enabled": self.spill_dir is not None,
+                "spilled_entries": len(self._spilled),
+                "spilled_bytes": self._spilled_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "spills": self.spills,
+                "spill_hits": self.spill_hits,
+            }
+
+    # Only this process can see its memory, so there is nothing to share
+    def mark_pending(self, audio_id, ttl_seconds):
+        pass
+
+    def clear_pending(self, audio_id):
+        pass
+
+    def is_pending(self, audio_id):
+        return False
+
+    def set_answer(self, audio_id, text):
+        pass
+
+    def get_answer(self, audio_id):
+        return None
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys()) + list(self._spilled.keys())
+
+    def __setitem__(self, audio_id, segments):
+        self.set(audio_id, segments)
+
+    def __contains__(self, audio_id):
+        with self._lock:
+            return audio_id in self._entries or audio_id in self._spilled
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries) + len(self._spilled)
+
+    # ---- internals (call with the lock held) ------------------------------
+
+    def _remove(self, audio_id):
+        entry = self._entries.pop(audio_id)
+        self._bytes -= entry.size
+
+    def _discard(self, audio_id):
+        if audio_id in self._entries:
+            self._remove(audio_id)
+        if audio_id in self._spilled:
+            self._unspill(audio_id)
+
+    def _enforce_budget(self):
+        now = time.monotonic()
+        while self._bytes > self.max_bytes and self._entries:
+            audio_id, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            if entry.expires_at <= now:
+                self.expirations += 1
+                continue
+            self.evictions += 1
+            self._spill(audio_id, entry)
+
+    def _load_spilled(self):
+        # Spill files left by an earlier process: expiry comes from the mtime (the file
+        # was written at spill time, so that errs on the side of expiring early)
+        found = []
+        for name in os.listdir(self.spill_dir):
+            audio_id, ext = os.path.splitext(name)
+            if ext != ".mp3" or not SAFE_ID.match(audio_id):
+                continue
+            try:
+                st = os.stat(os.path.join(self.spill_dir, name))
+            except OSError:
+                continue
+            found.append((st.st_mtime, audio_id, st.st_size, st.st_mtime_ns))
+
+        now, wall = time.monotonic(), time.time()
+        for mtime, audio_id, size, mtime_ns in sorted(found):
+            expires_at = now + (mtime + self.ttl_seconds - wall)
+            self._spilled[audio_id] = (size, expires_at, f'"{size:x}-{mtime_ns:x}"')
+            self._spilled_bytes += size
+            if expires_at <= now:
+                self._unspill(audio_id)
+                self.expirations += 1
+        while self._spilled_bytes > self.spill_max_bytes and self._spilled:
+            self._unspill(next(iter(self._spilled)))
+            self.evictions += 1
+        if self._spilled:
+            print(f"♻️ Indexed {len(self._spilled)} spilled answers ({self._spilled_bytes} bytes) from {self.spill_dir}")
+
+    def _spill_path(self, audio_id):
+        return os.path.join(self.spill_dir, f"{audio_id}.mp3")
+
+    def _spill(self, audio_id, entry):
+        if not self.spill_dir or entry.size > self.spill_max_bytes:
+            return
+        try:
+            with open(self._spill_path(audio_id), "wb") as f:
+                f.write(entry.data)
+        except OSError as e:
+            print(f"❌ Audio spill failed for {audio_id}: {e}")
+            return
+        self._spilled[audio_id] = (entry.size, entry.expires_at, entry.etag)
+        self._spilled_bytes += entry.size
+        self.spills += 1
+        while self._spilled_bytes > self.spill_max_bytes and self._spilled:
+            oldest = next(iter(self._spilled))
+            self._unspill(oldest)
+            self.evictions += 1
+
+    def _unspill(self, audio_id):
+        size, _, _ = self._spilled.pop(audio_id)
+        self._spilled_bytes -= size
+        try:
+            os.remove(self._spill_path(audio_id))
+        except OSError:
+            pass
+
+
+class AudioStream:
+    """Audio that is still being synthesized.
+
+    The producer appends segments in playback order and calls ``finish``;
+    readers iterate ``segments()`` and receive each segment as soon as it is
+    available. The answer text is accumulated alongside for clients that
+    fetch it separately.
+    """
+
+    def __init__(self, audio_id):
+        self.audio_id = audio_id
+        self.chunks = []
+        self.text = ""
+        self.done = False
+        self.error = None
+        self._changed = asyncio.Condition()
+
+    async def append(self, segment):
+        async with self._changed:
+            self.chunks.append(segment)
+            self._changed.notify_all()
+
+    async def finish(self, error=None):
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def wait_done(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.done)
+
+    async def segments(self):
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.chunks) or self.done)
+                ready = self.chunks[index:]
+                finished = self.done
+            for segment in ready:
+                yield segment
+            index += len(ready)
+            if finished and index >= len(self.chunks):
+                return
+
+
+def make_audio_store(backend=AUDIO_STORE):
+    if backend == "directory":
+        return DirectoryAudioStore(AUDIO_STORE_DIR, AUDIO_CACHE_TTL_SECONDS, AUDIO_STORE_MAX_BYTES)
+    if backend == "redis":
+        return RedisAudioStore(AUDIO_STORE_URL, AUDIO_CACHE_TTL_SECONDS)
+    if backend != "memory":
+        raise ValueError(f"Unknown AUDIO_STORE: {backend!r}")
+    return AudioCache()
+
+
+AUDIO_CACHE = make_audio_store()
+
+# audio_id -> AudioStream for answers whose audio is still being produced
+PENDING_AUDIO = {}
+
+
+class AudioStoreUnavailable(Overloaded):
+    """AUDIO_CACHE can't be written; answer 503 rather than hand out an audio URL that won't play."""
+
+    def __init__(self, message):
+        super().__init__(message, status_code=503, retry_after=1)
+
+
+async def store_audio(audio_id, segments):
+    """``AUDIO_CACHE.set`` off the event loop; raises AudioStoreUnavailable when the store fails."""
+    try:
+        with span("audio_store"):
+            await asyncio.to_thread(AUDIO_CACHE.set, audio_id, segments)
+    except (AudioStoreError, OSError) as e:
+        raise AudioStoreUnavailable(f"Audio store unavailable: {e}") from None
+
+
+async def open_audio_stream(audio_id):
+    stream = AudioStream(audio_id)
+    PENDING_AUDIO[audio_id] = stream
+    if AUDIO_CACHE.shared:
+        # Other workers can't see PENDING_AUDIO; tell them the audio is on its way
+        try:
+            await asyncio.to_thread(AUDIO_CACHE.mark_pending, audio_id, AUDIO_PENDING_TTL_SECONDS)
+        except (AudioStoreError, OSError) as e:
+            PENDING_AUDIO.pop(audio_id, None)
+            raise AudioStoreUnavailable(f"Audio store unavailable: {e}") from None
+    return stream
+
+
+async def close_audio_stream(stream, error=None):
+    """Finish ``stream`` and hand its segments over to AUDIO_CACHE for replays.
+
+    Local readers already have every segment, so a store failure is only
+    logged; the pending marker is cleared either way so other workers stop
+    waiting for it.
+    """
+    if stream.chunks:
+        try:
+            await store_audio(stream.audio_id, stream.chunks)
+        except AudioStoreUnavailable as e:
+            print(f"❌ Storing streamed audio {stream.audio_id} failed: {e}")
+    if AUDIO_CACHE.shared:
+        try:
+            await asyncio.to_thread(AUDIO_CACHE.clear_pending, stream.audio_id)
+        except (AudioStoreError, OSError) as e:
+            print(f"❌ Clearing the pending marker for {stream.audio_id} failed: {e}")
+    await stream.finish(error)
+    PENDING_AUDIO.pop(stream.audio_id, None)
+
+
+async def wait_for_shared_audio(audio_id, timeout, poll_seconds=0.1):
+    """Audio another worker is still producing, once it lands in the store (None on timeout)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        audio = await asyncio.to_thread(AUDIO_CACHE.get, audio_id)
+        if audio is not None:
+            return audio
+        if not await asyncio.to_thread(AUDIO_CACHE.is_pending, audio_id):
+            return None
+        await asyncio.sleep(poll_seconds)
+    return None
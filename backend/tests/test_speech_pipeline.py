@@ -0,0 +1,202 @@
+# Streaming answer pipeline against the fake upstreams, in-process:
+# fake_upstreams.app is mounted on the Cohere / ElevenLabs clients through
+# httpx.ASGITransport, so no network, keys or credits are needed.
+import asyncio
+import contextlib
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI
+
+import fake_upstreams
+from routes import http_clients, speech_pipeline
+from routes.audio_route import router as audio_router
+from routes.elevenlabs_client import SentenceSegmenter, text_to_speech
+from routes.resilience import DeadlineExceeded
+
+
+def _answer_chunks():
+    """What the pipeline should send to TTS for FAKE_ANSWER, in order."""
+    segmenter = SentenceSegmenter(
+        max_length=speech_pipeline.STREAM_MAX_CHUNK_CHARS,
+        first_chunk_length=speech_pipeline.STREAM_FIRST_CHUNK_CHARS
+    )
+    chunks = []
+    for token in fake_upstreams._tokens(fake_upstreams.FAKE_ANSWER):
+        chunks += segmenter.feed(token)
+    return chunks + segmenter.flush()
+
+
+def _use_fake_upstreams():
+    transport = httpx.ASGITransport(app=fake_upstreams.app)
+    for name in http_clients.UPSTREAMS:
+        http_clients._clients[name] = httpx.AsyncClient(transport=transport, base_url="http://fake")
+
+
+@contextlib.asynccontextmanager
+async def _serve_fake_upstreams():
+    """The fakes on a real localhost socket: ASGITransport ignores timeouts, so hangs need this."""
+    server = uvicorn.Server(uvicorn.Config(fake_upstreams.app, host="127.0.0.1", port=0, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    for name in http_clients.UPSTREAMS:
+        http_clients._clients[name] = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}")
+    try:
+        yield
+    finally:
+        await http_clients.close_clients()
+        server.should_exit = server.force_exit = True  # don't wait out hung fake calls
+        await serving
+
+
+async def _get_audio(app, audio_id, stream):
+    """GET /audio/{audio_id}, noting for each body message whether the stream had finished yet."""
+    messages = []
+    disconnected = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append((message, stream.done))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": f"/audio/{audio_id}", "raw_path": f"/audio/{audio_id}".encode(),
+        "root_path": "", "query_string": b"", "headers": [], "client": ("test", 1), "server": ("test", 80),
+    }
+    try:
+        await app(scope, receive, send)
+    finally:
+        disconnected.set()
+    return messages
+
+
+def test_segmenter_caps_first_chunk_and_keeps_text():
+    chunks = _answer_chunks()
+    assert len(chunks) > 2
+    assert len(chunks[0]) <= speech_pipeline.STREAM_FIRST_CHUNK_CHARS
+    assert " ".join(chunks).split() == fake_upstreams.FAKE_ANSWER.split()
+
+
+def test_audio_streams_in_order_before_pipeline_finishes(monkeypatch):
+    # One TTS call at a time, so the last chunk lands well after the first
+    monkeypatch.setattr(speech_pipeline, "TTS_REQUEST_CONCURRENCY", 1)
+    fake_upstreams.configure(latency_ms=30, jitter_ms=0, slow_rate=0.0, error_rate=0.0,
+                             hang_rate=0.0, reset_rate=0.0, token_delay_ms=0)
+
+    async def run():
+        _use_fake_upstreams()
+        try:
+            app = FastAPI()
+            app.include_router(audio_router)
+
+            stream = await speech_pipeline.start_answer_stream("Do you remember the river?")
+            messages = await _get_audio(app, stream.audio_id, stream)
+            await stream.wait_done()
+            expected = [await text_to_speech(chunk) for chunk in _answer_chunks()]
+            return stream, messages, expected
+        finally:
+            await http_clients.close_clients()
+
+    stream, messages, expected = asyncio.run(run())
+
+    assert messages[0][0]["status"] == 200
+    bodies = [(m["body"], done) for m, done in messages if m["type"] == "http.response.body" and m["body"]]
+    assert bodies and not bodies[0][1], "first audio bytes should be sent while TTS is still running"
+    assert stream.error is None
+    assert stream.chunks == expected
+    assert len(bodies) == len(expected)
+    assert b"".join(body for body, _ in bodies) == b"".join(expected)
+    assert stream.text.strip() == fake_upstreams.FAKE_ANSWER
+
+
+def test_deadline_in_tts_fails_the_stream(monkeypatch):
+    fake_upstreams.configure(latency_ms=5, jitter_ms=0, slow_rate=0.0, error_rate=0.0,
+                             hang_rate=0.0, reset_rate=0.0, token_delay_ms=0)
+    real_synthesize = speech_pipeline.synthesize_chunk
+
+    async def synthesize_chunk(index, chunk, request_slots=None, retries=None):
+        if index == 1:
+            raise DeadlineExceeded("No time left for an elevenlabs call")
+        return await real_synthesize(index, chunk, request_slots, retries)
+
+    monkeypatch.setattr(speech_pipeline, "TTS_REQUEST_CONCURRENCY", 1)
+    monkeypatch.setattr(speech_pipeline, "synthesize_chunk", synthesize_chunk)
+
+    async def run():
+        _use_fake_upstreams()
+        try:
+            stream = await speech_pipeline.start_answer_stream("Do you remember the river?")
+            await stream.wait_done()
+            return stream
+        finally:
+            await http_clients.close_clients()
+
+    stream = asyncio.run(run())
+
+    # Audio with a hole must not be reported as a complete answer
+    assert isinstance(stream.error, DeadlineExceeded)
+    assert len(stream.chunks) == 1
+
+
+def test_hung_answer_gives_back_the_cohere_slot():
+    from routes.admission import LIMITERS
+    from routes.resilience import deadline
+
+    fake_upstreams.configure(latency_ms=5, jitter_ms=0, slow_rate=0.0, error_rate=0.0,
+                             hang_rate=1.0, hang_ms=5000, reset_rate=0.0, token_delay_ms=0)
+
+    async def run():
+        async with _serve_fake_upstreams():
+            with deadline(0.3):
+                stream = await speech_pipeline.start_answer_stream("Do you remember the river?")
+            assert LIMITERS["cohere"].stats()["inflight"] == 1
+            await asyncio.wait_for(stream.wait_done(), 5)
+            return stream
+
+    try:
+        stream = asyncio.run(run())
+    finally:
+        fake_upstreams.configure(hang_rate=0.0)
+
+    assert isinstance(stream.error, DeadlineExceeded)
+    assert LIMITERS["cohere"].stats()["inflight"] == 0
+
+
+def test_synthesize_chunks_raises_the_deadline(monkeypatch):
+    from routes import elevenlabs_client
+    from routes.resilience import deadline
+
+    fake_upstreams.configure(latency_ms=5, jitter_ms=0, slow_rate=0.0, error_rate=0.0,
+                             hang_rate=0.0, hang_ms=5000, reset_rate=0.0, token_delay_ms=0)
+    real_text_to_speech = elevenlabs_client.text_to_speech
+
+    async def text_to_speech(text, retries=None):
+        # The first chunk is synthesized, every later call hangs
+        audio = await real_text_to_speech(text, retries=retries)
+        fake_upstreams.configure(hang_rate=1.0)
+        return audio
+
+    monkeypatch.setattr(elevenlabs_client, "text_to_speech", text_to_speech)
+
+    async def run():
+        async with _serve_fake_upstreams():
+            with deadline(0.5):
+                return await elevenlabs_client.synthesize_chunks(_answer_chunks(), max_concurrency=1)
+
+    try:
+        # Not a shorter answer with the hung chunks dropped
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(run())
+    finally:
+        fake_upstreams.configure(hang_rate=0.0)
@@ -0,0 +1,52 @@
+# /train against the fake upstreams and an in-memory Chroma with a hashed
+# embedder (chroma_local.bench_retrieval), so nothing is downloaded or billed.
+import asyncio
+
+import httpx
+import chromadb.utils.embedding_functions as embedding_functions
+from fastapi import FastAPI
+
+import fake_upstreams
+from chroma_local import memory_manager
+from chroma_local.bench_retrieval import HashEmbedding
+from routes import http_clients
+from routes.train_route import router as train_router
+
+MEMORY = (
+    "Every monsoon we sailed paper boats in the lane behind the old house, "
+    "racing them to the drain while grandfather kept score from the verandah."
+)
+
+
+def test_resubmitting_the_same_text_succeeds(monkeypatch):
+    # A collection of its own: earlier tests may have built the shared one with the default embedder
+    monkeypatch.setattr(embedding_functions, "DefaultEmbeddingFunction", HashEmbedding)
+    monkeypatch.setattr(memory_manager, "CHROMA_COLLECTION", "test_train_route")
+    monkeypatch.setattr(memory_manager, "collection", None)
+    monkeypatch.setattr(memory_manager, "chroma_client", None)
+    monkeypatch.setattr(memory_manager, "embedding_function", None)
+    monkeypatch.setattr(memory_manager, "_user_collections", {})
+    fake_upstreams.configure(latency_ms=5, jitter_ms=0, slow_rate=0.0, error_rate=0.0,
+                             hang_rate=0.0, reset_rate=0.0, token_delay_ms=0)
+
+    async def run():
+        transport = httpx.ASGITransport(app=fake_upstreams.app)
+        for name in http_clients.UPSTREAMS:
+            http_clients._clients[name] = httpx.AsyncClient(transport=transport, base_url="http://fake")
+        app = FastAPI()
+        app.include_router(train_router)
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+                headers = {"X-User-Id": "test-train-resubmit"}
+                first = await client.post("/train", json={"text": MEMORY, "tags": ["monsoon"]}, headers=headers)
+                again = await client.post("/train", json={"text": MEMORY, "tags": ["monsoon"]}, headers=headers)
+                return first.json(), again.json()
+        finally:
+            await http_clients.close_clients()
+
+    first, again = asyncio.run(run())
+
+    assert first["status"] == "success" and first["data"]["passages"] == 1
+    assert again["status"] == "success"
+    assert again["data"]["passages"] == 0
+    assert again["data"]["duplicates"][0]["kind"] == "exact"
@@ -0,0 +1,71 @@
+# backend/ws_replay_client.py
+#
+# Replays a WAV file into /ws/transcribe (or /ws/voice-chat) as if it were
+# being captured live, and prints every message the server pushes back:
+#
+#   python ws_replay_client.py sample.wav
+#   python ws_replay_client.py sample.wav --url ws://localhost:8000/ws/voice-chat --fast
+#
+# The WAV must be 16-bit PCM; stereo files are sent as the first channel.
+import sys
+import json
+import time
+import wave
+import asyncio
+import argparse
+
+import websockets
+
+
+def read_pcm(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise SystemExit("WAV must be 16-bit PCM")
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        frames = wf.readframes(wf.getnframes())
+    if channels > 1:
+        step = 2 * channels
+        frames = b"".join(frames[i:i + 2] for i in range(0, len(frames), step))
+    return frames, rate
+
+
+async def replay(path, url, frame_ms, fast):
+    pcm, rate = read_pcm(path)
+    frame_bytes = int(rate * frame_ms / 1000) * 2
+    started = time.perf_counter()
+
+    async with websockets.connect(f"{url}?sample_rate={rate}", max_size=None) as ws:
+        async def receive():
+            async for message in ws:
+                elapsed = time.perf_counter() - started
+                print(f"[{elapsed:6.2f}s] {message}")
+                if json.loads(message).get("type") in ("done", "answer", "error"):
+                    return
+
+        receiver = asyncio.create_task(receive())
+        for offset in range(0, len(pcm), frame_bytes):
+            if receiver.done():
+                break
+            await ws.send(pcm[offset:offset + frame_bytes])
+            if not fast:
+                await asyncio.sleep(frame_ms / 1000)  # pace like a microphone
+        if not receiver.done():
+            await ws.send(json.dumps({"type": "end"}))
+        await receiver
+
+    print(f"🔚 Replayed {len(pcm) / (2 * rate):.2f}s of audio in {time.perf_counter() - started:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a WAV file over the streaming STT WebSocket")
+    parser.add_argument("wav")
+    parser.add_argument("--url", default="ws://localhost:8000/ws/transcribe")
+    parser.add_argument("--frame-ms", type=int, default=100)
+    parser.add_argument("--fast", action="store_true", help="send frames without real-time pacing")
+    args = parser.parse_args()
+    asyncio.run(replay(args.wav, args.url, args.frame_ms, args.fast))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
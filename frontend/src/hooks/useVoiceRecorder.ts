@@ -1,82 +1,180 @@
 import { useState, useRef, useCallback } from 'react';
 
+const STREAM_SAMPLE_RATE = 16000;
+
+export interface StreamMessage {
+  type: 'ready' | 'partial' | 'final' | 'done' | 'answer' | 'error';
+  text?: string;
+  transcript?: string;
+  audio_url?: string;
+  answer_url?: string;
+  message?: string;
+}
+
 export interface UseVoiceRecorderProps {
   onRecordingComplete?: (audioBlob: Blob) => void;
+  // When set, PCM frames are streamed to this WebSocket (e.g. /ws/transcribe) while recording
+  streamUrl?: string;
+  onStreamMessage?: (message: StreamMessage) => void;
 }
 
-export const useVoiceRecorder = ({ onRecordingComplete }: UseVoiceRecorderProps = {}) => {
+// Linear resample of one mono Float32 block to 16 kHz 16-bit PCM
+const toPcm16 = (input: Float32Array, inputRate: number): ArrayBuffer => {
+  const ratio = inputRate / STREAM_SAMPLE_RATE;
+  const length = Math.floor(input.length / ratio);
+  const output = new Int16Array(length);
+  for (let i = 0; i < length; i++) {
+    const position = i * ratio;
+    const index = Math.floor(position);
+    const next = Math.min(index + 1, input.length - 1);
+    const sample = input[index] + (input[next] - input[index]) * (position - index);
+    const clamped = Math.max(-1, Math.min(1, sample));
+    output[i] = clamped < 0 ? clamped * 0x8000 : clamped * 0x7fff;
+  }
+  return output.buffer;
+};
+
+export const useVoiceRecorder = ({
+  onRecordingComplete,
+  streamUrl,
+  onStreamMessage,
+}: UseVoiceRecorderProps = {}) => {
   const [isRecording, setIsRecording] = useState(false);
   const [recordingTime, setRecordingTime] = useState(0);
   const [audioBlob, setAudioBlob] = useState<Blob | null>(null);
-  
+  const [partialTranscript, setPartialTranscript] = useState('');
+  const [transcript, setTranscript] = useState('');
+
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const streamRef = useRef<MediaStream | null>(null);
   const timerRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  const socketRef = useRef<WebSocket | null>(null);
+  const audioContextRef = useRef<AudioContext | null>(null);
+  const processorRef = useRef<ScriptProcessorNode | null>(null);
+
+  const startStreaming = useCallback((stream: MediaStream) => {
+    if (!streamUrl) return;
+
+    const socket = new WebSocket(`${streamUrl}?sample_rate=${STREAM_SAMPLE_RATE}`);
+    socket.binaryType = 'arraybuffer';
+    const finals: string[] = [];
+
+    socket.onmessage = (event) => {
+      const message: StreamMessage = JSON.parse(event.data);
+      if (message.type === 'partial') {
+        setPartialTranscript(message.text ?? '');
+      } else if (message.type === 'final') {
+        finals.push(message.text ?? '');
+        setPartialTranscript('');
+        setTranscript(finals.join(' '));
+      } else if (message.type === 'done' || message.type === 'answer') {
+        setPartialTranscript('');
+        setTranscript(message.transcript ?? finals.join(' '));
+      }
+      onStreamMessage?.(message);
+    };
+
+    // Browsers may ignore the requested rate, so frames are resampled in toPcm16
+    const audioContext = new AudioContext({ sampleRate: STREAM_SAMPLE_RATE });
+    const source = audioContext.createMediaStreamSource(stream);
+    const processor = audioContext.createScriptProcessor(4096, 1, 1);
+    processor.onaudioprocess = (event) => {
+      if (socket.readyState === WebSocket.OPEN) {
+        socket.send(toPcm16(event.inputBuffer.getChannelData(0), audioContext.sampleRate));
+      }
+    };
+    source.connect(processor);
+    processor.connect(audioContext.destination);
+
+    socketRef.current = socket;
+    audioContextRef.current = audioContext;
+    processorRef.current = processor;
+  }, [streamUrl, onStreamMessage]);
+
+  const stopStreaming = useCallback(() => {
+    processorRef.current?.disconnect();
+    processorRef.current = null;
+    audioContextRef.current?.close();
+    audioContextRef.current = null;
+
+    // Keep the socket open until the server sends the final transcript / answer
+    const socket = socketRef.current;
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({ type: 'end' }));
+    }
+    socketRef.current = null;
+  }, []);
 
   const startRecording = useCallback(async () => {
     try {
-      const stream = await navigator.mediaDevices.getUserMedia({ 
+      const stream = await navigator.mediaDevices.getUserMedia({
         audio: {
           echoCancellation: true,
           noiseSuppression: true,
           sampleRate: 16000,
-        } 
+        }
       });
-      
+
       streamRef.current = stream;
-      
+
       const mediaRecorder = new MediaRecorder(stream, {
         mimeType: 'audio/webm;codecs=opus',
       });
-      
+
       const audioChunks: BlobPart[] = [];
-      
+
       mediaRecorder.ondataavailable = (event) => {
         audioChunks.push(event.data);
       };
-      
+
       mediaRecorder.onstop = () => {
         const blob = new Blob(audioChunks, { type: 'audio/webm' });
         setAudioBlob(blob);
         onRecordingComplete?.(blob);
       };
-      
+
       mediaRecorderRef.current = mediaRecorder;
       mediaRecorder.start();
+      setPartialTranscript('');
+      setTranscript('');
+      startStreaming(stream);
       setIsRecording(true);
       setRecordingTime(0);
-      
+
       // Start timer
       timerRef.current = setInterval(() => {
         setRecordingTime(prev => prev + 1);
       }, 1000);
-      
+
     } catch (error) {
       console.error('Error starting recording:', error);
       alert('Could not access microphone. Please check permissions.');
     }
-  }, [onRecordingComplete]);
+  }, [onRecordingComplete, startStreaming]);
 
   const stopRecording = useCallback(() => {
     if (mediaRecorderRef.current && isRecording) {
       mediaRecorderRef.current.stop();
+      stopStreaming();
       setIsRecording(false);
-      
+
       if (timerRef.current) {
         clearInterval(timerRef.current);
         timerRef.current = null;
       }
-      
+
       if (streamRef.current) {
         streamRef.current.getTracks().forEach(track => track.stop());
         streamRef.current = null;
       }
     }
-  }, [isRecording]);
+  }, [isRecording, stopStreaming]);
 
   const resetRecording = useCallback(() => {
     setAudioBlob(null);
     setRecordingTime(0);
+    setPartialTranscript('');
+    setTranscript('');
   }, []);
 
   const formatTime = useCallback((seconds: number) => {
@@ -89,9 +187,11 @@ export const useVoiceRecorder = ({ onRecordingComplete }: UseVoiceRecorderProps
     isRecording,
     recordingTime,
     audioBlob,
+    partialTranscript,
+    transcript,
     startRecording,
     stopRecording,
     resetRecording,
     formatTime,
   };
-};
\ No newline at end of file
+};
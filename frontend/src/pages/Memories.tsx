@@ -44,21 +44,28 @@ const Memories: React.FC = () => {
   //   ];
   //   setMemories(mockMemories);
   // }, []);
-  useEffect(() => {
-  const fetchMemories = async () => {
+  // /memories is paginated; the next page is only fetched when the user asks for it
+  const [nextOffset, setNextOffset] = useState<number | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+
+  const fetchMemories = async (offset: number) => {
+    setIsLoadingMore(true);
     try {
-      const res = await fetch('http://localhost:8000/memories'); // or your correct FastAPI backend URL
+      const res = await fetch(`http://localhost:8000/memories?limit=200&offset=${offset}`); // or your correct FastAPI backend URL
       const json = await res.json();
-      if (json.status === 'success') {
-        setMemories(json.data);
-      }
+      if (json.status !== 'success') return;
+      setMemories(prev => (offset === 0 ? json.data : prev.concat(json.data)));
+      setNextOffset(json.page?.next_offset ?? null);
     } catch (err) {
       console.error('Failed to fetch memories:', err);
+    } finally {
+      setIsLoadingMore(false);
     }
   };
 
-  fetchMemories();
-}, []);
+  useEffect(() => {
+    fetchMemories(0);
+  }, []);
 
 
   const allTags = Array.from(new Set(memories.flatMap(memory => memory.tags)));
@@ -221,6 +228,19 @@ const Memories: React.FC = () => {
         </div>
       )}
 
+      {/* Load More */}
+      {nextOffset !== null && (
+        <div className="text-center">
+          <button
+            onClick={() => fetchMemories(nextOffset)}
+            disabled={isLoadingMore}
+            className="px-6 py-3 text-sm font-medium bg-white border rounded-lg border-warm-beige text-charcoal hover:border-copper-rose disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more memories'}
+          </button>
+        </div>
+      )}
+
       {/* Memory Detail Modal */}
       {selectedMemory && (
         <div className="fixed inset-0 z-50 flex items-center justify-center p-4 bg-black/50">
@@ -62,7 +62,7 @@ const Train: React.FC = () => {
       console.log("🔍 Response received from backend:", response);
 
       if ((response.status === 'success' || response.message?.includes('success')) && response.data) {
-        setLastResponse(response.data.summary);
+        setLastResponse(response.data.summary || response.message || null);
         setText('');
         setTranscribedText('');
         setTags([]);
@@ -130,6 +130,11 @@ class ApiService {
     return `${API_BASE_URL}/audio/${audioId}`;
   }
 
+  // WebSocket URL for live transcription, e.g. getStreamUrl('/ws/transcribe')
+  getStreamUrl(path: string): string {
+    return `${API_BASE_URL.replace(/^http/, 'ws')}${path}`;
+  }
+
   // Test connection to backend
   async testConnection(): Promise<boolean> {
     try {